@@ -1,10 +1,11 @@
-from Direction import Direction
-from Board import Board
+from Board import Board, DIRECTIONS, poseIndex
+from BatchBoard import BatchBoard
 from State import State
 from Action import Action
 from Tile import Tile
 from abc import abstractmethod
-from typing import Tuple
+from typing import Any, List, Tuple
+import numpy as np
 
 class ActionFunction():
     def __init__(self):
@@ -26,45 +27,24 @@ class ActionFunction():
         Returns:
         tuple: Updated state and board after applying the action.
         """
-        grid = board.getGrid()
-        width = len(grid[0])
-        height = len(grid)
-
         row, col, direction = state.row, state.col, state.direction
-        if action in Action.move_delta: # moving
-            change = Action.move_delta[action]
-            new_row = row + change[0]
-            new_col = col + change[1]
-            
-            if not (
-                0 <= new_row < height
-                and 0 <= new_col < width):
-                raise InvalidMove("Not in bounds")
-            elif not (grid[new_row][new_col] not in [Tile.WALL, Tile.CHARACTER]):
+        if action is Action.SHOOT: # shooting
+            if board.inSight((row, col), direction, (state.opp_row, state.opp_col)):
+                board.endGame()
+            return State(row, col, direction, state.opp_row, state.opp_col), board
+
+        # moving and rotating are looked up in the board's transition tables, see Board.computeTransitions
+        pose, value = poseIndex(row, col, direction.value, board.num_tiles), action.value
+        if board.blocked[pose][value]:
+            raise InvalidMove("Not in bounds or wall")
+        position, direction_value = divmod(board.next_pos[pose][value], len(DIRECTIONS))
+        new_row, new_col = divmod(position, board.num_tiles)
+        if new_row != row or new_col != col: # moving
+            if board.tiles[new_row][new_col] == Tile.CHARACTER:
                 raise InvalidMove("Location taken")
-            else:
-                board.setGrid(row, col, Tile.EMPTY)
-                row, col = new_row, new_col
-                board.setGrid(row, col, Tile.CHARACTER)
-
-        elif action in Action.rotate_actions: # rotating
-            change = Action.rotate_actions[action]
-            direction = Direction((direction.value + change) % 4)
-
-        else: # shooting
-            cur_row = row + Direction.dir_delta[direction][0]
-            cur_col = col + Direction.dir_delta[direction][1]
-
-            while 0 <= cur_row < height and 0 <= cur_col < width:
-                if grid[cur_row][cur_col] == Tile.WALL:
-                    # board.setGrid(cur_row, cur_col, Tile.EMPTY)
-                    break
-                if grid[cur_row][cur_col] in [Tile.CHARACTER]:
-                    board.endGame()
-                    break
-                cur_row += Direction.dir_delta[direction][0]
-                cur_col += Direction.dir_delta[direction][1]
-        return state.getStateWithDifferent(row=row, col=col, direction=direction), board
+            board.setGrid(row, col, Tile.EMPTY)
+            board.setGrid(new_row, new_col, Tile.CHARACTER)
+        return State(new_row, new_col, DIRECTIONS[direction_value], state.opp_row, state.opp_col), board
 
     @abstractmethod
     def apply(self, state: State,action: Action, state_prime: State, board: Board) -> Tuple[State, Action, Board]:        
@@ -74,6 +54,88 @@ class ActionFunction():
     def terminate(state: State, action: Action, state_prime: State, won: bool) -> None:
         pass
 
+    @abstractmethod
+    def apply_batch(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        states_prime: np.ndarray,
+        legal: np.ndarray,
+        board: BatchBoard) -> np.ndarray:
+        """
+        Batched counterpart of apply for games stepped by a BatchBoard.
+
+        Parameters:
+        states (np.ndarray): int[N, 5] previous states, as returned by BatchBoard.getStates.
+        actions (np.ndarray): int[N] previous Action values, -1 if none.
+        states_prime (np.ndarray): int[N, 5] current states.
+        legal (np.ndarray): bool[N, len(Action)] mask of actions that can be taken.
+        board (BatchBoard): The batched game boards.
+
+        Returns:
+        int[N] Action values to play, all legal under the given mask.
+        """
+        pass
+
+    def terminate_batch(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        states_prime: np.ndarray,
+        won: np.ndarray) -> None:
+        """
+        Batched counterpart of terminate, notifying the agent of each finished game in order.
+
+        Parameters:
+        states (np.ndarray): int[N, 5] last states before the game ended.
+        actions (np.ndarray): int[N] last Action values.
+        states_prime (np.ndarray): int[N, 5] final states.
+        won (np.ndarray): bool[N] whether the agent won each game.
+        """
+        for state, action, state_prime, has_won in zip(states, actions, states_prime, won):
+            self.terminate(
+                state=State.fromArray(state),
+                action=Action(int(action)),
+                state_prime=State.fromArray(state_prime),
+                won=bool(has_won))
+
+    def batch_limit(self) -> int:
+        """
+        Get how many upcoming episodes can be played together in one batch.
+
+        Returns:
+        int: Maximum number of episodes, None if there is no limit.
+        """
+        return None
+
+    def states_discovered(self) -> int:
+        """
+        Get the number of states the agent has learned something about, reported by Metrics.
+
+        Returns:
+        int: Number of states, None if the agent does not keep any.
+        """
+        return None
+
+    def memory_bytes(self) -> int:
+        """
+        Get an estimate of the bytes held by the agent's tables, reported by Metrics.
+
+        Returns:
+        int: Number of bytes, None if the agent does not keep any tables.
+        """
+        return None
+
+    @abstractmethod
+    def checkpoint(self) -> List[Tuple[str, Any]]:
+        """
+        Snapshot the tables to save, so they can be written while the agent keeps training.
+
+        Returns:
+        List of (file_name, table) pairs for Checkpoint.saveTable, empty if nothing is saved.
+        """
+        pass
+
     @abstractmethod
     def write_to_file(self) -> None:
         pass
@@ -0,0 +1,208 @@
+from Tile import Tile
+from Action import Action
+from Direction import Direction
+from Board import Board, poseIndex, wallTables
+import numpy as np
+
+# per-action lookup tables, indexed by Action.value
+MOVE_ROW = np.array([Action.move_delta.get(a, (0, 0))[0] for a in Action], dtype=np.int64)
+MOVE_COL = np.array([Action.move_delta.get(a, (0, 0))[1] for a in Action], dtype=np.int64)
+IS_MOVE = np.array([a in Action.move_delta for a in Action])
+
+# per-direction lookup tables, indexed by Direction.value
+DIR_ROW = np.array([Direction.dir_delta[d][0] for d in Direction], dtype=np.int64)
+DIR_COL = np.array([Direction.dir_delta[d][1] for d in Direction], dtype=np.int64)
+
+
+class BatchBoard:
+    """
+    N boards stepped in lockstep. Fields:
+        - self.tiles: np.ndarray: int8[N, num_tiles, num_tiles] of Tile values
+        - self.rows / self.cols: np.ndarray: int[N, 2] position of each player
+        - self.dirs: np.ndarray: int[N, 2] Direction value of each player
+        - self.sight: np.ndarray: int[num_tiles, num_tiles, 4] cells a shot travels, see Board.computeSight
+        - self.legal_actions: np.ndarray: bool[num_tiles, num_tiles, len(Action)] actions allowed by the walls
+        - self.next_pos / self.blocked: np.ndarray: [poses, len(Action)] transition tables, see Board.computeTransitions
+        - self.turns: np.ndarray: int[N] number of completed turns
+        - self.done: np.ndarray: bool[N] whether the game is over (won or tied)
+        - self.winner: np.ndarray: int8[N] index of the winning player, -1 if none
+    """
+    def __init__(
+        self,
+        num_tiles: int,
+        player1_indices: np.ndarray,
+        player2_indices: np.ndarray,
+        player1_directions: np.ndarray,
+        player2_directions: np.ndarray,
+        max_turns: int = 100):
+        """
+        Initialize N boards with the given player positions and directions.
+
+        Parameters:
+        num_tiles (int): Number of tiles in one dimension of the square board.
+        player1_indices (np.ndarray): int[N, 2] positions of player 1.
+        player2_indices (np.ndarray): int[N, 2] positions of player 2.
+        player1_directions (np.ndarray): int[N] Direction values of player 1.
+        player2_directions (np.ndarray): int[N] Direction values of player 2.
+        max_turns (int): Number of turns after which a game is tied.
+        """
+        player1_indices = np.asarray(player1_indices)
+        player2_indices = np.asarray(player2_indices)
+        num_envs = len(player1_indices)
+        envs = np.arange(num_envs)
+
+        layout = np.full((num_tiles, num_tiles), Tile.EMPTY.value, dtype=np.int8)
+        layout[1:num_tiles - 1:2, 1:num_tiles - 1:2] = Tile.WALL.value
+
+        self.num_tiles: int = num_tiles
+        self.num_envs: int = num_envs
+        self.max_turns: int = max_turns
+        self.tiles: np.ndarray = np.repeat(layout[np.newaxis], num_envs, axis=0)
+        # shared with every board of this size, see Board.wallTables
+        self.sight, self.legal_actions, self.next_pos, self.blocked = wallTables(num_tiles)
+        self.rows: np.ndarray = np.stack([player1_indices[:, 0], player2_indices[:, 0]], axis=1).astype(np.int64)
+        self.cols: np.ndarray = np.stack([player1_indices[:, 1], player2_indices[:, 1]], axis=1).astype(np.int64)
+        self.dirs: np.ndarray = np.stack([player1_directions, player2_directions], axis=1).astype(np.int64)
+        self.tiles[envs, self.rows[:, 0], self.cols[:, 0]] = Tile.CHARACTER.value
+        self.tiles[envs, self.rows[:, 1], self.cols[:, 1]] = Tile.CHARACTER.value
+
+        self.turns: np.ndarray = np.zeros(num_envs, dtype=np.int64)
+        self.done: np.ndarray = np.zeros(num_envs, dtype=bool)
+        self.tied: np.ndarray = np.zeros(num_envs, dtype=bool)
+        self.winner: np.ndarray = np.full(num_envs, -1, dtype=np.int8)
+
+
+    def getStates(
+        self,
+        player: int) -> np.ndarray:
+        """
+        Get the state of every game from the given player's perspective.
+
+        Parameters:
+        player (int): Index of the player (0 or 1).
+
+        Returns:
+        int[N, 5] array of (row, col, direction, opp_row, opp_col), matching State.
+        """
+        opp = 1 - player
+        return np.stack([
+            self.rows[:, player],
+            self.cols[:, player],
+            self.dirs[:, player],
+            self.rows[:, opp],
+            self.cols[:, opp]], axis=1)
+
+
+    def getStartStates(
+        self,
+        player: int) -> np.ndarray:
+        """
+        Get the start state of every game from the given player's perspective.
+
+        Parameters:
+        player (int): Index of the player (0 or 1).
+
+        Returns:
+        int[N, 5] array of states with the opponent position unset (-1), as in Character.
+        """
+        states = self.getStates(player)
+        states[:, 3:] = -1
+        return states
+
+
+    def getLegalActions(
+        self,
+        player: int) -> np.ndarray:
+        """
+        Get which actions the given player can take in every game.
+
+        Parameters:
+        player (int): Index of the player (0 or 1).
+
+        Returns:
+        bool[N, len(Action)] mask, False for moves that leave the board or hit a wall or character.
+        """
+        opp = 1 - player
+        blocked_by_opp = (
+            (self.rows[:, player, np.newaxis] + MOVE_ROW == self.rows[:, opp, np.newaxis])
+            & (self.cols[:, player, np.newaxis] + MOVE_COL == self.cols[:, opp, np.newaxis])
+            & IS_MOVE)
+        return self.legal_actions[self.rows[:, player], self.cols[:, player]] & ~blocked_by_opp
+
+
+    def step(
+        self,
+        player: int,
+        actions: np.ndarray,
+        active: np.ndarray = None) -> np.ndarray:
+        """
+        Apply one action for the given player in every active game.
+
+        Moves, rotations and shots are applied as in ActionFunction.try_action. A hit ends
+        the game with the shooter as winner; after player 2 (index 1) acts, the turn counter
+        advances and games reaching max_turns are tied.
+
+        Parameters:
+        player (int): Index of the player (0 or 1).
+        actions (np.ndarray): int[N] Action values to apply.
+        active (np.ndarray): bool[N] games to step, defaults to all games that are not done.
+
+        Returns:
+        bool[N] mask of games where the action was an invalid move and was not applied.
+        """
+        if active is None:
+            active = ~self.done
+        active = active & ~self.done
+        invalid = np.zeros(self.num_envs, dtype=bool)
+
+        envs = np.flatnonzero(active)
+        actions = np.asarray(actions)[envs]
+        rows = self.rows[envs, player]
+        cols = self.cols[envs, player]
+        dirs = self.dirs[envs, player]
+
+        # moving and rotating, looked up in the transition tables, the opponent being the only other obstacle
+        poses = poseIndex(rows, cols, dirs, self.num_tiles)
+        new_poses = self.next_pos[poses, actions]
+        new_pos, new_dirs = np.divmod(new_poses, len(Direction))
+        new_rows, new_cols = np.divmod(new_pos, self.num_tiles)
+        taken = (new_rows == self.rows[envs, 1 - player]) & (new_cols == self.cols[envs, 1 - player])
+        blocked = self.blocked[poses, actions] | taken
+        moved = IS_MOVE[actions] & ~blocked
+        invalid[envs[blocked]] = True
+
+        moved_envs = envs[moved]
+        self.tiles[moved_envs, rows[moved], cols[moved]] = Tile.EMPTY.value
+        self.tiles[moved_envs, new_rows[moved], new_cols[moved]] = Tile.CHARACTER.value
+        self.rows[moved_envs, player] = new_rows[moved]
+        self.cols[moved_envs, player] = new_cols[moved]
+
+        self.dirs[envs, player] = new_dirs
+
+        # shooting, a hit when the opponent is on the shot's path before the first wall
+        opp_rows = self.rows[envs, 1 - player] - rows
+        opp_cols = self.cols[envs, 1 - player] - cols
+        distance = opp_rows * DIR_ROW[dirs] + opp_cols * DIR_COL[dirs]
+        aligned = (opp_rows * DIR_COL[dirs] == 0) & (opp_cols * DIR_ROW[dirs] == 0)
+        hit = (
+            (actions == Action.SHOOT.value) & aligned
+            & (0 < distance) & (distance <= self.sight[rows, cols, dirs]))
+
+        hit_envs = envs[hit]
+        self.done[hit_envs] = True
+        self.winner[hit_envs] = player
+
+        # advancing the turn counter once both players have acted
+        if player == 1:
+            envs = envs[~hit]
+            self.turns[envs] += 1
+            out_of_turns = envs[self.turns[envs] >= self.max_turns]
+            self.done[out_of_turns] = True
+            self.tied[out_of_turns] = True
+
+        return invalid
+
+
+    # reward shaping helpers shared with Board
+    getManhattanDistance = Board.getManhattanDistance
+    getFacing = Board.getFacing
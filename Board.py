@@ -1,9 +1,22 @@
 from Tile import Tile
 from Direction import Direction
+from Action import Action
 import numpy as np
-from typing import List, Tuple
-from pygame import Surface
-import time
+from typing import Dict, List, Set, Tuple
+
+# move action value for each (row, col) step
+MOVE_TOWARDS = {delta: action.value for action, delta in Action.move_delta.items()}
+
+# tiles occupied by a character
+CHARACTER_TILES = (Tile.CHARACTER, Tile.CHARACTER_ON_STATION)
+
+# Direction of each Direction value
+DIRECTIONS = tuple(Direction(value) for value in range(len(Direction)))
+
+# (sight, legal_actions, next_pos, blocked) arrays shared by every board of the same size, see wallTables
+WALL_ARRAYS: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+# the same tables as nested lists, which Board indexes one element at a time faster than arrays
+WALL_TABLES: Dict[int, Tuple[List[List[List[int]]], np.ndarray, List[List[int]], List[List[bool]]]] = {}
 
 class Board:
     def __init__(
@@ -22,11 +35,24 @@ class Board:
         self.tiles: List[List[Tile]] = [[Tile.EMPTY for _ in range(num_tiles)] for _ in range(num_tiles)]
         self.tiles[player1_index[0]][player1_index[1]] = Tile.CHARACTER
         self.tiles[player2_index[0]][player2_index[1]] = Tile.CHARACTER
+        # positions of the characters, kept up to date by setGrid so they never need a grid scan
+        self.characters: Set[Tuple[int, int]] = {tuple(player1_index), tuple(player2_index)}
 
         for row in range(1, len(self.tiles) - 1, 2):
             for col in range(1, len(self.tiles[0]) - 1, 2):
                 self.tiles[row][col] = Tile.WALL
 
+        # walls never change, so how far a shot travels and where each action leads are computed once per size
+        if num_tiles not in WALL_TABLES:
+            sight, legal_actions, next_pos, blocked = wallTables(num_tiles)
+            WALL_TABLES[num_tiles] = (sight.tolist(), legal_actions, next_pos.tolist(), blocked.tolist())
+        self.num_tiles: int = num_tiles
+        self.sight: List[List[List[int]]] = WALL_TABLES[num_tiles][0]
+        self.legal_actions: np.ndarray = WALL_TABLES[num_tiles][1]
+        # indexed by pose, see poseIndex
+        self.next_pos: List[List[int]] = WALL_TABLES[num_tiles][2]
+        self.blocked: List[List[bool]] = WALL_TABLES[num_tiles][3]
+
         self.outOfFuel: int = 0
         self.tied: bool = False
         self.done: bool = False
@@ -56,41 +82,68 @@ class Board:
         col (int): Column index of the tile.
         new_tile (Tile): New tile to be placed at the specified position.
         """
+        if self.tiles[row][col] in CHARACTER_TILES:
+            self.characters.discard((row, col))
+        if new_tile in CHARACTER_TILES:
+            self.characters.add((row, col))
         self.tiles[row][col] = new_tile
 
 
-    def drawGrid(
-        self, 
-        canvas: Surface, 
-        tile_size: int) -> None:
+    def getCharacters(
+        self) -> List[Tuple[int, int]]:
+        """
+        Get the positions of all characters on the board.
+
+        Returns:
+        List of tuples representing the positions of characters, in row-major order.
+        """
+        return sorted(self.characters)
+
+
+    def getLegalActions(
+        self,
+        pos: Tuple[int, int],
+        opp_pos: Tuple[int, int]) -> np.ndarray:
         """
-        Draw the grid on the given canvas.
+        Get which actions a character at pos can take, given where its opponent is.
 
         Parameters:
-        canvas (Surface): Canvas to draw the grid on.
-        tile_size (int): Size of each tile.
+        pos (Tuple[int, int]): Position of the character.
+        opp_pos (Tuple[int, int]): Position of the opponent.
+
+        Returns:
+        bool[len(Action)] mask, False for moves that leave the board or hit a wall or the opponent.
         """
-        for row in range(len(self.tiles)):
-            for col in range(len(self.tiles[0])):
-                tile = self.tiles[row][col]
-                tile.draw(canvas, (col * tile_size, row * tile_size), tile_size)
+        legal = self.legal_actions[pos[0], pos[1]].copy()
+        towards_opp = MOVE_TOWARDS.get((opp_pos[0] - pos[0], opp_pos[1] - pos[1]))
+        if towards_opp is not None:
+            legal[towards_opp] = False
+        return legal
 
 
-    def getCharacters(
-        self) -> List[Tuple[int, int]]:
+    def inSight(
+        self,
+        pos: Tuple[int, int],
+        dir: Direction,
+        target: Tuple[int, int]) -> bool:
         """
-        Get the positions of all characters on the board.
+        Check if a shot fired from pos in the given direction reaches target before hitting a wall.
+
+        Parameters:
+        pos (Tuple[int, int]): Position of the shooter.
+        dir (Direction): Direction of the shot.
+        target (Tuple[int, int]): Position of the target.
 
         Returns:
-        List of tuples representing the positions of characters.
+        True if target is on the shot's path.
         """
-        locs = []
-        for row in range(len(self.tiles)):
-            for col in range(len(self.tiles[0])):
-                tile = self.tiles[row][col]
-                if tile in [Tile.CHARACTER, Tile.CHARACTER_ON_STATION]:
-                    locs.append((row, col))
-        return locs
+        reach = self.sight[pos[0]][pos[1]][dir.value]
+        delta_row, delta_col = Direction.dir_delta[dir]
+        if delta_row == 0:
+            distance = (target[1] - pos[1]) * delta_col
+            return target[0] == pos[0] and 0 < distance <= reach
+        distance = (target[0] - pos[0]) * delta_row
+        return target[1] == pos[1] and 0 < distance <= reach
 
 
     def getManhattanDistance(
@@ -158,4 +211,123 @@ class Board:
         """
         self.outOfFuel += 1
         if self.outOfFuel == 2:
-            self.tied = True
\ No newline at end of file
+            self.tied = True
+
+
+def computeSight(
+    walls: np.ndarray) -> np.ndarray:
+    """
+    Compute how many cells a shot travels from every cell in every direction before leaving the board or hitting a wall.
+
+    Parameters:
+    walls (np.ndarray): bool[rows, cols] mask of the walls.
+
+    Returns:
+    int[rows, cols, len(Direction)] number of cells on each shot's path, indexed by Direction value.
+    """
+    rows, cols = walls.shape
+    sight = np.zeros((rows, cols, len(Direction)), dtype=np.int64)
+    for direction in Direction:
+        delta_row, delta_col = Direction.dir_delta[direction]
+        # sweeping against the direction of the shot, so each cell extends the count of its neighbour
+        row_order = range(rows) if delta_row <= 0 else range(rows - 1, -1, -1)
+        col_order = range(cols) if delta_col <= 0 else range(cols - 1, -1, -1)
+        for row in row_order:
+            for col in col_order:
+                next_row, next_col = row + delta_row, col + delta_col
+                if not (0 <= next_row < rows and 0 <= next_col < cols) or walls[next_row, next_col]:
+                    continue
+                sight[row, col, direction.value] = 1 + sight[next_row, next_col, direction.value]
+    return sight
+
+
+def computeLegalActions(
+    walls: np.ndarray) -> np.ndarray:
+    """
+    Compute which actions can be taken from every cell, ignoring the other character.
+
+    Parameters:
+    walls (np.ndarray): bool[rows, cols] mask of the walls.
+
+    Returns:
+    bool[rows, cols, len(Action)] mask, False for moves that leave the board or hit a wall.
+    """
+    rows, cols = walls.shape
+    legal = np.ones((rows, cols, len(Action)), dtype=bool)
+    for action, (delta_row, delta_col) in Action.move_delta.items():
+        for row in range(rows):
+            for col in range(cols):
+                new_row, new_col = row + delta_row, col + delta_col
+                legal[row, col, action.value] = (
+                    0 <= new_row < rows and 0 <= new_col < cols and not walls[new_row, new_col])
+    return legal
+
+
+def wallTables(
+    num_tiles: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Get the tables of the walls of a board, computed on the first call for each size.
+
+    Parameters:
+    num_tiles (int): Number of tiles in one dimension of the square board.
+
+    Returns:
+    (sight, legal_actions, next_pos, blocked) tuple, see computeSight, computeLegalActions and computeTransitions.
+    The arrays are shared, so they must not be modified.
+    """
+    if num_tiles not in WALL_ARRAYS:
+        # the layout of Board, a wall on every other tile of the inner rows and columns
+        walls = np.zeros((num_tiles, num_tiles), dtype=bool)
+        walls[1:num_tiles - 1:2, 1:num_tiles - 1:2] = True
+        legal_actions = computeLegalActions(walls)
+        WALL_ARRAYS[num_tiles] = (computeSight(walls), legal_actions, *computeTransitions(legal_actions))
+    return WALL_ARRAYS[num_tiles]
+
+
+def poseIndex(
+    row: int,
+    col: int,
+    direction: int,
+    num_tiles: int) -> int:
+    """
+    Get the id of a character's pose (position and gun direction), the index of the transition tables.
+
+    Parameters:
+    row (int): Row position.
+    col (int): Column position.
+    direction (int): Direction value.
+    num_tiles (int): Number of tiles in one dimension of the square board.
+
+    Returns:
+    int: Id in [0, num_tiles * num_tiles * len(Direction)).
+    """
+    return (row * num_tiles + col) * len(Direction) + direction
+
+
+def computeTransitions(
+    legal_actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the pose a character ends up in after each action from every pose, ignoring the other character.
+
+    Parameters:
+    legal_actions (np.ndarray): bool[rows, cols, len(Action)] mask, see computeLegalActions.
+
+    Returns:
+    int32[rows * cols * len(Direction), len(Action)] next pose (see poseIndex) of each pose and action, the same pose for
+    blocked moves and shots, and bool[rows * cols * len(Direction), len(Action)] mask of the moves that leave the board
+    or hit a wall.
+    """
+    rows, cols, _ = legal_actions.shape
+    row, col, direction = (
+        grid.reshape(-1, 1) for grid in np.meshgrid(
+            np.arange(rows), np.arange(cols), np.arange(len(Direction)), indexing='ij'))
+    delta_row = np.array([Action.move_delta.get(action, (0, 0))[0] for action in Action])
+    delta_col = np.array([Action.move_delta.get(action, (0, 0))[1] for action in Action])
+    rotation = np.array([Action.rotate_actions.get(action, 0) for action in Action])
+
+    blocked = ~legal_actions[row[:, 0], col[:, 0]]
+    next_row = np.where(blocked, row, row + delta_row)
+    next_col = np.where(blocked, col, col + delta_col)
+    next_direction = (direction + rotation) % len(Direction)
+    next_pos = (next_row * cols + next_col) * len(Direction) + next_direction
+    return next_pos.astype(np.int32), blocked
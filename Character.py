@@ -5,8 +5,6 @@ from ActionFunction import ActionFunction
 from Action import Action
 from State import State
 
-import pygame
-
 class Character:
     """
     Represents an agent in the game. Fields:
@@ -103,17 +101,3 @@ class Character:
         else:
             opp_row, opp_col = character_positions[0]
         return self.state_halfprime.getStateWithDifferent(opp_row=opp_row, opp_col=opp_col)
-
-
-    def draw(self, canvas, tile_size):
-        tank = pygame.image.load(f"images/{self.tank_file}").convert_alpha()
-        tank = pygame.transform.scale(tank, (tile_size * .9, tile_size * .9))
-        tank = pygame.transform.rotate(tank, self.state_halfprime.direction.value * -90)
-            
-        canvas.blit(tank, (tile_size * 0.05 + self.state_halfprime.col * tile_size, tile_size * 0.05 + self.state_halfprime.row * tile_size))
-
-        if self.alive == False:
-            cross = pygame.image.load("images/cross.png").convert_alpha()
-            cross = pygame.transform.scale(cross, (tile_size * .9, tile_size * .9))
-            canvas.blit(cross, (tile_size * 0.05 + self.state_halfprime.col * tile_size, tile_size * 0.05 + self.state_halfprime.row * tile_size))
-        
\ No newline at end of file
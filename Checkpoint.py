@@ -0,0 +1,305 @@
+from HashTable import HashColumn
+from typing import Any, Callable, Iterator, List, Tuple
+import numpy as np
+import threading
+import pickle
+import time
+import os
+
+# checkpoints are .npy files: dense tables are saved as they are, and tables keyed by State.key as a
+# sorted <name>.keys.npy key column next to <name>.npy holding one row of values per key
+CHECKPOINT_EXTENSION = '.npy'
+KEYS_EXTENSION = '.keys.npy'
+LEGACY_EXTENSION = '.pkl'
+# held while the files of a checkpoint are moved into place or loaded, so a load never sees half of a save
+REPLACE_LOCK = threading.Lock()
+
+
+class KeyedTable:
+    """
+    Table of value rows looked up by key, backed by a sorted key column and a contiguous value array. Fields:
+        - self.keys: np.ndarray: int64[K] sorted keys
+        - self.values: np.ndarray: [K, ...] one row of values per key
+        - self.rows: dict: rows already looked up, and rows of keys added since loading
+    Rows are views into self.values, so a memory-mapped checkpoint is only read where it is used.
+    """
+    def __init__(
+        self,
+        keys: np.ndarray,
+        values: np.ndarray) -> None:
+        """
+        Initializes the table over the given columns.
+
+        Parameters:
+        keys (np.ndarray): int64[K] sorted keys.
+        values (np.ndarray): [K, ...] one row of values per key.
+        """
+        self.keys: np.ndarray = keys
+        self.values: np.ndarray = values
+        self.rows: dict = {}
+
+
+    def find(
+        self,
+        key: int) -> int:
+        """
+        Get the position of the given key in the key column.
+
+        Parameters:
+        key (int): The key.
+
+        Returns:
+        int: Index in self.keys, -1 if the key is not in it.
+        """
+        i = int(np.searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key:
+            return i
+        return -1
+
+
+    def __getitem__(
+        self,
+        key: int) -> np.ndarray:
+        row = self.rows.get(key)
+        if row is None:
+            i = self.find(key)
+            if i == -1:
+                raise KeyError(key)
+            row = self.rows[key] = self.values[i]
+        return row
+
+
+    def __setitem__(
+        self,
+        key: int,
+        row: np.ndarray) -> None:
+        i = self.find(key) if key not in self.rows else -1
+        if i == -1:
+            self.rows[key] = row
+        else:
+            self.values[i] = row
+            self.rows[key] = self.values[i]
+
+
+    def __contains__(
+        self,
+        key: int) -> bool:
+        return key in self.rows or self.find(key) != -1
+
+
+    def __iter__(
+        self) -> Iterator[int]:
+        return (key for key, _ in self.items())
+
+
+    def __len__(
+        self) -> int:
+        return len(self.keys) + sum(1 for key in self.rows if self.find(key) == -1)
+
+
+    def items(
+        self) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Get every (key, row) pair, the rows of the key column first.
+        """
+        for i, key in enumerate(self.keys.tolist()):
+            yield key, self.rows.get(key, self.values[i])
+        for key, row in self.rows.items():
+            if self.find(key) == -1:
+                yield key, row
+
+
+def keysFile(
+    file_name: str) -> str:
+    """
+    Get the file holding the key column of the given checkpoint.
+    """
+    return os.path.splitext(file_name)[0] + KEYS_EXTENSION
+
+
+def legacyFile(
+    file_name: str) -> str:
+    """
+    Get the pickle file the given checkpoint was saved to before checkpoints were .npy files.
+    """
+    return os.path.splitext(file_name)[0] + LEGACY_EXTENSION
+
+
+def snapshotTable(
+    table: Any) -> Any:
+    """
+    Copy a table so it can be saved while the original keeps changing.
+
+    Parameters:
+    table (Any): Dense array, mapping of int keys to equally shaped rows (dict, KeyedTable or HashColumn), or scalar.
+
+    Returns:
+    Copy of a dense array, KeyedTable of the rows of a mapping, or the scalar.
+    """
+    if isinstance(table, np.ndarray):
+        return np.array(table)
+    if isinstance(table, HashColumn):
+        keys, values = table.table.arrays(table.column)
+        order = np.argsort(keys)
+        return KeyedTable(keys[order], values[order])
+    if isinstance(table, (dict, KeyedTable)):
+        items = list(table.items())
+        keys = np.array([key for key, _ in items], dtype=np.int64)
+        values = np.array([row for _, row in items])
+        order = np.argsort(keys)
+        return KeyedTable(keys[order], values[order])
+    return table
+
+
+def replaceFiles(
+    writes: List[Tuple[str, Callable]],
+    remove: List[str] = ()) -> None:
+    """
+    Write files to temporary files first and then move them all into place together, so a file is never left half
+    written and files saved together are never replaced by different saves.
+
+    Parameters:
+    writes (List[Tuple[str, Callable]]): (file_name, write) pairs, write writing the contents to the given open binary
+        file.
+    remove (List[str]): Files deleted along with the replacement, if they exist.
+    """
+    # unique to the saving thread, so concurrent saves of the same file never write to the same temporary file
+    suffix = f'.{os.getpid()}.{threading.get_ident()}.tmp'
+    temp_files = []
+    try:
+        for file_name, write in writes:
+            temp_files.append(file_name + suffix)
+            with open(temp_files[-1], 'wb') as f:
+                write(f)
+    except BaseException:
+        for temp_file in temp_files:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+        raise
+
+    with REPLACE_LOCK:
+        for file_name in remove:
+            if os.path.exists(file_name):
+                os.remove(file_name)
+        for (file_name, _), temp_file in zip(writes, temp_files):
+            os.replace(temp_file, file_name)
+
+
+def saveTable(
+    file_name: str,
+    table: Any) -> None:
+    """
+    Save a table to the given file, pickling it if the file name ends in .pkl.
+
+    Parameters:
+    file_name (str): File to save to.
+    table (Any): Dense array, mapping of int keys to equally shaped rows, or scalar.
+    """
+    if not file_name.endswith(CHECKPOINT_EXTENSION):
+        if isinstance(table, (KeyedTable, HashColumn)):
+            table = dict(table.items())
+        replaceFiles([(file_name, lambda f: pickle.dump(table, f))])
+        return
+
+    if isinstance(table, (dict, HashColumn)):
+        table = snapshotTable(table)
+    if isinstance(table, KeyedTable):
+        replaceFiles([
+            (keysFile(file_name), lambda f: np.save(f, table.keys)),
+            (file_name, lambda f: np.save(f, table.values))])
+    else:
+        replaceFiles([(file_name, lambda f: np.save(f, np.asarray(table)))], remove=[keysFile(file_name)])
+
+
+class CheckpointWriter:
+    """
+    Saves agent checkpoints on a background thread while training goes on. Fields:
+        - self.saves: int: number of checkpoints saved
+        - self.blocked: float: seconds the caller was blocked, snapshotting tables or waiting for the previous save
+    """
+    def __init__(
+        self) -> None:
+        """
+        Initializes a writer with no save in progress.
+        """
+        self.saves: int = 0
+        self.blocked: float = 0
+        self.thread: threading.Thread = None
+        self.error: Exception = None
+
+
+    def save(
+        self,
+        *agents) -> None:
+        """
+        Snapshot the tables of the given agents and save them in the background, see ActionFunction.checkpoint.
+
+        Parameters:
+        agents (ActionFunction): Agents to save.
+        """
+        start = time.perf_counter()
+        self.wait()
+        tables = [table for agent in agents for table in agent.checkpoint()]
+        self.thread = threading.Thread(target=self.write, args=(tables,))
+        self.thread.start()
+        self.saves += 1
+        self.blocked += time.perf_counter() - start
+
+
+    def write(
+        self,
+        tables: List[Tuple[str, Any]]) -> None:
+        """
+        Save the given (file_name, table) pairs, keeping the error to raise it in the training loop.
+        """
+        try:
+            for file_name, table in tables:
+                saveTable(file_name, table)
+        except Exception as e:
+            self.error = e
+
+
+    def wait(
+        self) -> None:
+        """
+        Wait for the save in progress to finish, raising its error if it failed.
+        """
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+
+def loadTable(
+    file_name: str,
+    mmap: bool = False) -> Any:
+    """
+    Load a table saved by saveTable, falling back to the .pkl file of the same name if there is no .npy file.
+
+    Parameters:
+    file_name (str): File to load from.
+    mmap (bool): Flag to memory-map the arrays copy-on-write instead of reading them, for agents that do not save.
+
+    Returns:
+    Dense array, KeyedTable, scalar or unpickled object, None if there is no file.
+    """
+    if file_name.endswith(CHECKPOINT_EXTENSION) and os.path.exists(file_name):
+        mmap_mode = 'c' if mmap else None
+        with REPLACE_LOCK:
+            values = np.load(file_name, mmap_mode=mmap_mode)
+            keys = np.load(keysFile(file_name), mmap_mode=mmap_mode) if os.path.exists(keysFile(file_name)) else None
+        if values.ndim == 0:
+            return values.item()
+        if keys is not None:
+            if len(keys) != len(values):
+                raise Exception(f"{keysFile(file_name)} holds {len(keys)} keys but {file_name} holds {len(values)} rows.")
+            return KeyedTable(keys, values)
+        return values
+
+    for name in (file_name, legacyFile(file_name)):
+        if name.endswith(LEGACY_EXTENSION) and os.path.exists(name):
+            with open(name, 'rb') as f:
+                return pickle.load(f)
+    return None
@@ -1,14 +1,18 @@
 from ActionFunction import ActionFunction
 from Direction import Direction
 from Board import Board
+from BatchBoard import BatchBoard
 from Action import Action
 from State import State
-from typing import Tuple
+from typing import Any, Callable, List, Tuple
 import numpy as np
-from ActionFunction import InvalidMove
+import Checkpoint
 import random
-import pickle
-import os
+import copy
+import sys
+
+# action of a dense policy in states it has not visited
+UNVISITED = -1
 
 class GA(ActionFunction):
     def __init__(
@@ -17,7 +21,30 @@ class GA(ActionFunction):
             min_population: int = 4, 
             max_population: int = 8, 
             mutation_rate: float = 0.05, 
-            policies_file: str = 'policies.pkl'):
+            policies_file: str = 'policies.npy',
+            dense: bool = False,
+            num_tiles: int = 9,
+            state_budget: int = 0,
+            eviction: str = 'lru'):
+        """
+        Initialize the GA class.
+
+        Parameters:
+        optimal (bool): Flag to indicate if the agent should play its policies as-is, without evolving them.
+        min_population (int): Number of fittest policies kept each generation.
+        max_population (int): Number of policies in each generation.
+        mutation_rate (float): Probability for each state of an offspring to get a random action.
+        policies_file (str): File the fittest policies are saved to and loaded from.
+        dense (bool): Flag to store the population as arrays indexed by State.index instead of dicts.
+        num_tiles (int): Number of tiles in one dimension of the board, used by the dense arrays.
+        state_budget (int): Number of states each dict policy keeps after its episodes, 0 for no limit.
+        eviction (str): Which states a policy over its budget drops, 'lru' the least recently visited
+            or 'lfu' the least often visited.
+        """
+        if eviction not in ('lru', 'lfu'):
+            raise Exception(f"Invalid eviction '{eviction}'. Please use 'lru' or 'lfu'.")
+        self.dense: bool = dense
+        self.num_tiles: int = num_tiles
         self.policies: dict = {i: {} for i in range(max_population)}
         self.num_episodes: int = 0
 
@@ -25,6 +52,17 @@ class GA(ActionFunction):
 
         self.policy_fitness: dict = {}
         self.fitness: dict = {i: {} for i in range(max_population)}
+        # visit count and clock of the last visit of each state of each policy, only kept under a state budget
+        self.visits: dict = {i: {} for i in range(max_population)}
+        self.last_visits: dict = {i: {} for i in range(max_population)}
+        self.clock: int = 0
+        self.state_budget: int = state_budget
+        self.eviction: str = eviction
+        self.evictions: int = 0
+        if dense:
+            # one int8 action per state, UNVISITED if the policy has none, and NaN fitness for states without any
+            self.policies = np.full((max_population, State.numStates(num_tiles)), UNVISITED, dtype=np.int8)
+            self.fitness = np.full((max_population, State.numStates(num_tiles)), np.nan, dtype=np.float32)
 
         self.cur_policy: int = 0
         self.turns: int = 0
@@ -33,54 +71,249 @@ class GA(ActionFunction):
         self.max_population: int = max_population
         self.policies_file: str = policies_file
         self.optimal: bool = optimal
+        self.breed: bool = True
         self.load_data()
 
 
     def apply(self, state: State, action: Action, state_prime: State, board: Board) -> Tuple[State, Action, Board]:        
-        state_prime_str = str(state_prime)
-        if self.cur_policy not in self.policies:
-            self.policies[self.cur_policy] = {}
-
-        if state_prime_str not in self.policies[self.cur_policy]:
-            self.policies[self.cur_policy][state_prime_str] = np.zeros(len(Action))
-            self.policies[self.cur_policy][state_prime_str][np.random.randint(0, len(Action))] = 1
-            
+        state_prime_key = self.key(state_prime)
+        self.initialize_policy(state_prime_key)
+        self.visit(state_prime_key)
 
         # if non-start state, then update fitness for state-action pair using state_prime
         if (not self.optimal) and (not state.isStart()):
-            # getting reward for the given state-action pair
-            reward = self.computeReward(state, action, state_prime, board)
+            self.update_fitness(state, action, state_prime, board)
 
-            # updating fitness with reward
-            if self.cur_policy in self.policy_fitness:
-                self.policy_fitness[self.cur_policy] += reward
-            else:
-                self.policy_fitness[self.cur_policy] = reward
 
-            if self.cur_policy not in self.fitness:
-                self.fitness[self.cur_policy] = {}
-
-            if str(state) not in self.fitness[self.cur_policy]:
-                self.fitness[self.cur_policy][str(state)] = 0
-
-            self.fitness[self.cur_policy][str(state)] += reward
-
-
-        # Getting where current policy's action is 1
-        new_action = np.where(self.policies[self.cur_policy][state_prime_str] == 1)[0][0]
+        # Getting the current policy's action
+        new_action = self.policy_action(state_prime_key)
 
         # Choosing above action if valid, else choosing another random action
         new_state, new_action, new_board = self.choose_action(state_prime, new_action, board)
 
         # If random action chosen, updating the policy to reflect the new action
-        self.policies[self.cur_policy][state_prime_str] = np.zeros(len(Action))
-        self.policies[self.cur_policy][state_prime_str][new_action.value] = 1
+        self.set_policy_action(state_prime_key, new_action.value)
 
         # increment turns
         self.turns += 1
         return state_prime, new_action, new_state, new_board
 
 
+    def apply_batch(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        states_prime: np.ndarray,
+        legal: np.ndarray,
+        board: BatchBoard) -> np.ndarray:
+        """
+        Apply the current policy to a batch of games stepped by a BatchBoard.
+
+        All games in the batch are played by the current policy, see batch_limit.
+
+        Parameters:
+        states (np.ndarray): int[N, 5] previous states.
+        actions (np.ndarray): int[N] previous Action values.
+        states_prime (np.ndarray): int[N, 5] current states.
+        legal (np.ndarray): bool[N, len(Action)] mask of actions that can be taken.
+        board (BatchBoard): The batched game boards.
+
+        Returns:
+        int[N] Action values to play.
+        """
+        new_actions = np.empty(len(states), dtype=np.int64)
+        for i in range(len(states)):
+            state = State.fromArray(states[i])
+            state_prime = State.fromArray(states_prime[i])
+            state_prime_key = self.key(state_prime)
+            self.initialize_policy(state_prime_key)
+            self.visit(state_prime_key)
+
+            if (not self.optimal) and (not state.isStart()):
+                self.update_fitness(state, Action(int(actions[i])), state_prime, board)
+
+            # choosing the policy's action if valid, else choosing another random action
+            new_action = self.policy_action(state_prime_key)
+            if not legal[i][new_action]:
+                new_action = np.random.choice(np.flatnonzero(legal[i]))
+                self.set_policy_action(state_prime_key, new_action)
+
+            new_actions[i] = new_action
+            self.turns += 1
+        return new_actions
+
+
+    def batch_limit(self) -> int:
+        """
+        Get how many upcoming episodes can be played together in one batch.
+
+        While training, a batch may not outlast the current policy, which changes every 4 episodes.
+
+        Returns:
+        int: Maximum number of episodes, None if there is no limit.
+        """
+        if self.optimal:
+            return None
+        return 4 - self.num_episodes % 4
+
+
+    def key(
+        self,
+        state: State) -> int:
+        """
+        Get the key of the given state in the policies and fitness.
+
+        Parameters:
+        state (State): state.
+
+        Returns:
+        int id (State.index) in dense mode, else State.key.
+        """
+        return state.index(self.num_tiles) if self.dense else state.key
+
+
+    def policy_action(self, state_key: int) -> int:
+        """
+        Get the Action value the current policy plays in the given state.
+
+        Parameters:
+        state_key (int): The state key, see key.
+        """
+        if self.dense:
+            return int(self.policies[self.cur_policy, state_key])
+        return int(np.argmax(self.policies[self.cur_policy][state_key]))
+
+
+    def set_policy_action(self, state_key: int, action: int) -> None:
+        """
+        Set the Action value the current policy plays in the given state.
+
+        Parameters:
+        state_key (int): The state key, see key.
+        action (int): Action value.
+        """
+        if self.dense:
+            self.policies[self.cur_policy, state_key] = action
+        else:
+            self.policies[self.cur_policy][state_key] = np.zeros(len(Action))
+            self.policies[self.cur_policy][state_key][action] = 1
+
+
+    def add_fitness(self, state_key: int, reward: float) -> None:
+        """
+        Add the given reward to the current policy's fitness for the given state.
+
+        Parameters:
+        state_key (int): The state key, see key.
+        reward (float): Reward to add.
+        """
+        if self.dense:
+            if np.isnan(self.fitness[self.cur_policy, state_key]):
+                self.fitness[self.cur_policy, state_key] = 0
+            self.fitness[self.cur_policy, state_key] += reward
+            return
+
+        if self.cur_policy not in self.fitness:
+            self.fitness[self.cur_policy] = {}
+
+        if state_key not in self.fitness[self.cur_policy]:
+            self.fitness[self.cur_policy][state_key] = 0
+
+        self.fitness[self.cur_policy][state_key] += reward
+
+
+    def initialize_policy(self, state_key: int) -> None:
+        """
+        Give the current policy a random action for the given state if it has none.
+
+        Parameters:
+        state_key (int): The state key, see key.
+        """
+        if self.dense:
+            if self.policies[self.cur_policy, state_key] == UNVISITED:
+                self.policies[self.cur_policy, state_key] = np.random.randint(0, len(Action))
+            return
+
+        if self.cur_policy not in self.policies:
+            self.policies[self.cur_policy] = {}
+
+        if state_key not in self.policies[self.cur_policy]:
+            self.policies[self.cur_policy][state_key] = np.zeros(len(Action))
+            self.policies[self.cur_policy][state_key][np.random.randint(0, len(Action))] = 1
+
+
+    def visit(self, state_key: int) -> None:
+        """
+        Count a visit of the current policy to the given state, which evict uses to pick the states to drop.
+
+        Parameters:
+        state_key (int): The state key, see key.
+        """
+        if self.dense or self.optimal or self.state_budget <= 0:
+            return
+        visits = self.visits.setdefault(self.cur_policy, {})
+        visits[state_key] = visits.get(state_key, 0) + 1
+        self.last_visits.setdefault(self.cur_policy, {})[state_key] = self.clock
+        self.clock += 1
+
+
+    def evict(self, i: int) -> None:
+        """
+        Drop the states of dict policy i past the state budget, least recently visited first for 'lru' eviction
+        and least often visited first (least recently among equals) for 'lfu'. States never visited, such as
+        loaded ones, go first.
+
+        Parameters:
+        i (int): Index of the policy.
+        """
+        if self.dense or self.state_budget <= 0:
+            return
+        policy = self.policies.get(i, {})
+        excess = len(policy) - self.state_budget
+        if excess <= 0:
+            return
+
+        visits = self.visits.setdefault(i, {})
+        last_visits = self.last_visits.setdefault(i, {})
+        state_keys = list(policy)
+        last = np.array([last_visits.get(state_key, -1) for state_key in state_keys])
+        if self.eviction == 'lfu':
+            order = np.lexsort((last, np.array([visits.get(state_key, 0) for state_key in state_keys])))
+        else:
+            order = np.argsort(last, kind='stable')
+
+        fitness = self.fitness.get(i, {})
+        for j in order[:excess]:
+            state_key = state_keys[j]
+            del policy[state_key]
+            fitness.pop(state_key, None)
+            visits.pop(state_key, None)
+            last_visits.pop(state_key, None)
+        self.evictions += excess
+
+
+    def update_fitness(self, state: State, action: Action, state_prime: State, board: Board) -> None:
+        """
+        Add the reward of the given state-action pair to the current policy's fitness.
+
+        Parameters:
+        state (State): state.
+        action (Action): action.
+        state_prime (State): state prime.
+        board (Board): The game board.
+        """
+        # getting reward for the given state-action pair
+        reward = self.computeReward(state, action, state_prime, board)
+
+        # updating fitness with reward
+        if self.cur_policy in self.policy_fitness:
+            self.policy_fitness[self.cur_policy] += reward
+        else:
+            self.policy_fitness[self.cur_policy] = reward
+
+        self.add_fitness(self.key(state), reward)
+
+
     def choose_action(
         self,
         state: State,
@@ -97,38 +330,27 @@ class GA(ActionFunction):
         Returns:
         tuple: Updated state-action pair after applying the action.
         """
-        actions = set(Action)
-        invalid_actions = set()
-        new_action = action
-
-        while True:
-            try:
-                state_str = str(state)
-                if state_str not in self.policies[self.cur_policy]:
-                    self.policies[self.cur_policy][state_str] = np.zeros(len(Action))
-                    self.policies[self.cur_policy][state_str][np.random.randint(0, len(Action))] = 1
-
-                # picking action to play
-                if new_action in invalid_actions:
-                    # picking random action that is not invalid
-                    new_action = np.random.choice(list(actions.difference(invalid_actions)))
-                else:
-                    # picking best action
-                    new_action = Action(np.argmax(self.policies[self.cur_policy][state_str]))
-                new_state, new_board = self.try_action(state, new_action, board)
-                return new_state, new_action, new_board
-            except InvalidMove:
-                invalid_actions.add(new_action)
+        state_key = self.key(state)
+        self.initialize_policy(state_key)
+
+        # picking the policy's action if valid, else picking a random valid action
+        legal = board.getLegalActions((state.row, state.col), (state.opp_row, state.opp_col))
+        new_action = self.policy_action(state_key)
+        if not legal[new_action]:
+            new_action = np.random.choice(np.flatnonzero(legal))
+        new_action = Action(int(new_action))
+        new_state, new_board = self.try_action(state, new_action, board)
+        return new_state, new_action, new_board
 
 
     def terminate(self, state: State, action: Action, state_prime: State, won: bool) -> None:
         if not self.optimal:
-            if str(state) not in self.fitness[self.cur_policy]:
-                self.fitness[self.cur_policy][str(state)] = 0
-
             self.policy_fitness[self.cur_policy] += (1.e+06 if won else -1.e+06)
-            self.fitness[self.cur_policy][str(state)] += (1.e+06 if won else -1.e+06)
+            self.add_fitness(self.key(state), 1.e+06 if won else -1.e+06)
             if self.num_episodes % 4 == 3:
+                # evicting once every game of the policy is over, games batched with this one may still be adding
+                # fitness to its states until then
+                self.evict(self.cur_policy)
                 self.cur_policy += 1
             self.num_episodes += 1
             self.turns = 0
@@ -144,81 +366,202 @@ class GA(ActionFunction):
             #     self.cur_policy += 1
             # self.turns = 0
 
-            if self.cur_policy >= self.max_population: 
-                best_fitnesses: dict = {
-                    k: v for k, v in sorted(
-                        self.policy_fitness.items(), 
-                        # self.fitness.items(), 
-                        key=lambda item: -item[1])}
-                        # key=lambda item: (-item[1][0], item[1][1] if item[1][0] == 1 else -1 * item[1][1]))}
-
-                new_policies = {}
-                for i in range(self.min_population): 
-                    new_policies[i] = self.policies[list(best_fitnesses.keys())[i]]
-
-                for i in range(self.min_population, self.max_population):
-                    new_policies[i] = {}
-                    #random combines and mutations here
-                    pair = (random.randint(0, self.min_population-1), random.randint(0, self.min_population-1))
-
-                    intersection = set(self.fitness[pair[0]]) & set(self.fitness[pair[1]])
-                    pair_0 = set(self.fitness[pair[0]]) - intersection
-                    pair_1 = set(self.fitness[pair[1]]) - intersection
-
-                    
-                    # intersection = set(self.policies[pair[0]]) & set(self.policies[pair[1]])
-                    # pair_0 = set(self.policies[pair[0]]) - intersection
-                    # pair_1 = set(self.policies[pair[1]]) - intersection
-
-                    for state in intersection:
-
-                        # combination between the two chosen pairs (chooses better pair)
-                        if self.fitness[pair[0]][state] > self.fitness[pair[1]][state]:
-                            new_policies[i][state] = self.policies[pair[0]][state]
-                        else:
-                            new_policies[i][state] = self.policies[pair[1]][state]
-
-                        # random combination between the two chosen pairs
-                        # if random.random() > 0.5:
-                        #     new_policies[i][state] = self.policies[pair[0]][state]
-                        # else:
-                        #     new_policies[i][state] = self.policies[pair[1]][state]
-                        
-                        #mutation 
-                        if random.random() > 1 - self.mutation_rate:
-                            new_policies[i][state] = np.zeros(len(Action))
-                            new_policies[i][state][np.random.randint(0, len(Action))] = 1
-
-                    # adding all states from pair[0] that was not in the intersection
-                    for state in pair_0:
-                        new_policies[i][state] = self.policies[pair[0]][state]
-
-                        # mutation
-                        if random.random() > 1 - self.mutation_rate:
-                            new_policies[i][state] = np.zeros(len(Action))
-                            new_policies[i][state][np.random.randint(0, len(Action))] = 1
-
-                    # adding all states from pair[1] that was not in the intersection
-                    for state in pair_1:
-                        new_policies[i][state] = self.policies[pair[1]][state]
-
-                        # mutation
-                        if random.random() > 1 - self.mutation_rate:
-                            new_policies[i][state] = np.zeros(len(Action))
-                            new_policies[i][state][np.random.randint(0, len(Action))] = 1
+            if self.breed and self.cur_policy >= self.max_population: 
+                self.next_generation()
+
+
+    def next_generation(self) -> None:
+        """
+        Replace the population with its fittest members and their offspring, once every member has been evaluated.
+        """
+        if self.dense:
+            self.next_generation_dense()
+            return
+
+        best_fitnesses: dict = {
+            k: v for k, v in sorted(
+                self.policy_fitness.items(), 
+                # self.fitness.items(), 
+                key=lambda item: -item[1])}
+                # key=lambda item: (-item[1][0], item[1][1] if item[1][0] == 1 else -1 * item[1][1]))}
+
+        new_policies = {}
+        new_visits = {}
+        new_last_visits = {}
+        for i in range(self.min_population): 
+            new_policies[i] = self.policies[list(best_fitnesses.keys())[i]]
+            new_visits[i] = self.visits.get(list(best_fitnesses.keys())[i], {})
+            new_last_visits[i] = self.last_visits.get(list(best_fitnesses.keys())[i], {})
+
+        for i in range(self.min_population, self.max_population):
+            new_policies[i] = {}
+            #random combines and mutations here
+            pair = (random.randint(0, self.min_population-1), random.randint(0, self.min_population-1))
+
+            intersection = set(self.fitness[pair[0]]) & set(self.fitness[pair[1]])
+            pair_0 = set(self.fitness[pair[0]]) - intersection
+            pair_1 = set(self.fitness[pair[1]]) - intersection
+
+            
+            # intersection = set(self.policies[pair[0]]) & set(self.policies[pair[1]])
+            # pair_0 = set(self.policies[pair[0]]) - intersection
+            # pair_1 = set(self.policies[pair[1]]) - intersection
+
+            for state in intersection:
+
+                # combination between the two chosen pairs (chooses better pair)
+                if self.fitness[pair[0]][state] > self.fitness[pair[1]][state]:
+                    new_policies[i][state] = self.policies[pair[0]][state]
+                else:
+                    new_policies[i][state] = self.policies[pair[1]][state]
+
+                # random combination between the two chosen pairs
+                # if random.random() > 0.5:
+                #     new_policies[i][state] = self.policies[pair[0]][state]
+                # else:
+                #     new_policies[i][state] = self.policies[pair[1]][state]
                 
-                self.policies = new_policies
-                l = list(self.policies.items())
-                np.random.shuffle(l)
-                self.policies = dict(l)
+                #mutation 
+                if random.random() > 1 - self.mutation_rate:
+                    new_policies[i][state] = np.zeros(len(Action))
+                    new_policies[i][state][np.random.randint(0, len(Action))] = 1
+
+            # adding all states from pair[0] that was not in the intersection
+            for state in pair_0:
+                new_policies[i][state] = self.policies[pair[0]][state]
+
+                # mutation
+                if random.random() > 1 - self.mutation_rate:
+                    new_policies[i][state] = np.zeros(len(Action))
+                    new_policies[i][state][np.random.randint(0, len(Action))] = 1
+
+            # adding all states from pair[1] that was not in the intersection
+            for state in pair_1:
+                new_policies[i][state] = self.policies[pair[1]][state]
+
+                # mutation
+                if random.random() > 1 - self.mutation_rate:
+                    new_policies[i][state] = np.zeros(len(Action))
+                    new_policies[i][state][np.random.randint(0, len(Action))] = 1
+
+            # offspring states keep the visits of both parents, so they can be evicted like any other
+            if self.state_budget > 0:
+                visits = [self.visits.get(parent, {}) for parent in pair]
+                last_visits = [self.last_visits.get(parent, {}) for parent in pair]
+                new_visits[i] = {
+                    state: visits[0].get(state, 0) + visits[1].get(state, 0) for state in new_policies[i]}
+                new_last_visits[i] = {
+                    state: max(last_visits[0].get(state, -1), last_visits[1].get(state, -1)) for state in new_policies[i]}
+        
+        self.policies = new_policies
+        l = list(self.policies.items())
+        np.random.shuffle(l)
+        self.policies = dict(l)
+
+        self.policy_fitness = {}
+        self.fitness = {i: {} for i in range(self.max_population)}
+        self.visits = {i: new_visits.get(i, {}) for i in range(self.max_population)}
+        self.last_visits = {i: new_last_visits.get(i, {}) for i in range(self.max_population)}
+        for i in range(self.max_population):
+            self.evict(i)
+
+        # self.fitness = {}
 
-                self.policy_fitness = {}
-                self.fitness = {i: {} for i in range(self.max_population)}
 
-                # self.fitness = {}
+        self.cur_policy = 0
 
 
-                self.cur_policy = 0
+    def next_generation_dense(self) -> None:
+        """
+        next_generation over the dense population arrays, with the same selection, crossover and mutation,
+        applied to all offspring at once as [offspring, num_states] masks.
+        """
+        best = sorted(self.policy_fitness, key=lambda k: -self.policy_fitness[k])[:self.min_population]
+
+        #random combines and mutations here
+        pairs = np.random.randint(0, self.min_population, (self.max_population - self.min_population, 2))
+        fitness_0, fitness_1 = self.fitness[pairs[:, 0]], self.fitness[pairs[:, 1]]
+        seen_0, seen_1 = ~np.isnan(fitness_0), ~np.isnan(fitness_1)
+
+        # states seen by both parents take the better parent's action, the others come from the parent that saw them
+        from_0 = seen_0 & ~(seen_1 & (fitness_1 >= fitness_0))
+        from_1 = seen_1 & ~from_0
+        offspring = np.where(
+            from_0,
+            self.policies[pairs[:, 0]],
+            np.where(from_1, self.policies[pairs[:, 1]], np.int8(UNVISITED)))
+
+        # mutation
+        mutated = (seen_0 | seen_1) & (np.random.random(offspring.shape) > 1 - self.mutation_rate)
+        offspring[mutated] = np.random.randint(0, len(Action), mutated.sum())
+
+        # shuffling the fittest policies and the offspring together
+        self.policies = np.concatenate([self.policies[best], offspring])[np.random.permutation(self.max_population)]
+
+        self.policy_fitness = {}
+        self.fitness = np.full(self.policies.shape, np.nan, dtype=np.float32)
+        self.cur_policy = 0
+
+
+    def member(self, i: int) -> 'GA':
+        """
+        Get a copy of this GA that only plays policy i and never breeds, to evaluate that member elsewhere.
+
+        Parameters:
+        i (int): Index of the policy.
+
+        Returns:
+        GA: Copy holding only policy i, as its policy 0, whose fitness starts from zero.
+        """
+        member = copy.copy(self)
+        if self.dense:
+            member.policies = self.policies[i:i + 1].copy()
+            member.fitness = np.full((1, self.fitness.shape[1]), np.nan, dtype=np.float32)
+        else:
+            member.policies = {0: self.policies.setdefault(i, {})}
+            member.fitness = {0: {}}
+            member.visits = {0: self.visits.setdefault(i, {})}
+            member.last_visits = {0: self.last_visits.setdefault(i, {})}
+        member.evictions = 0
+        member.policy_fitness = {}
+        member.cur_policy = 0
+        member.num_episodes = 0
+        member.turns = 0
+        member.breed = False
+        return member
+
+
+    def run_generation(self, play_member: Callable[['GA'], Tuple['GA', Any]], pool=None) -> List[Any]:
+        """
+        Evaluate every member of the population, in parallel if a pool is given, then breed the next generation.
+
+        Parameters:
+        play_member (Callable): Plays the 4 starting-corner episodes of the given member (see member) and
+            returns it along with any result of its own. Must be picklable to run on a pool.
+        pool (multiprocessing.Pool): Pool to evaluate the members on, None to evaluate them in this process.
+
+        Returns:
+        List of the results of play_member, in member order.
+        """
+        members = [self.member(i) for i in range(self.max_population)]
+        outputs = pool.map(play_member, members) if pool is not None else map(play_member, members)
+
+        # merging the fitness of every member before selection
+        results = []
+        for i, (member, result) in enumerate(outputs):
+            self.policies[i] = member.policies[0]
+            self.policy_fitness[i] = member.policy_fitness.get(0, 0)
+            self.fitness[i] = member.fitness[0]
+            if not self.dense:
+                self.visits[i] = member.visits[0]
+                self.last_visits[i] = member.last_visits[0]
+            self.clock = max(self.clock, member.clock)
+            self.evictions += member.evictions
+            results.append(result)
+
+        self.num_episodes += 4 * self.max_population
+        self.next_generation()
+        return results
         
     def computeReward(
         self,
@@ -259,21 +602,117 @@ class GA(ActionFunction):
         return reward
 
 
+    def states_discovered(
+        self) -> int:
+        """
+        Get the number of states any policy of the population has an action for, see ActionFunction.states_discovered.
+        """
+        if self.dense:
+            return int(np.count_nonzero((self.policies != UNVISITED).any(axis=0)))
+        return len(set().union(*self.policies.values()))
+
+
+    def memory_bytes(
+        self) -> int:
+        """
+        Estimate the bytes held by the population, see ActionFunction.memory_bytes. For dict policies, the dicts
+        and one one-hot row per state of each policy, although offspring share some rows with their parents.
+        """
+        if self.dense:
+            return self.policies.nbytes + self.fitness.nbytes
+        tables = [
+            table for tables in (self.policies, self.fitness, self.visits, self.last_visits)
+            for table in tables.values()]
+        num_rows = sum(len(policy) for policy in self.policies.values())
+        return sum(sys.getsizeof(table) for table in tables) + num_rows * sys.getsizeof(np.zeros(len(Action)))
+
+
+    def checkpoint(
+        self) -> List[Tuple[str, Any]]:
+        """
+        Snapshot the fittest policies, see ActionFunction.checkpoint.
+        """
+        if self.optimal:
+            return []
+        if self.dense:
+            return [(self.policies_file, np.array(self.policies[:self.min_population]))]
+        if self.policies_file.endswith(Checkpoint.CHECKPOINT_EXTENSION):
+            return [(self.policies_file, Checkpoint.snapshotTable(policy_rows(self.policies, self.min_population)))]
+        return [(self.policies_file, copy.deepcopy({k: self.policies[k] for k in range(self.min_population)}))]
+
+
     def write_to_file(
         self) -> None:
         """
-        Write the Q-table, number of updates, and epsilon value to files.
+        Write the fittest policies to the policies file, see Checkpoint.saveTable.
+
+        Dict policies are saved as one row per state, holding the Action value of every policy (UNVISITED if none).
         """
-        if not self.optimal:
-            with open(self.policies_file, 'wb') as f:
-                pickle.dump({k: self.policies[k] for k in range(self.min_population)}, f)
+        for file_name, table in self.checkpoint():
+            Checkpoint.saveTable(file_name, table)
 
 
     def load_data(
         self) -> None:
         """
-        Load the Q-table, number of updates, and epsilon value from files.
+        Load the fittest policies from the policies file.
+
+        Optimal agents never write their policies, so dense ones are memory-mapped instead of read.
         """
-        if os.path.exists(self.policies_file):
-            with open(self.policies_file, 'rb') as f:
-                self.policies = pickle.load(f)
\ No newline at end of file
+        policies = Checkpoint.loadTable(self.policies_file, mmap=self.optimal and self.dense)
+        if policies is None:
+            return
+
+        if isinstance(policies, np.ndarray):
+            # policies saved in dense mode, the rest of the population stays unvisited
+            self.dense = True
+            self.num_tiles = round((policies.shape[1] / len(Direction)) ** 0.25)
+            if self.optimal:
+                # optimal agents only play the first policy
+                self.policies = policies
+            else:
+                self.policies = np.full((self.max_population, policies.shape[1]), UNVISITED, dtype=np.int8)
+                self.policies[:len(policies)] = policies
+            self.fitness = np.full((len(self.policies), policies.shape[1]), np.nan, dtype=np.float32)
+            return
+
+        if isinstance(policies, Checkpoint.KeyedTable):
+            # converting policies saved as one row per state
+            one_hots = np.eye(len(Action))
+            rows = list(policies.items())
+            policies = {
+                i: {state_key: one_hots[row[i]] for state_key, row in rows if row[i] != UNVISITED}
+                for i in range(len(rows[0][1]) if rows else 0)}
+        else:
+            # converting policies saved with string keys
+            policies = {i: State.convertKeys(policy) for i, policy in policies.items()}
+        if self.dense:
+            for i, policy in policies.items():
+                for state_key, one_hot in policy.items():
+                    state = State.fromKey(state_key)
+                    if not state.isStart():
+                        self.policies[i, state.index(self.num_tiles)] = np.argmax(one_hot)
+        else:
+            self.policies = policies
+
+
+def policy_rows(
+    policies: dict,
+    num_policies: int) -> dict:
+    """
+    Convert dict policies to one row per state, the layout they are saved in.
+
+    Parameters:
+    policies (dict): Policies mapping state keys to one-hot actions.
+    num_policies (int): Number of policies to convert, from the first.
+
+    Returns:
+    dict mapping each state key to int8[num_policies] Action values, UNVISITED for policies without the state.
+    """
+    rows = {}
+    for i in range(num_policies):
+        for state_key, one_hot in policies.get(i, {}).items():
+            if state_key not in rows:
+                rows[state_key] = np.full(num_policies, UNVISITED, dtype=np.int8)
+            rows[state_key][i] = np.argmax(one_hot)
+    return rows
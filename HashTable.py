@@ -0,0 +1,258 @@
+from typing import Iterator, List, Tuple
+import numpy as np
+
+# key of the slots that hold nothing, State.key is never negative
+EMPTY = -1
+# multiplier of the Fibonacci hash, 2**64 divided by the golden ratio
+HASH_MULTIPLIER = 11400714819323198485
+MAX_LOAD = 0.5
+
+
+class HashTable:
+    """
+    Open-addressing hash table from int keys to rows of value columns, all stored in numpy arrays. Fields:
+        - self.keys: np.ndarray: int64[capacity] key in each slot, EMPTY if none
+        - self.columns: List[np.ndarray]: [capacity, ...] value columns, one row per slot
+        - self.count: int: number of keys
+    Keys are placed by linear probing from their Fibonacci hash. The table doubles before it gets more than
+    MAX_LOAD full, which moves the keys to new slots, so slots are only valid until the next insert.
+    """
+    def __init__(
+        self,
+        columns: List[Tuple[tuple, type]],
+        capacity: int = 1024) -> None:
+        """
+        Initializes an empty table.
+
+        Parameters:
+        columns (List[Tuple[tuple, type]]): (shape, dtype) of the row of each value column, new rows are zeros.
+        capacity (int): Initial number of slots, rounded up to a power of 2.
+        """
+        self.column_types: List[Tuple[tuple, type]] = columns
+        self.count: int = 0
+        self.allocate(1 << max(int(capacity - 1).bit_length(), 4))
+
+
+    def allocate(
+        self,
+        capacity: int) -> None:
+        """
+        Replace the arrays with empty ones of the given capacity.
+        """
+        self.bits: int = capacity.bit_length() - 1
+        self.mask: int = capacity - 1
+        self.keys: np.ndarray = np.full(capacity, EMPTY, dtype=np.int64)
+        self.columns: List[np.ndarray] = [np.zeros((capacity, *shape), dtype=dtype) for shape, dtype in self.column_types]
+
+
+    def hash(
+        self,
+        keys: np.ndarray) -> np.ndarray:
+        """
+        Get the first slot probed for each of the given keys.
+        """
+        product = keys.astype(np.uint64) * np.uint64(HASH_MULTIPLIER)
+        return (product >> np.uint64(64 - self.bits)).astype(np.int64)
+
+
+    def find(
+        self,
+        keys: np.ndarray) -> np.ndarray:
+        """
+        Get the slots of the given keys.
+
+        Parameters:
+        keys (np.ndarray): int64[N] keys.
+
+        Returns:
+        int64[N] slots, -1 for keys not in the table.
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        slots = self.hash(keys)
+        found = np.full(len(keys), -1, dtype=np.int64)
+        pending = np.arange(len(keys))
+        while len(pending) > 0:
+            slot_keys = self.keys[slots[pending]]
+            hit = slot_keys == keys[pending]
+            found[pending[hit]] = slots[pending[hit]]
+            # probing the next slot until the key or an empty slot is reached
+            pending = pending[~hit & (slot_keys != EMPTY)]
+            slots[pending] = (slots[pending] + 1) & self.mask
+        return found
+
+
+    def insert(
+        self,
+        keys: np.ndarray) -> np.ndarray:
+        """
+        Get the slots of the given keys, adding the keys that are not in the table with rows of zeros.
+
+        Parameters:
+        keys (np.ndarray): int64[N] keys, may repeat.
+
+        Returns:
+        int64[N] slots, valid until the next insert.
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        unique, inverse = np.unique(keys, return_inverse=True)
+        slots = self.find(unique)
+        missing = slots == -1
+        if missing.any():
+            if (self.count + np.count_nonzero(missing)) > MAX_LOAD * len(self.keys):
+                self.grow(self.count + np.count_nonzero(missing))
+                slots = self.find(unique)
+                missing = slots == -1
+            slots[missing] = self.place(unique[missing])
+            self.count += int(np.count_nonzero(missing))
+        return slots[inverse]
+
+
+    def place(
+        self,
+        keys: np.ndarray) -> np.ndarray:
+        """
+        Put keys that are not in the table, all different, into empty slots.
+
+        Returns:
+        int64[N] slots the keys were put in.
+        """
+        slots = self.hash(keys)
+        pending = np.arange(len(keys))
+        while len(pending) > 0:
+            empty = np.flatnonzero(self.keys[slots[pending]] == EMPTY)
+            # of the keys probing the same empty slot, the first one takes it
+            _, first = np.unique(slots[pending[empty]], return_index=True)
+            placed = pending[empty[first]]
+            self.keys[slots[placed]] = keys[placed]
+            waiting = np.ones(len(pending), dtype=bool)
+            waiting[empty[first]] = False
+            pending = pending[waiting]
+            slots[pending] = (slots[pending] + 1) & self.mask
+        return slots
+
+
+    def grow(
+        self,
+        count: int) -> None:
+        """
+        Double the capacity until count keys fit under MAX_LOAD, moving every key and row to its new slot.
+        """
+        used = self.keys != EMPTY
+        keys = self.keys[used]
+        rows = [column[used] for column in self.columns]
+        capacity = len(self.keys)
+        while count > MAX_LOAD * capacity:
+            capacity *= 2
+        self.allocate(capacity)
+        slots = self.place(keys)
+        for column, column_rows in zip(self.columns, rows):
+            column[slots] = column_rows
+
+
+    def slot(
+        self,
+        key: int,
+        insert: bool = False) -> int:
+        """
+        Get the slot of a single key, the scalar counterpart of find and insert.
+
+        Parameters:
+        key (int): The key.
+        insert (bool): Flag to add the key with rows of zeros if it is not in the table.
+
+        Returns:
+        int: The slot, -1 if the key is not in the table and insert is False.
+        """
+        key = int(key)
+        slot = ((key * HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> (64 - self.bits)
+        keys = self.keys
+        while True:
+            slot_key = keys.item(slot)
+            if slot_key == key:
+                return slot
+            if slot_key == EMPTY:
+                break
+            slot = (slot + 1) & self.mask
+        if not insert:
+            return -1
+        if self.count + 1 > MAX_LOAD * len(self.keys):
+            self.grow(self.count + 1)
+            return self.slot(key, insert=True)
+        self.keys[slot] = key
+        self.count += 1
+        return slot
+
+
+    def arrays(
+        self,
+        column: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the keys and rows of a column, in slot order.
+
+        Returns:
+        (int64[count] keys, [count, ...] rows) tuple of copies.
+        """
+        used = self.keys != EMPTY
+        return self.keys[used], self.columns[column][used]
+
+
+class HashColumn:
+    """
+    Dict-like view of one value column of a HashTable, so code written for dicts of rows works on it.
+    Rows are views into the column, valid until the next insert.
+    """
+    def __init__(
+        self,
+        table: HashTable,
+        column: int) -> None:
+        """
+        Initializes the view.
+
+        Parameters:
+        table (HashTable): The table.
+        column (int): Index of the column in table.columns.
+        """
+        self.table: HashTable = table
+        self.column: int = column
+
+
+    def __getitem__(
+        self,
+        key: int) -> np.ndarray:
+        slot = self.table.slot(key)
+        if slot == -1:
+            raise KeyError(key)
+        return self.table.columns[self.column][slot]
+
+
+    def __setitem__(
+        self,
+        key: int,
+        row: np.ndarray) -> None:
+        slot = self.table.slot(key, insert=True)
+        self.table.columns[self.column][slot] = row
+
+
+    def __contains__(
+        self,
+        key: int) -> bool:
+        return self.table.slot(key) != -1
+
+
+    def __len__(
+        self) -> int:
+        return self.table.count
+
+
+    def __iter__(
+        self) -> Iterator[int]:
+        return iter(self.table.arrays(self.column)[0].tolist())
+
+
+    def items(
+        self) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Get every (key, row) pair, in slot order.
+        """
+        keys, rows = self.table.arrays(self.column)
+        return zip(keys.tolist(), rows)
@@ -0,0 +1,173 @@
+from ActionFunction import ActionFunction
+from typing import Callable, Tuple
+import numpy as np
+import json
+import time
+
+
+class RingBuffer:
+    """
+    Fixed-size window over the most recent values, with a running sum. Fields:
+        - self.values: np.ndarray: the window, overwritten oldest first
+        - self.count: int: number of values in the window, at most its size
+        - self.total: the sum of the values in the window
+    """
+    def __init__(
+        self,
+        size: int) -> None:
+        """
+        Initializes an empty window.
+
+        Parameters:
+        size (int): Number of values kept.
+        """
+        self.values: np.ndarray = np.zeros(size, dtype=np.int64)
+        self.next: int = 0
+        self.count: int = 0
+        self.total = 0
+
+
+    def add(
+        self,
+        value: int) -> None:
+        """
+        Add a value, dropping the oldest one if the window is full.
+
+        Parameters:
+        value (int): Value to add.
+        """
+        self.total += value - int(self.values[self.next])
+        self.values[self.next] = value
+        self.next = (self.next + 1) % len(self.values)
+        self.count = min(self.count + 1, len(self.values))
+
+
+    def full(
+        self) -> bool:
+        """
+        Check if the window holds as many values as its size.
+        """
+        return self.count == len(self.values)
+
+
+    def mean(
+        self) -> float:
+        """
+        Get the mean of the values in the window, 0 if it is empty.
+        """
+        return self.total / self.count if self.count else 0.
+
+
+class Metrics:
+    """
+    Training metrics, published every few episodes to the console and as JSON lines to a file. Fields:
+        - self.wins: RingBuffer: whether the second agent won each of the most recent episodes
+        - self.episodes / self.steps / self.ties: int: counts since the start, a step being a turn of both agents
+    Throughput, episode length and tie rate are published over the episodes since the last publish.
+    """
+    def __init__(
+        self,
+        agent1: ActionFunction,
+        agent2: ActionFunction,
+        window: int = 100,
+        publish_every: int = 1_000,
+        file_name: str = None,
+        log: Callable[[str], None] = None) -> None:
+        """
+        Initializes the metrics of a training run.
+
+        Parameters:
+        agent1 (ActionFunction): First agent.
+        agent2 (ActionFunction): Second agent, whose win rate is tracked.
+        window (int): Number of recent episodes in the rolling win rate.
+        publish_every (int): Number of episodes between publishes.
+        file_name (str): File the JSON lines are appended to, None to not write any.
+        log (Callable): Function printing a line to the console, None to not print.
+        """
+        self.agents: Tuple[ActionFunction, ActionFunction] = (agent1, agent2)
+        self.wins: RingBuffer = RingBuffer(window)
+        self.publish_every: int = publish_every
+        self.file_name: str = file_name
+        self.log: Callable[[str], None] = log
+
+        self.episodes: int = 0
+        self.steps: int = 0
+        self.ties: int = 0
+        self.start: float = time.perf_counter()
+        self.last_publish: Tuple[float, int, int, int] = (self.start, 0, 0, 0)
+
+
+    def add_episode(
+        self,
+        winner: int,
+        turns: int) -> None:
+        """
+        Record a finished episode, publishing if it is due.
+
+        Parameters:
+        winner (int): Index of the winning agent (0 or 1), -1 for a tie.
+        turns (int): Number of turns the episode took.
+        """
+        self.wins.add(1 if winner == 1 else 0)
+        self.episodes += 1
+        self.steps += int(turns)
+        self.ties += 1 if winner == -1 else 0
+        if self.episodes % self.publish_every == 0:
+            self.publish()
+
+
+    def summary(
+        self) -> dict:
+        """
+        Get the current metrics.
+
+        Returns:
+        dict of the metrics, see publish.
+        """
+        now = time.perf_counter()
+        last_time, last_episodes, last_steps, last_ties = self.last_publish
+        elapsed = max(now - last_time, 1.e-09)
+        episodes = self.episodes - last_episodes
+        return {
+            'episode': self.episodes,
+            'elapsed': now - self.start,
+            'episodes_per_sec': episodes / elapsed,
+            'steps_per_sec': (self.steps - last_steps) / elapsed,
+            'mean_episode_length': (self.steps - last_steps) / episodes if episodes else 0.,
+            'tie_rate': (self.ties - last_ties) / episodes if episodes else 0.,
+            'win_rate': self.wins.mean(),
+            'states_discovered': [agent.states_discovered() for agent in self.agents],
+            'epsilon': [getattr(agent, 'epsilon', None) for agent in self.agents],
+            'memory_bytes': [agent.memory_bytes() for agent in self.agents],
+            'evictions': [getattr(agent, 'evictions', None) for agent in self.agents],
+        }
+
+
+    def publish(
+        self) -> dict:
+        """
+        Print the current metrics and append them to the metrics file.
+
+        Returns:
+        dict of the metrics: episode count, seconds elapsed, episodes and steps per second, mean episode length
+        and tie rate since the last publish, rolling win rate of the second agent, and the states discovered,
+        epsilon, estimated table bytes and states evicted since the start of each agent (None where the agent
+        has none).
+        """
+        summary = self.summary()
+        self.last_publish = (time.perf_counter(), self.episodes, self.steps, self.ties)
+
+        if self.log is not None:
+            states = '/'.join('-' if value is None else str(value) for value in summary['states_discovered'])
+            epsilon = '/'.join('-' if value is None else f"{value:.4f}" for value in summary['epsilon'])
+            memory = '/'.join('-' if value is None else f"{value / 2 ** 20:.1f}MB" for value in summary['memory_bytes'])
+            evictions = '/'.join('-' if value is None else str(value) for value in summary['evictions'])
+            self.log(
+                f"episode {summary['episode']}: {summary['episodes_per_sec']:.1f} episodes/s, "
+                f"{summary['steps_per_sec']:.0f} steps/s, length {summary['mean_episode_length']:.1f}, "
+                f"ties {summary['tie_rate']:.0%}, win rate {summary['win_rate']:.0%}, "
+                f"states {states}, epsilon {epsilon}, memory {memory}, evictions {evictions}")
+        if self.file_name is not None:
+            with open(self.file_name, 'a') as f:
+                f.write(json.dumps(summary) + '\n')
+        return summary
@@ -0,0 +1,440 @@
+from Action import Action
+from Direction import Direction
+from Board import Board
+from BatchBoard import MOVE_ROW, MOVE_COL, IS_MOVE
+from State import State
+from GA import UNVISITED, policy_rows
+from typing import List, Tuple, Union
+import numpy as np
+import socketserver
+import threading
+import Checkpoint
+import socket
+import queue
+import json
+import time
+
+# number of most recent request latencies kept for the percentiles in Batcher.stats
+LATENCY_WINDOW = 10_000
+
+
+class Policy:
+    """
+    Greedy policy of a checkpoint, answering batches of states with one vectorized argmax. Fields:
+        - self.keys: np.ndarray: int64[K] sorted state keys, None if the scores are dense
+        - self.scores: np.ndarray: float32[K, len(Action)] score of each action in each state, indexed by State.index if dense
+        - self.legal_actions: np.ndarray: bool[num_tiles, num_tiles, len(Action)] actions allowed by the walls
+    States without scores get zeros, so the first legal action is picked.
+    """
+    def __init__(
+        self,
+        keys: np.ndarray,
+        scores: np.ndarray,
+        num_tiles: int) -> None:
+        """
+        Initializes a policy over the given scores.
+
+        Parameters:
+        keys (np.ndarray): int64[K] sorted state keys of the rows of scores, None if scores is indexed by State.index.
+        scores (np.ndarray): [K, len(Action)] score of each action, the highest legal one is played.
+        num_tiles (int): Number of tiles in one dimension of the board.
+        """
+        self.keys: np.ndarray = keys
+        self.scores: np.ndarray = scores
+        self.num_tiles: int = num_tiles
+        # walls are the same on every board
+        self.legal_actions: np.ndarray = Board(num_tiles, (0, 0), (num_tiles - 1, num_tiles - 1)).legal_actions
+
+
+    def check(
+        self,
+        states: np.ndarray) -> None:
+        """
+        Raise a ValueError unless every state is on the board: row and col in [0, num_tiles), direction a
+        Direction value, and opp_row and opp_col in [-1, num_tiles), -1 being the start state.
+
+        Parameters:
+        states (np.ndarray): int[N, 5] array of (row, col, direction, opp_row, opp_col).
+        """
+        low = np.array([0, 0, 0, -1, -1])
+        high = np.array([self.num_tiles, self.num_tiles, len(Direction), self.num_tiles, self.num_tiles])
+        outside = ((states < low) | (states >= high)).any(axis=1)
+        if outside.any():
+            raise ValueError(
+                f"State {states[np.argmax(outside)].tolist()} is not on a {self.num_tiles}x{self.num_tiles} board.")
+
+
+    def legal(
+        self,
+        states: np.ndarray) -> np.ndarray:
+        """
+        Get which actions can be taken in each state, as BatchBoard.getLegalActions.
+
+        Parameters:
+        states (np.ndarray): int[N, 5] array of (row, col, direction, opp_row, opp_col).
+
+        Returns:
+        bool[N, len(Action)] mask.
+        """
+        blocked_by_opp = (
+            (states[:, 0, np.newaxis] + MOVE_ROW == states[:, 3, np.newaxis])
+            & (states[:, 1, np.newaxis] + MOVE_COL == states[:, 4, np.newaxis])
+            & IS_MOVE)
+        return self.legal_actions[states[:, 0], states[:, 1]] & ~blocked_by_opp
+
+
+    def actions(
+        self,
+        states: np.ndarray,
+        legal: np.ndarray = None) -> np.ndarray:
+        """
+        Get the action to play in each state.
+
+        Parameters:
+        states (np.ndarray): int[N, 5] array of (row, col, direction, opp_row, opp_col).
+        legal (np.ndarray): bool[N, len(Action)] mask of actions that can be taken, None to compute it from the walls.
+
+        Returns:
+        int[N] Action values.
+        """
+        states = np.asarray(states, dtype=np.int64)
+        if legal is None:
+            legal = self.legal(states)
+        if self.keys is None:
+            # start states have no dense id
+            start = states[:, 3] == -1
+            scores = np.where(
+                start[:, np.newaxis], np.float32(0), self.scores[np.where(start, 0, State.indices(states, self.num_tiles))])
+        elif len(self.keys) == 0:
+            scores = np.zeros((len(states), len(Action)), dtype=np.float32)
+        else:
+            keys = State.keys(states)
+            rows = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+            found = self.keys[rows] == keys
+            scores = np.where(found[:, np.newaxis], self.scores[rows], np.float32(0))
+        return np.argmax(np.where(legal, scores, -np.inf), axis=1)
+
+
+def loadPolicy(
+    name: str,
+    num_tiles: int = 9) -> Policy:
+    """
+    Load the greedy policy of a checkpoint in pkl_files/: the Q-values of an RL agent, or the first (fittest)
+    policy of a GA agent, whose action scores 1.
+
+    Parameters:
+    name (str): Checkpoint name, 'rl_<name>' for q_table_<name>, 'ga_<name>' for policies_<name>.
+    num_tiles (int): Number of tiles in one dimension of the board.
+
+    Returns:
+    Policy: The policy.
+    """
+    kind, stem = name.split("_", 1)
+    if kind == "rl":
+        table = Checkpoint.loadTable(f"pkl_files/q_table_{stem}.npy", mmap=True)
+    elif kind == "ga":
+        table = Checkpoint.loadTable(f"pkl_files/policies_{stem}.npy", mmap=True)
+    else:
+        raise Exception(f"Invalid checkpoint '{name}'. Please use 'rl_<name>' or 'ga_<name>'.")
+    if table is None:
+        raise Exception(f"No checkpoint '{name}' in pkl_files/.")
+
+    if kind == "ga":
+        one_hots = np.eye(len(Action), dtype=np.float32)
+        if isinstance(table, np.ndarray):
+            actions = np.asarray(table[0])
+            return Policy(None, one_hots[actions] * (actions != UNVISITED)[:, np.newaxis], num_tiles)
+        if isinstance(table, dict):
+            table = Checkpoint.snapshotTable(
+                policy_rows({i: State.convertKeys(policy) for i, policy in table.items()}, 1))
+        visited = table.values[:, 0] != UNVISITED
+        return Policy(np.asarray(table.keys[visited]), one_hots[table.values[visited, 0]], num_tiles)
+
+    if isinstance(table, np.ndarray):
+        return Policy(None, table, num_tiles)
+    if isinstance(table, dict):
+        table = Checkpoint.snapshotTable(State.convertKeys(table))
+    return Policy(np.asarray(table.keys), np.asarray(table.values, dtype=np.float32), num_tiles)
+
+
+class Request:
+    """
+    States waiting for actions in a Batcher. Fields:
+        - self.states: np.ndarray: int[N, 5] states
+        - self.legal: np.ndarray: bool[N, len(Action)] given mask, None to compute it from the walls
+        - self.actions: np.ndarray: int[N] Action values, set once answered
+        - self.error: Exception: why the batch of the request could not be answered, None if it was
+    """
+    __slots__ = ('states', 'legal', 'actions', 'error', 'answered', 'start')
+
+    def __init__(
+        self,
+        states: np.ndarray,
+        legal: np.ndarray) -> None:
+        self.states: np.ndarray = states
+        self.legal: np.ndarray = legal
+        self.actions: np.ndarray = None
+        self.error: Exception = None
+        self.answered: threading.Event = threading.Event()
+        self.start: float = time.perf_counter()
+
+
+class Batcher:
+    """
+    Collects the requests arriving within a window of the first one and answers them together with one
+    Policy.actions call, on its own thread. Fields:
+        - self.window: float: seconds a batch waits for more requests after its first one, 0 to only take those already queued
+        - self.requests / self.states / self.batches: int: counts since the start
+    """
+    def __init__(
+        self,
+        policy: Policy,
+        window: float = 0.001,
+        max_batch: int = 4_096) -> None:
+        """
+        Initializes the batcher and starts its thread.
+
+        Parameters:
+        policy (Policy): Policy answering the requests.
+        window (float): Seconds a batch waits for more requests after its first one.
+        max_batch (int): Number of states after which a batch is answered without waiting any longer.
+        """
+        self.policy: Policy = policy
+        self.window: float = window
+        self.max_batch: int = max_batch
+        self.queue: queue.Queue = queue.Queue()
+        self.latencies: np.ndarray = np.zeros(LATENCY_WINDOW)
+        self.requests: int = 0
+        self.states: int = 0
+        self.batches: int = 0
+        self.start: float = time.perf_counter()
+        self.thread: threading.Thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+
+    def submit(
+        self,
+        states: np.ndarray,
+        legal: np.ndarray = None) -> np.ndarray:
+        """
+        Get the actions of the given states, blocking until their batch is answered.
+
+        Parameters:
+        states (np.ndarray): int[N, 5] array of (row, col, direction, opp_row, opp_col).
+        legal (np.ndarray): bool[N, len(Action)] mask of actions that can be taken, None to compute it from the walls.
+
+        Returns:
+        int[N] Action values.
+        """
+        request = Request(states, legal)
+        self.queue.put(request)
+        request.answered.wait()
+        if request.error is not None:
+            raise request.error
+        return request.actions
+
+
+    def run(
+        self) -> None:
+        """
+        Answer batches of requests until close is called.
+        """
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+            batch = [first]
+            size = len(first.states)
+            deadline = first.start + self.window
+            while size < self.max_batch:
+                try:
+                    timeout = deadline - time.perf_counter()
+                    request = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    # answering the batch before stopping
+                    self.queue.put(None)
+                    break
+                batch.append(request)
+                size += len(request.states)
+            try:
+                self.answer(batch)
+            except Exception as e:
+                # failing the batch's requests rather than the thread, which would leave every later request waiting
+                for request in batch:
+                    if not request.answered.is_set():
+                        request.error = e
+                        request.answered.set()
+
+
+    def answer(
+        self,
+        batch: List[Request]) -> None:
+        """
+        Answer a batch of requests with one Policy.actions call.
+        """
+        states = np.concatenate([request.states for request in batch])
+        legal = None
+        if any(request.legal is not None for request in batch):
+            legal = self.policy.legal(states)
+            first = 0
+            for request in batch:
+                if request.legal is not None:
+                    legal[first:first + len(request.states)] = request.legal
+                first += len(request.states)
+        actions = self.policy.actions(states, legal)
+
+        first = 0
+        now = time.perf_counter()
+        for request in batch:
+            request.actions = actions[first:first + len(request.states)]
+            first += len(request.states)
+            self.latencies[self.requests % LATENCY_WINDOW] = now - request.start
+            self.requests += 1
+            request.answered.set()
+        self.states += len(states)
+        self.batches += 1
+
+
+    def stats(
+        self) -> dict:
+        """
+        Get the latency and throughput of the requests answered since the start.
+
+        Returns:
+        dict of the window, request, state and batch counts, mean batch size, requests and states per second,
+        and the mean, median and 99th percentile request latency in milliseconds over the last LATENCY_WINDOW requests.
+        """
+        elapsed = time.perf_counter() - self.start
+        latencies = self.latencies[:min(self.requests, LATENCY_WINDOW)] * 1.e+03
+        return {
+            'window_ms': self.window * 1.e+03,
+            'requests': self.requests,
+            'states': self.states,
+            'batches': self.batches,
+            'mean_batch_size': self.states / self.batches if self.batches else 0.,
+            'requests_per_sec': self.requests / elapsed,
+            'states_per_sec': self.states / elapsed,
+            'latency_mean_ms': float(latencies.mean()) if len(latencies) else None,
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'latency_p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+        }
+
+
+    def close(
+        self) -> None:
+        """
+        Stop the thread once the queued requests are answered.
+        """
+        self.queue.put(None)
+        self.thread.join()
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Answers the JSON lines of one connection, one reply line per request line:
+        - {"states": [[row, col, direction, opp_row, opp_col], ...], "legal": [[bool] * len(Action), ...]}
+          or {"keys": [State.key, ...]}, "legal" being optional, -> {"actions": [Action value, ...]}
+        - {"stats": true} -> Batcher.stats
+    Malformed requests get {"error": message}.
+    """
+    def handle(
+        self) -> None:
+        for line in self.rfile:
+            try:
+                message = json.loads(line)
+                if message.get("stats"):
+                    reply = self.server.batcher.stats()
+                else:
+                    if "keys" in message:
+                        states = State.arrays(message["keys"])
+                    else:
+                        states = np.array(message["states"], dtype=np.int64).reshape(-1, 5)
+                    self.server.batcher.policy.check(states)
+                    legal = message.get("legal")
+                    if legal is not None:
+                        legal = np.array(legal, dtype=bool).reshape(len(states), len(Action))
+                    reply = {"actions": self.server.batcher.submit(states, legal).tolist()}
+            except Exception as e:
+                reply = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write((json.dumps(reply) + "\n").encode())
+
+
+class TCPPolicyServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class UnixPolicyServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def makeServer(
+    address: Union[Tuple[str, int], str],
+    batcher: Batcher) -> socketserver.BaseServer:
+    """
+    Make a server answering requests with the given batcher, one thread per connection.
+
+    Parameters:
+    address (Union[Tuple[str, int], str]): (host, port) to listen on over TCP, port 0 for any free port,
+        or the path of a Unix socket.
+    batcher (Batcher): Batcher answering the requests.
+
+    Returns:
+    The server, call serve_forever to start it.
+    """
+    server = (UnixPolicyServer if isinstance(address, str) else TCPPolicyServer)(address, RequestHandler)
+    server.batcher = batcher
+    return server
+
+
+class PolicyClient:
+    """
+    Connection to a policy server, sending one request at a time.
+    """
+    def __init__(
+        self,
+        address: Union[Tuple[str, int], str]) -> None:
+        """
+        Connects to the server.
+
+        Parameters:
+        address (Union[Tuple[str, int], str]): (host, port) of a TCP server, or the path of a Unix socket.
+        """
+        if isinstance(address, str):
+            self.socket: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.socket.connect(address)
+        self.file = self.socket.makefile('rwb')
+
+
+    def request(
+        self,
+        message: dict) -> dict:
+        """
+        Send a request and wait for its reply, see RequestHandler.
+        """
+        self.file.write((json.dumps(message) + "\n").encode())
+        self.file.flush()
+        reply = json.loads(self.file.readline())
+        if "error" in reply:
+            raise Exception(reply["error"])
+        return reply
+
+
+    def actions(
+        self,
+        states: np.ndarray) -> List[int]:
+        """
+        Get the actions of the given int[N, 5] states.
+        """
+        return self.request({"states": np.asarray(states).tolist()})["actions"]
+
+
+    def close(
+        self) -> None:
+        self.file.close()
+        self.socket.close()
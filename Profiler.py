@@ -0,0 +1,163 @@
+from ActionFunction import ActionFunction
+from Character import Character
+from RL import RL
+from GA import GA
+from typing import Callable, Dict, List, Tuple
+import functools
+import json
+import time
+
+# (owner, method, phase) timed by Profiler.enable, each call counted for the agent type it runs for
+HOOKS = [
+    (Character, 'next_action', 'turn'),
+    (Character, 'computeState', 'compute_state'),
+    (RL, 'apply', 'apply'),
+    (GA, 'apply', 'apply'),
+    (RL, 'apply_batch', 'apply'),
+    (GA, 'apply_batch', 'apply'),
+    (RL, 'choose_action', 'choose_action'),
+    (GA, 'choose_action', 'choose_action'),
+    (ActionFunction, 'try_action', 'try_action'),
+    (RL, 'computeReward', 'reward'),
+    (GA, 'computeReward', 'reward'),
+    (RL, 'update', 'update'),
+    (GA, 'update_fitness', 'update'),
+    (RL, 'replay_batches', 'replay'),
+    (RL, 'terminate', 'terminate'),
+    (GA, 'terminate', 'terminate'),
+    (GA, 'next_generation', 'next_generation'),
+]
+
+
+def agentName(
+    owner: object) -> str:
+    """
+    Get the agent type a hooked call runs for, from the object it is called on.
+    """
+    if isinstance(owner, Character):
+        owner = owner.action_fn
+    return type(owner).__name__
+
+
+class Profiler:
+    """
+    Times the phases of the turn loop by wrapping the functions that run them, see HOOKS.
+    Nothing is wrapped until enable is called, so the turn loop costs nothing extra when profiling is off. Fields:
+        - self.stats: dict: (agent, phase) -> [seconds, self seconds, calls], self seconds leaving out hooked calls made inside
+    """
+    def __init__(
+        self) -> None:
+        """
+        Initializes a profiler with no hooks installed.
+        """
+        self.stats: Dict[Tuple[str, str], List[float]] = {}
+        self.stack: List[float] = []
+        self.originals: List[Tuple[object, str, Callable]] = []
+
+
+    def hook(
+        self,
+        owner: object,
+        name: str,
+        phase: str,
+        agent: str = None) -> None:
+        """
+        Time every call of owner.name as the given phase until disable is called.
+
+        Parameters:
+        owner (object): Class or module holding the function.
+        name (str): Name of the function.
+        phase (str): Phase the calls are counted in.
+        agent (str): Agent type the calls are counted for, None to take it from the first argument (see agentName).
+        """
+        function = getattr(owner, name)
+        stats, stack = self.stats, self.stack
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            key = (agent or agentName(args[0]), phase)
+            stack.append(0.)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                entry = stats.get(key)
+                if entry is None:
+                    entry = stats[key] = [0., 0., 0]
+                entry[0] += elapsed
+                entry[1] += elapsed - children
+                entry[2] += 1
+
+        self.originals.append((owner, name, function))
+        setattr(owner, name, timed)
+
+
+    def enable(
+        self) -> 'Profiler':
+        """
+        Install the hooks of HOOKS.
+
+        Returns:
+        Profiler: This profiler.
+        """
+        for owner, name, phase in HOOKS:
+            self.hook(owner, name, phase)
+        return self
+
+
+    def disable(
+        self) -> None:
+        """
+        Remove every hook, restoring the original functions.
+        """
+        for owner, name, function in reversed(self.originals):
+            setattr(owner, name, function)
+        self.originals = []
+
+
+    def summary(
+        self) -> dict:
+        """
+        Get the aggregated profile.
+
+        Returns:
+        dict mapping each agent type to a dict mapping each phase to its seconds, self_seconds, calls and
+        mean_us (microseconds per call).
+        """
+        profile = {}
+        for (agent, phase), (seconds, self_seconds, calls) in sorted(self.stats.items()):
+            profile.setdefault(agent, {})[phase] = {
+                'seconds': seconds,
+                'self_seconds': self_seconds,
+                'calls': calls,
+                'mean_us': seconds / calls * 1.e+06,
+            }
+        return profile
+
+
+    def table(
+        self) -> str:
+        """
+        Get the profile as a text table, the phases with the most self time first.
+        """
+        total = sum(entry[1] for entry in self.stats.values()) or 1.
+        lines = [f"{'agent':<10} {'phase':<16} {'calls':>10} {'total (s)':>10} {'self (s)':>10} {'self %':>7} {'us/call':>9}"]
+        for (agent, phase), (seconds, self_seconds, calls) in sorted(self.stats.items(), key=lambda item: -item[1][1]):
+            lines.append(
+                f"{agent:<10} {phase:<16} {calls:>10} {seconds:>10.3f} {self_seconds:>10.3f} "
+                f"{self_seconds / total:>7.1%} {seconds / calls * 1.e+06:>9.2f}")
+        return '\n'.join(lines)
+
+
+    def write(
+        self,
+        file_name: str) -> None:
+        """
+        Write the profile to the given file as JSON, see summary.
+        """
+        with open(file_name, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
@@ -1,30 +1,56 @@
-from ActionFunction import ActionFunction, InvalidMove, NoAmmo
+from ActionFunction import ActionFunction
 from Action import Action
 from Direction import Direction
 from Board import Board
+from BatchBoard import BatchBoard
 from State import State
+from HashTable import HashTable, HashColumn, MAX_LOAD
+from Replay import ReplayBuffer
+import Checkpoint
 import numpy as np
-import pickle
-import os
-from typing import Tuple, List
+import sys
+from typing import Any, Tuple, List
 
 class RL(ActionFunction):
     def __init__(
         self, 
         decay: float = 0.99999, 
         optimal: bool = False,
-        q_table_file: str = 'q_table.pkl',
-        num_updates_file: str = 'num_updates.pkl',
-        epsilon_file: str = 'epsilon.pkl'):
+        q_table_file: str = 'q_table.npy',
+        num_updates_file: str = 'num_updates.npy',
+        epsilon_file: str = 'epsilon.npy',
+        dense: bool = False,
+        sparse: bool = False,
+        replay_size: int = 0,
+        replay_batch: int = 256,
+        replay_every: int = 64,
+        num_tiles: int = 9):
         """
         Initialize the RL class.
 
         Parameters:
         decay (float): Decay rate for epsilon.
         optimal (bool): Flag to indicate if the agent should act optimally.
+        dense (bool): Flag to store the tables as arrays indexed by State.index instead of dicts.
+        sparse (bool): Flag to store the tables in a HashTable keyed by State.key instead of dicts, for boards too big
+            for dense tables.
+        replay_size (int): Number of transitions kept for experience replay, 0 to update the tables on every step instead.
+        replay_batch (int): Number of transitions replayed in each batched update.
+        replay_every (int): Number of transitions recorded between batched updates.
+        num_tiles (int): Number of tiles in one dimension of the board, used by the dense tables.
         """
+        self.dense: bool = dense
+        self.sparse: bool = sparse and not dense
+        self.table: HashTable = None
+        self.replay: ReplayBuffer = ReplayBuffer(replay_size) if replay_size > 0 else None
+        self.replay_batch: int = replay_batch
+        self.replay_every: int = replay_every
+        self.num_tiles: int = num_tiles
         self.q_table: dict = {}
         self.num_updates: dict = {}
+        if dense:
+            self.q_table = np.zeros((State.numStates(num_tiles), len(Action)), dtype=np.float32)
+            self.num_updates = np.zeros((State.numStates(num_tiles), len(Action)), dtype=np.uint32)
         self.epsilon: float = 1
         self.decay: float = decay
         self.gamma: float = 0.9
@@ -63,24 +89,11 @@ class RL(ActionFunction):
         """
         # if non-start state, then update q_table for state-action pair using state_prime
         if (not self.optimal) and (not state.isStart()):
-            # initializing states in data structures
-            state_str = str(state)
-            state_prime_str = str(state_prime)
-            self.initialize_states([state_str, state_prime_str])
-
-            # calculating eta using the number of updates associated with given state-action pair
-            eta = 1/(1 + self.num_updates[state_str][action.value])
-
-            # updating num_updates table for given state-action pair
-            self.num_updates[state_str][action.value] += 1
-            
             # getting reward for the given state-action pair    
             reward = self.computeReward(state, action, state_prime, board)
 
             # updating q_table with reward
-            self.q_table[state_str][action.value] = (
-                (1 - eta) * self.q_table[state_str][action.value]
-                + (eta) * (reward + (self.gamma * np.max(self.q_table[state_prime_str]))))
+            self.update(state, action, state_prime, reward)
 
         new_state, new_action, new_board = self.choose_action(state_prime, board)
 
@@ -101,25 +114,10 @@ class RL(ActionFunction):
         Returns:
         tuple: Updated state-action pair after applying the action.
         """
-        while True:
-            try:
-                # initializing states in data structures
-                state_str = str(state)
-                self.initialize_states([state_str])
-
-                # picking action to play
-                new_action = None
-                if not self.optimal and (np.random.random() <= self.epsilon):
-                    # picking random action that is not invalid
-                    new_action = Action(np.random.choice(np.where(self.q_table[state_str] != -1.e+10)[0]))
-                else:
-                    # picking best action
-                    new_action = Action(np.argmax(self.q_table[state_str]))
-                new_state, new_board = self.try_action(state, new_action, board)
-                return new_state, new_action, new_board
-            except InvalidMove:
-                self.q_table[state_str][new_action.value] = -1.e+10
-                continue
+        legal = board.getLegalActions((state.row, state.col), (state.opp_row, state.opp_col))
+        new_action = self.pick_action(state, legal)
+        new_state, new_board = self.try_action(state, new_action, board)
+        return new_state, new_action, new_board
 
         
     def computeReward(
@@ -176,66 +174,473 @@ class RL(ActionFunction):
         won (bool): Flag to indicate if the agent has won.
         """
         if not self.optimal:
-            # initializing states in data structures
-            state_str = str(state)
-            state_prime_str = str(state_prime)
-            self.initialize_states([state_str, state_prime_str])
+            # updating q_table with the terminal reward
+            self.update(state, action, state_prime, 1.e+06 if won else -1.e+06, done=True)
+            
+            self.decay_epsilon()
 
-            # calculating eta using the number of updates associated with given state-action pair
-            eta = 1/(1 + self.num_updates[state_str][action.value])
 
-            # updating num_updates table for given state-action pair
-            self.num_updates[state_str][action.value] += 1
+    def update(
+        self,
+        state: State,
+        action: Action,
+        state_prime: State,
+        reward: float,
+        done: bool = False) -> None:
+        """
+        Update the Q-value of the given state-action pair, or record the transition for replay_batches.
 
-            # updating q_table with reward
-            self.q_table[state_str][action.value] = (
-                    (1 - eta) * self.q_table[state_str][action.value]
-                    + (eta) * ((1.e+06 if won else -1.e+06) + (self.gamma * np.max(self.q_table[state_prime_str]))))
-            
-            self.decay_epsilon()
+        Parameters:
+        state (State): state.
+        action (Action): action.
+        state_prime (State): state prime.
+        reward (float): Reward for the given state-action pair.
+        done (bool): Flag to indicate the game ended, only used by replay_batches.
+        """
+        # initializing states in data structures
+        state_key = self.key(state)
+        state_prime_key = self.key(state_prime)
+        if self.replay is not None:
+            self.replay.add(state_key, action.value, reward, state_prime_key, done)
+            self.replay_batches(1)
+            return
+        self.initialize_states([state_key, state_prime_key])
+
+        # calculating eta using the number of updates associated with given state-action pair
+        eta = 1/(1 + self.num_updates[state_key][action.value])
+
+        # updating num_updates table for given state-action pair
+        self.num_updates[state_key][action.value] += 1
+
+        # updating q_table with reward
+        self.q_table[state_key][action.value] = (
+            (1 - eta) * self.q_table[state_key][action.value]
+            + (eta) * (reward + (self.gamma * np.max(self.q_table[state_prime_key]))))
+
+
+    def apply_batch(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        states_prime: np.ndarray,
+        legal: np.ndarray,
+        board: BatchBoard) -> np.ndarray:
+        """
+        Apply the RL algorithm to a batch of games stepped by a BatchBoard.
+
+        Parameters:
+        states (np.ndarray): int[N, 5] previous states.
+        actions (np.ndarray): int[N] previous Action values.
+        states_prime (np.ndarray): int[N, 5] current states.
+        legal (np.ndarray): bool[N, len(Action)] mask of actions that can be taken.
+        board (BatchBoard): The batched game boards.
+
+        Returns:
+        int[N] Action values to play.
+        """
+        if self.dense or self.sparse:
+            return self.apply_batch_dense(states, actions, states_prime, legal)
+
+        new_actions = np.empty(len(states), dtype=np.int64)
+        for i in range(len(states)):
+            state = State.fromArray(states[i])
+            state_prime = State.fromArray(states_prime[i])
+
+            if (not self.optimal) and (not state.isStart()):
+                action = Action(int(actions[i]))
+                self.update(state, action, state_prime, self.computeReward(state, action, state_prime, board))
 
+            new_actions[i] = self.pick_action(state_prime, legal[i]).value
+        return new_actions
 
-    def initialize_states(self, states: List[State]) -> None:
+
+    def pick_action(
+        self,
+        state: State,
+        legal: np.ndarray) -> Action:
+        """
+        Pick an action among the legal ones, marking the others as invalid in the q_table.
+
+        Parameters:
+        state (State): state.
+        legal (np.ndarray): bool[len(Action)] mask of actions that can be taken.
+
+        Returns:
+        Action: The action to play.
+        """
+        state_key = self.key(state)
+        self.initialize_states([state_key])
+        self.q_table[state_key][~legal] = -1.e+10
+
+        if not self.optimal and (np.random.random() <= self.epsilon):
+            # picking random action that is not invalid
+            return Action(np.random.choice(np.where(self.q_table[state_key] != -1.e+10)[0]))
+        # picking best action
+        return Action(np.argmax(self.q_table[state_key]))
+
+
+    def apply_batch_dense(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        states_prime: np.ndarray,
+        legal: np.ndarray) -> np.ndarray:
+        """
+        Vectorized apply_batch over the dense tables, or the arrays of the sparse table.
+
+        Parameters:
+        states (np.ndarray): int[N, 5] previous states.
+        actions (np.ndarray): int[N] previous Action values.
+        states_prime (np.ndarray): int[N, 5] current states.
+        legal (np.ndarray): bool[N, len(Action)] mask of actions that can be taken.
+
+        Returns:
+        int[N] Action values to play.
+        """
+        updated = states[:, 3] != -1
+        # same reward as computeReward
+        rewards = np.where(actions[updated] == Action.SHOOT.value, -500., -100.)
+        if not self.optimal and self.replay is not None:
+            self.replay.add_batch(
+                self.batch_keys(states[updated]),
+                actions[updated],
+                rewards,
+                self.batch_keys(states_prime[updated]),
+                False)
+            self.replay_batches(np.count_nonzero(updated))
+
+        # ids are taken after replaying, which can grow the sparse table and move its slots
+        state_ids, state_primes = self.batch_ids(states[updated], states_prime)
+        if not self.optimal and self.replay is None:
+            # updating q_table for every non-start state-action pair using state_prime
+            self.update_dense(state_ids, actions[updated], state_primes[updated], rewards)
+
+        # marking invalid actions, then picking the best or, with probability epsilon, a random valid action
+        q_table, _ = self.arrays()
+        q_values = np.where(legal, q_table[state_primes], np.float32(-1.e+10))
+        q_table[state_primes] = q_values
+        new_actions = np.argmax(q_values, axis=1)
+        if not self.optimal:
+            explore = np.random.random(len(states)) <= self.epsilon
+            random_actions = np.argmax(np.random.random(q_values.shape) * (q_values != np.float32(-1.e+10)), axis=1)
+            new_actions = np.where(explore, random_actions, new_actions)
+        return new_actions
+
+
+    def update_dense(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        state_primes: np.ndarray,
+        rewards: np.ndarray) -> None:
+        """
+        Vectorized update over the dense tables, or the arrays of the sparse table, for state ids as returned by batch_ids.
+
+        A state-action pair occurring several times is updated once per occurrence, as with update.
+
+        Parameters:
+        states (np.ndarray): int[N] state ids.
+        actions (np.ndarray): int[N] Action values.
+        state_primes (np.ndarray): int[N] state prime ids.
+        rewards (np.ndarray): float[N] rewards.
+        """
+        q_table, num_updates = self.arrays()
+        pending = np.arange(len(states))
+        while len(pending) > 0:
+            # updating the first occurrence of each state-action pair in this round
+            _, first = np.unique(states[pending] * len(Action) + actions[pending], return_index=True)
+            cur = pending[first]
+            pending = np.delete(pending, first)
+
+            eta = 1 / (1 + num_updates[states[cur], actions[cur]].astype(np.float64))
+            num_updates[states[cur], actions[cur]] += 1
+            q_table[states[cur], actions[cur]] = (
+                (1 - eta) * q_table[states[cur], actions[cur]]
+                + eta * (rewards[cur] + self.gamma * np.max(q_table[state_primes[cur]], axis=1)))
+
+
+    def batch_ids(
+        self,
+        *batches: np.ndarray) -> List[np.ndarray]:
+        """
+        Get the row ids of batches of states in the arrays of the tables, see arrays.
+
+        In sparse mode the states missing from the table are added, all batches at once so no id moves.
+
+        Parameters:
+        batches (np.ndarray): int[N, 5] arrays of (row, col, direction, opp_row, opp_col).
+
+        Returns:
+        int[N] row ids for each batch: State.indices in dense mode, else slots of the sparse table.
+        """
+        if not self.sparse:
+            return [State.indices(batch, self.num_tiles) for batch in batches]
+        ids = self.table.insert(State.keys(np.concatenate(batches)))
+        return np.split(ids, np.cumsum([len(batch) for batch in batches])[:-1])
+
+
+    def batch_keys(
+        self,
+        states: np.ndarray) -> np.ndarray:
+        """
+        Get the keys of a batch of states, as key: State.indices in dense mode, else State.keys.
+        """
+        if self.dense:
+            return State.indices(states, self.num_tiles)
+        return State.keys(states)
+
+
+    def replay_batches(
+        self,
+        recorded: int) -> None:
+        """
+        Run a batched update of replay_batch transitions sampled from the replay buffer
+        for every replay_every transitions recorded, see update_replay.
+
+        Parameters:
+        recorded (int): Number of transitions just recorded.
+        """
+        added = self.replay.added
+        for _ in range(added // self.replay_every - (added - recorded) // self.replay_every):
+            batch = self.replay.sample(self.replay_batch)
+            self.update_replay(
+                batch['state'], batch['action'].astype(np.int64), batch['reward'], batch['state_prime'], batch['done'])
+
+
+    def update_replay(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        states_prime: np.ndarray,
+        dones: np.ndarray) -> None:
+        """
+        Vectorized update for a batch of replayed transitions, the targets computed from the Q-values before the batch.
+
+        As eta is 1 / (1 + number of updates), a Q-value is the mean of its targets, so the targets of a
+        state-action pair occurring several times are summed (np.bincount, as np.add.at) and applied at once.
+        Targets of transitions ending a game are not bootstrapped from the state prime.
+
+        Parameters:
+        states (np.ndarray): int[N] state keys, as key.
+        actions (np.ndarray): int[N] Action values.
+        rewards (np.ndarray): float[N] rewards.
+        states_prime (np.ndarray): int[N] state prime keys, as key.
+        dones (np.ndarray): bool[N] flags of the transitions ending a game.
+        """
+        if not (self.dense or self.sparse):
+            self.initialize_states(np.unique(np.concatenate([states, states_prime])).tolist())
+            next_values = np.array([np.max(self.q_table[state_key]) for state_key in states_prime.tolist()])
+        else:
+            if self.sparse:
+                # keys become slots, states and state primes at once so no slot moves
+                states, states_prime = np.split(self.table.insert(np.concatenate([states, states_prime])), 2)
+            q_table, num_updates = self.arrays()
+            next_values = np.max(q_table[states_prime], axis=1)
+        targets = rewards + self.gamma * np.where(dones, 0., next_values)
+
+        pairs, inverse = np.unique(np.stack([states, actions], axis=1), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        counts = np.bincount(inverse)
+        sums = np.bincount(inverse, weights=targets)
+        rows, cols = pairs[:, 0], pairs[:, 1]
+
+        if self.dense or self.sparse:
+            n = num_updates[rows, cols].astype(np.float64)
+            q_table[rows, cols] += (sums - counts * q_table[rows, cols]) / (n + counts)
+            num_updates[rows, cols] += counts.astype(num_updates.dtype)
+            return
+        for state_key, col, count, total in zip(rows.tolist(), cols.tolist(), counts.tolist(), sums.tolist()):
+            q_values = self.q_table[state_key]
+            updates = self.num_updates[state_key]
+            q_values[col] += (total - count * q_values[col]) / (updates[col] + count)
+            updates[col] += count
+
+
+    def arrays(
+        self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the q and num_updates arrays indexed by batch_ids, in dense or sparse mode.
+        """
+        if self.sparse:
+            return self.table.columns[0], self.table.columns[1]
+        return self.q_table, self.num_updates
+
+
+    def key(
+        self,
+        state: State):
+        """
+        Get the key of the given state in the q and num_updates tables.
+
+        Parameters:
+        state (State): state.
+
+        Returns:
+        int id (State.index) in dense mode, else State.key.
+        """
+        return state.index(self.num_tiles) if self.dense else state.key
+
+
+    def initialize_states(self, state_keys: List[int]) -> None:
         """
         Initialize the q and num_updates table with the given states.
 
         Parameters:
-        states (List[State]): List of states to initialize the q and num_updates table.
+        state_keys (List[int]): List of state keys to initialize the q and num_updates table.
+        """
+        if self.dense:
+            # dense tables already hold every state
+            return
+        if self.sparse:
+            for state_key in state_keys:
+                self.table.slot(state_key, insert=True)
+            return
+        for state_key in state_keys:
+            if state_key not in self.q_table:
+                self.q_table[state_key] = np.zeros(len(Action))
+            if state_key not in self.num_updates:
+                self.num_updates[state_key] = np.zeros(len(Action))
+
+
+    def states_discovered(
+        self) -> int:
         """
-        for state in states:
-            state_str = str(state)
-            if state_str not in self.q_table:
-                self.q_table[state_str] = np.zeros(len(Action))
-            if state_str not in self.num_updates:
-                self.num_updates[state_str] = np.zeros(len(Action))
+        Get the number of states with at least one update, see ActionFunction.states_discovered.
+        Tables hold every state in dense mode and states are added before they are updated otherwise, so the states
+        in the Q-table are not counted.
+        """
+        if self.dense:
+            return int(np.count_nonzero(self.num_updates.any(axis=1)))
+        if self.sparse:
+            return int(np.count_nonzero(self.table.arrays(1)[1].any(axis=1)))
+        return sum(1 for _, updates in self.num_updates.items() if np.any(updates))
+
+
+    def memory_bytes(
+        self) -> int:
+        """
+        Estimate the bytes held by the Q-table and number of updates, see ActionFunction.memory_bytes.
+        """
+        if self.sparse:
+            return self.table.keys.nbytes + sum(column.nbytes for column in self.table.columns)
+        total = 0
+        for table in (self.q_table, self.num_updates):
+            if isinstance(table, np.ndarray):
+                total += table.nbytes
+            elif isinstance(table, Checkpoint.KeyedTable):
+                total += table.keys.nbytes + table.values.nbytes
+            else:
+                # dicts of one row per state
+                total += sys.getsizeof(table) + len(table) * sys.getsizeof(np.zeros(len(Action)))
+        return total
+
+
+    def checkpoint(
+        self) -> List[Tuple[str, Any]]:
+        """
+        Snapshot the Q-table, number of updates, and epsilon value, see ActionFunction.checkpoint.
+        """
+        if self.optimal:
+            return []
+        return [
+            (self.q_table_file, Checkpoint.snapshotTable(self.q_table)),
+            (self.num_updates_file, Checkpoint.snapshotTable(self.num_updates)),
+            (self.epsilon_file, self.epsilon)]
 
 
     def write_to_file(
         self) -> None:
         """
-        Write the Q-table, number of updates, and epsilon value to files.
+        Write the Q-table, number of updates, and epsilon value to files, see Checkpoint.saveTable.
         """
-        if not self.optimal:
-            with open(self.q_table_file, 'wb') as f:
-                pickle.dump(self.q_table, f)
-            with open(self.num_updates_file, 'wb') as f:
-                pickle.dump(self.num_updates, f)
-            with open(self.epsilon_file, 'wb') as f:
-                pickle.dump(self.epsilon, f)
+        for file_name, table in self.checkpoint():
+            Checkpoint.saveTable(file_name, table)
 
 
     def load_data(
         self) -> None:
         """
         Load the Q-table, number of updates, and epsilon value from files.
+
+        Optimal agents never write their tables, so they memory-map them instead of reading them.
+        """
+        q_table = Checkpoint.loadTable(self.q_table_file, mmap=self.optimal)
+        if q_table is not None:
+            self.q_table = q_table
+        num_updates = Checkpoint.loadTable(self.num_updates_file, mmap=self.optimal)
+        if num_updates is not None:
+            self.num_updates = num_updates
+
+        if isinstance(self.q_table, np.ndarray):
+            # tables saved in dense mode
+            self.dense = True
+            self.num_tiles = round((len(self.q_table) / len(Direction)) ** 0.25)
+            self.sparse = False
+        else:
+            if isinstance(self.q_table, dict):
+                # converting tables saved with string keys
+                self.q_table = State.convertKeys(self.q_table)
+                self.num_updates = State.convertKeys(self.num_updates)
+            elif not (self.optimal or self.sparse):
+                # reading the rows of tables that are going to be trained
+                self.q_table = dict(self.q_table.items())
+                self.num_updates = dict(self.num_updates.items())
+            if self.dense:
+                self.q_table = self.to_dense(self.q_table, np.float32)
+                self.num_updates = self.to_dense(self.num_updates, np.uint32)
+            elif self.sparse:
+                self.to_sparse(self.q_table, self.num_updates)
+        epsilon = Checkpoint.loadTable(self.epsilon_file)
+        if epsilon is not None:
+            self.epsilon = epsilon
+            self.epsilon *= self.decay
+
+
+    def to_dense(
+        self,
+        table: dict,
+        dtype: type) -> np.ndarray:
+        """
+        Convert a table keyed by State.key into a dense array indexed by State.index.
+
+        Parameters:
+        table (dict): Table mapping state keys to per-action values.
+        dtype (type): dtype of the dense array.
+
+        Returns:
+        [State.numStates(num_tiles), len(Action)] array, zero for states missing from the table.
+        """
+        dense = np.zeros((State.numStates(self.num_tiles), len(Action)), dtype=dtype)
+        for state_key, values in table.items():
+            state = State.fromKey(state_key)
+            if not state.isStart():
+                dense[state.index(self.num_tiles)] = values
+        return dense
+
+
+    def to_sparse(
+        self,
+        q_table: Any,
+        num_updates: Any) -> None:
+        """
+        Move the tables keyed by State.key into a HashTable, and make q_table and num_updates its columns.
+
+        Parameters:
+        q_table (Any): dict or KeyedTable mapping state keys to Q-values.
+        num_updates (Any): dict or KeyedTable mapping state keys to numbers of updates.
         """
-        if os.path.exists(self.q_table_file):
-            with open(self.q_table_file, 'rb') as f:
-                self.q_table = pickle.load(f)
-        if os.path.exists(self.num_updates_file):
-            with open(self.num_updates_file, 'rb') as f:
-                self.num_updates = pickle.load(f)
-        if os.path.exists(self.epsilon_file):
-            with open(self.epsilon_file, 'rb') as f:
-                self.epsilon = pickle.load(f)
-                self.epsilon *= self.decay
\ No newline at end of file
+        self.table = HashTable(
+            [((len(Action),), np.float32), ((len(Action),), np.uint32)],
+            capacity=int(len(q_table) / MAX_LOAD) + 1)
+        for column, source in enumerate((q_table, num_updates)):
+            if isinstance(source, Checkpoint.KeyedTable) and not source.rows:
+                keys, values = source.keys, source.values
+            else:
+                items = list(source.items())
+                keys = np.array([state_key for state_key, _ in items], dtype=np.int64)
+                values = np.array([value for _, value in items])
+            if len(keys) > 0:
+                self.table.columns[column][self.table.insert(keys)] = values
+        self.q_table = HashColumn(self.table, 0)
+        self.num_updates = HashColumn(self.table, 1)
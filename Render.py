@@ -0,0 +1,149 @@
+from Tile import Tile
+from Direction import Direction
+import pygame
+import time
+from typing import Dict, Tuple
+
+# only the GUI's render process imports this module, so the training process never loads pygame
+
+TILE_COLORS = {
+    Tile.EMPTY: (255, 255, 255), #white
+    Tile.STATION: (255, 223, 0), #gold
+    Tile.WALL: (0, 0, 0), #black
+    Tile.CHARACTER: (255, 255, 255), #tank on white background
+    Tile.CHARACTER_ON_STATION: (255, 223, 0), #tank on white background
+}
+
+
+class SpriteCache:
+    """
+    Sprites loaded from images/ once and kept scaled to the tile size, per rotation.
+    """
+    def __init__(
+        self,
+        tile_size: int) -> None:
+        """
+        Initializes an empty cache for the given tile size.
+
+        Parameters:
+        tile_size (int): Size of each tile.
+        """
+        self.tile_size: int = tile_size
+        self.sprites: Dict[Tuple[str, int], pygame.Surface] = {}
+
+
+    def get(
+        self,
+        image_file: str,
+        direction: int = Direction.UP.value) -> pygame.Surface:
+        """
+        Get the given image scaled to 90% of a tile and rotated to face the given direction.
+
+        Parameters:
+        image_file (str): File name in images/.
+        direction (int): Direction value the sprite should face, images face up.
+
+        Returns:
+        Surface: The cached sprite.
+        """
+        key = (image_file, direction)
+        if key not in self.sprites:
+            if (image_file, Direction.UP.value) not in self.sprites:
+                sprite = pygame.image.load(f"images/{image_file}").convert_alpha()
+                self.sprites[(image_file, Direction.UP.value)] = pygame.transform.scale(
+                    sprite, (self.tile_size * .9, self.tile_size * .9))
+            self.sprites[key] = pygame.transform.rotate(self.sprites[(image_file, Direction.UP.value)], direction * -90)
+        return self.sprites[key]
+
+
+class Renderer:
+    """
+    Draws frames on the game window, repainting only the tiles that changed since the last frame.
+
+    A frame is a (tiles, characters) tuple, see RenderProcess.makeFrame:
+        - tiles: bytes: Tile value of every cell, row by row
+        - characters: tuple of (row, col, direction, tank_file, alive) per character
+    """
+    def __init__(
+        self,
+        num_tiles: int,
+        tile_size: int) -> None:
+        """
+        Opens the game window.
+
+        Parameters:
+        num_tiles (int): Number of tiles in one dimension of the square board.
+        tile_size (int): Size of each tile.
+        """
+        pygame.init()
+        self.num_tiles: int = num_tiles
+        self.tile_size: int = tile_size
+        self.canvas: pygame.Surface = pygame.display.set_mode((num_tiles * tile_size, num_tiles * tile_size))
+        self.sprites: SpriteCache = SpriteCache(tile_size)
+        self.last_frame = None
+
+
+    def draw(
+        self,
+        frame) -> None:
+        """
+        Draw the given frame, updating only the parts of the window that changed.
+
+        Parameters:
+        frame: (tiles, characters) tuple.
+        """
+        tiles, characters = frame
+        if self.last_frame is None:
+            dirty = set(range(len(tiles)))
+        else:
+            last_tiles, last_characters = self.last_frame
+            dirty = {i for i in range(len(tiles)) if tiles[i] != last_tiles[i]}
+            for character in set(characters) ^ set(last_characters):
+                dirty.add(character[0] * self.num_tiles + character[1])
+
+        if not dirty:
+            return
+
+        rects = []
+        for i in dirty:
+            row, col = divmod(i, self.num_tiles)
+            rect = pygame.Rect(col * self.tile_size, row * self.tile_size, self.tile_size, self.tile_size)
+            pygame.draw.rect(self.canvas, TILE_COLORS[Tile(tiles[i])], rect)
+            pygame.draw.rect(self.canvas, (0,0,0), rect, 1)
+            rects.append(rect)
+
+        for row, col, direction, tank_file, alive in characters:
+            if row * self.num_tiles + col not in dirty:
+                continue
+            position = (self.tile_size * 0.05 + col * self.tile_size, self.tile_size * 0.05 + row * self.tile_size)
+            self.canvas.blit(self.sprites.get(tank_file, direction), position)
+            if not alive:
+                self.canvas.blit(self.sprites.get("cross.png"), position)
+
+        pygame.display.update(rects)
+        self.last_frame = frame
+
+
+def run(
+    frames,
+    num_tiles: int,
+    tile_size: int,
+    frame_delay: float) -> None:
+    """
+    Draw frames from the given queue until None is received. Entry point of the render process.
+
+    Parameters:
+    frames (Queue): Queue of frames to draw.
+    num_tiles (int): Number of tiles in one dimension of the square board.
+    tile_size (int): Size of each tile.
+    frame_delay (float): Seconds to show each frame for.
+    """
+    renderer = Renderer(num_tiles, tile_size)
+    while True:
+        frame = frames.get()
+        if frame is None:
+            break
+        renderer.draw(frame)
+        pygame.event.pump()
+        time.sleep(frame_delay)
+    pygame.quit()
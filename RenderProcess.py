@@ -0,0 +1,106 @@
+from Board import Board
+from Character import Character
+import multiprocessing as mp
+import queue
+
+
+class RenderProcess:
+    """
+    Shows games in a separate process, fed through a bounded queue of frames. Fields:
+        - self.frames: Queue: frames waiting to be drawn
+        - self.dropped: int: number of frames dropped because the queue was full
+    Frames are dropped instead of blocking, so training never waits on the window, unless drop_frames is False.
+    """
+    def __init__(
+        self,
+        num_tiles: int,
+        tile_size: int,
+        queue_size: int = 64,
+        frame_delay: float = .05,
+        drop_frames: bool = True) -> None:
+        """
+        Starts the render process.
+
+        Parameters:
+        num_tiles (int): Number of tiles in one dimension of the square board.
+        tile_size (int): Size of each tile.
+        queue_size (int): Maximum number of frames waiting to be drawn.
+        frame_delay (float): Seconds to show each frame for.
+        drop_frames (bool): Flag to drop frames when the queue is full, else to wait for room in it.
+        """
+        self.frames = mp.Queue(queue_size)
+        self.drop_frames: bool = drop_frames
+        self.dropped: int = 0
+        self.process = mp.Process(
+            target=runRenderer,
+            args=(self.frames, num_tiles, tile_size, frame_delay),
+            daemon=True)
+        self.process.start()
+
+
+    def submit(
+        self,
+        board: Board,
+        player1: Character,
+        player2: Character) -> bool:
+        """
+        Queue a frame of the given game, dropping it if the render process is behind and drop_frames is set.
+
+        Parameters:
+        board (Board): The game board.
+        player1 (Character): First character.
+        player2 (Character): Second character.
+
+        Returns:
+        bool: True if the frame was queued, False if it was dropped.
+        """
+        try:
+            self.frames.put(makeFrame(board, player1, player2), block=not self.drop_frames)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+
+    def close(
+        self) -> None:
+        """
+        Wait for the queued frames to be drawn, then stop the render process.
+        """
+        self.frames.put(None)
+        self.process.join()
+
+
+def makeFrame(
+    board: Board,
+    player1: Character,
+    player2: Character):
+    """
+    Snapshot the given game as a small picklable frame for Render.Renderer.
+
+    Parameters:
+    board (Board): The game board.
+    player1 (Character): First character.
+    player2 (Character): Second character.
+
+    Returns:
+    (tiles, characters) tuple, see Render.Renderer.
+    """
+    tiles = bytes(tile.value for row in board.getGrid() for tile in row)
+    characters = tuple(
+        (
+            player.state_halfprime.row,
+            player.state_halfprime.col,
+            player.state_halfprime.direction.value,
+            player.tank_file,
+            player.alive)
+        for player in (player1, player2))
+    return tiles, characters
+
+
+def runRenderer(*args) -> None:
+    """
+    Entry point of the render process, importing pygame only there.
+    """
+    import Render
+    Render.run(*args)
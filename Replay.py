@@ -0,0 +1,106 @@
+import numpy as np
+
+# one transition: keys of the state and state prime in the agent's tables, as RL.key
+TRANSITION = np.dtype([
+    ('state', np.int64),
+    ('action', np.int8),
+    ('reward', np.float32),
+    ('state_prime', np.int64),
+    ('done', np.bool_),
+])
+
+
+class ReplayBuffer:
+    """
+    Ring buffer of the most recent transitions, preallocated as a NumPy structured array. Fields:
+        - self.transitions: np.ndarray: TRANSITION[size], overwritten oldest first
+        - self.count: int: number of transitions in the buffer, at most its size
+        - self.added: int: number of transitions added since the start
+    """
+    def __init__(
+        self,
+        size: int) -> None:
+        """
+        Initializes an empty buffer.
+
+        Parameters:
+        size (int): Number of transitions kept.
+        """
+        self.transitions: np.ndarray = np.zeros(size, dtype=TRANSITION)
+        self.next: int = 0
+        self.count: int = 0
+        self.added: int = 0
+
+
+    def __len__(
+        self) -> int:
+        return self.count
+
+
+    def add(
+        self,
+        state: int,
+        action: int,
+        reward: float,
+        state_prime: int,
+        done: bool) -> None:
+        """
+        Add a transition, dropping the oldest one if the buffer is full.
+
+        Parameters:
+        state (int): Key of the state.
+        action (int): Action value.
+        reward (float): Reward of the state-action pair.
+        state_prime (int): Key of the state prime.
+        done (bool): Flag to indicate the game ended with this transition.
+        """
+        self.transitions[self.next] = (state, action, reward, state_prime, done)
+        self.next = (self.next + 1) % len(self.transitions)
+        self.count = min(self.count + 1, len(self.transitions))
+        self.added += 1
+
+
+    def add_batch(
+        self,
+        states: np.ndarray,
+        actions: np.ndarray,
+        rewards: np.ndarray,
+        states_prime: np.ndarray,
+        dones: np.ndarray) -> None:
+        """
+        Add a batch of transitions in order, as add.
+
+        Parameters:
+        states (np.ndarray): int[N] keys of the states.
+        actions (np.ndarray): int[N] Action values.
+        rewards (np.ndarray): float[N] rewards.
+        states_prime (np.ndarray): int[N] keys of the state primes.
+        dones (np.ndarray): bool[N] flags, or a single flag for the whole batch.
+        """
+        size = len(self.transitions)
+        # only the last size transitions of a batch bigger than the buffer survive
+        first = max(len(states) - size, 0)
+        slots = (self.next + np.arange(first, len(states))) % size
+        self.transitions['state'][slots] = states[first:]
+        self.transitions['action'][slots] = actions[first:]
+        self.transitions['reward'][slots] = rewards[first:]
+        self.transitions['state_prime'][slots] = states_prime[first:]
+        self.transitions['done'][slots] = np.broadcast_to(dones, len(states))[first:]
+        self.next = (self.next + len(states)) % size
+        self.count = min(self.count + len(states), size)
+        self.added += len(states)
+
+
+    def sample(
+        self,
+        batch_size: int) -> np.ndarray:
+        """
+        Get transitions drawn uniformly, with replacement, from the buffer.
+
+        Parameters:
+        batch_size (int): Number of transitions drawn.
+
+        Returns:
+        TRANSITION[batch_size] copy of the drawn transitions.
+        """
+        return self.transitions[np.random.randint(0, self.count, batch_size)]
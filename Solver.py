@@ -0,0 +1,161 @@
+from Action import Action
+from Direction import Direction
+from Board import Board
+from State import State
+from Tile import Tile
+from typing import Tuple
+import numpy as np
+import time
+
+# rewards of RL.computeReward and RL.terminate, so solved Q-values are on the scale of trained ones
+STEP_REWARD = -100.
+MISS_REWARD = -500.
+WIN_REWARD = 1.e+06
+LOSS_REWARD = -1.e+06
+# Q-value RL.pick_action gives the actions that cannot be taken
+INVALID = -1.e+10
+
+
+class JointTables:
+    """
+    Transitions between the joint states of a board, the poses (see Board.poseIndex) of the character to move
+    and of its opponent, id mover_pose * poses + opponent_pose. Fields:
+        - self.num_tiles: int: number of tiles in one dimension of the board
+        - self.poses: int: number of poses, num_tiles * num_tiles * len(Direction)
+        - self.valid: np.ndarray: bool[J] joint states with both characters on different empty tiles
+        - self.legal: np.ndarray: bool[J, len(Action)] actions the character to move can take
+        - self.after: np.ndarray: int[J, len(Action)] joint state after each action, still indexed from the mover's
+            side, so with the opponent to move
+        - self.hits: np.ndarray: bool[J] whether a shot of the character to move hits the opponent
+        - self.replies: np.ndarray: int[J, len(Action)] joint state after each action of the opponent
+        - self.reply_legal: np.ndarray: bool[J, len(Action)] actions the opponent can take
+        - self.reply_hits: np.ndarray: bool[J] whether a shot of the opponent hits the mover
+    """
+    def __init__(
+        self,
+        num_tiles: int) -> None:
+        """
+        Enumerate the joint states of the given board and look up their transitions in the board's tables.
+
+        Parameters:
+        num_tiles (int): Number of tiles in one dimension of the square board.
+        """
+        board = Board(num_tiles, (0, 0), (num_tiles - 1, num_tiles - 1))
+        walls = np.array([[tile == Tile.WALL for tile in row] for row in board.tiles]).ravel()
+        sight = np.array(board.sight).reshape(-1)
+        next_pos = np.array(board.next_pos, dtype=np.int64)
+        blocked = np.array(board.blocked)
+        dir_row = np.array([Direction.dir_delta[direction][0] for direction in Direction])
+        dir_col = np.array([Direction.dir_delta[direction][1] for direction in Direction])
+
+        self.num_tiles: int = num_tiles
+        self.poses: int = num_tiles * num_tiles * len(Direction)
+        mover, opponent = np.divmod(np.arange(self.poses * self.poses), self.poses)
+        mover_pos, opponent_pos = mover // len(Direction), opponent // len(Direction)
+        self.valid: np.ndarray = ~walls[mover_pos] & ~walls[opponent_pos] & (mover_pos != opponent_pos)
+
+        def shotHits(shooter: np.ndarray, target_pos: np.ndarray) -> np.ndarray:
+            # as Board.inSight, the target is on the shot's path before the first wall
+            row, col = np.divmod(shooter // len(Direction), num_tiles)
+            target_row, target_col = np.divmod(target_pos, num_tiles)
+            direction = shooter % len(Direction)
+            distance = (target_row - row) * dir_row[direction] + (target_col - col) * dir_col[direction]
+            aligned = ((target_row - row) * dir_col[direction] == 0) & ((target_col - col) * dir_row[direction] == 0)
+            return aligned & (0 < distance) & (distance <= sight[shooter])
+
+        mover_next = next_pos[mover]
+        self.legal: np.ndarray = ~blocked[mover] & (mover_next // len(Direction) != opponent_pos[:, np.newaxis])
+        self.after: np.ndarray = mover_next * self.poses + opponent[:, np.newaxis]
+        self.hits: np.ndarray = shotHits(mover, opponent_pos)
+
+        opponent_next = next_pos[opponent]
+        self.reply_legal: np.ndarray = ~blocked[opponent] & (opponent_next // len(Direction) != mover_pos[:, np.newaxis])
+        self.replies: np.ndarray = mover[:, np.newaxis] * self.poses + opponent_next
+        self.reply_hits: np.ndarray = shotHits(opponent, mover_pos)
+
+
+def solveGame(
+    num_tiles: int,
+    gamma: float = 0.9,
+    blunder: float = 0.,
+    tolerance: float = 1.e-03,
+    max_iterations: int = 10_000) -> Tuple[np.ndarray, JointTables, dict]:
+    """
+    Compute the Q-values of every joint state by value iteration against an opponent that replies with the action
+    that is worst for the mover, or with probability blunder any legal action, with the rewards of RL.
+
+    A shot that hits is worth WIN_REWARD. Any other action is worth LOSS_REWARD if the opponent replies by hitting the
+    mover, else its RL reward plus gamma times the value of the joint state the opponent's reply leads to.
+
+    Parameters:
+    num_tiles (int): Number of tiles in one dimension of the square board.
+    gamma (float): Discount factor, as RL.gamma.
+    blunder (float): Probability the opponent replies at random, 0 for minimax. Most joint states are draws under
+        minimax, so a small probability makes the agent seek the states where mistakes can be punished.
+    tolerance (float): Largest change of a state value at which the iteration stops.
+    max_iterations (int): Number of iterations after which the iteration stops regardless.
+
+    Returns:
+    (float64[J, len(Action)] Q-values, INVALID for actions that cannot be taken, the JointTables,
+    dict with the number of iterations, the last largest change and the seconds taken) tuple.
+    """
+    start = time.perf_counter()
+    tables = JointTables(num_tiles)
+    rewards = np.full(len(Action), STEP_REWARD)
+    rewards[Action.SHOOT.value] = MISS_REWARD
+
+    # only shots can hit, so at most one reply of each joint state is a hit. Joint states that are not valid may
+    # have no legal reply, they count one so their values stay finite
+    num_replies = np.maximum(tables.reply_legal.sum(axis=1), 1)
+    safe_replies = tables.reply_legal & ~(tables.reply_hits[:, np.newaxis] & (np.arange(len(Action)) == Action.SHOOT.value))
+    values = np.zeros(len(tables.valid))
+    change = np.inf
+    iterations = 0
+    while change > tolerance and iterations < max_iterations:
+        # values of the joint states each reply of the opponent leads to, with the mover to move again
+        reply_values = np.where(safe_replies, values[tables.replies], 0.)
+        worst_reply = np.where(safe_replies, reply_values, np.inf).min(axis=1)
+        worst_reply[np.isinf(worst_reply)] = 0.
+        reply_total = reply_values.sum(axis=1)
+        after = tables.after
+        safe = safe_replies.sum(axis=1)[after]
+        minimax = np.where(tables.reply_hits[after], LOSS_REWARD, rewards + gamma * worst_reply[after])
+        # each legal reply equally likely, the safe ones leading on and a hit ending the game
+        random_reply = (
+            safe * rewards + gamma * reply_total[after] + tables.reply_hits[after] * LOSS_REWARD) / num_replies[after]
+        q_values = (1 - blunder) * minimax + blunder * random_reply
+        q_values[tables.hits, Action.SHOOT.value] = WIN_REWARD
+        q_values[~tables.legal] = INVALID
+
+        new_values = q_values.max(axis=1)
+        change = float(np.abs(new_values - values)[tables.valid].max())
+        values = new_values
+        iterations += 1
+
+    return q_values, tables, {'iterations': iterations, 'change': change, 'seconds': time.perf_counter() - start}
+
+
+def observedTable(
+    q_values: np.ndarray,
+    tables: JointTables) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Collapse joint Q-values into a table keyed by State.key, which does not hold the opponent's direction.
+    Each state gets the worst Q-values over the directions the opponent could be facing.
+
+    Parameters:
+    q_values (np.ndarray): float[J, len(Action)] Q-values, as solveGame.
+    tables (JointTables): The JointTables they were solved on.
+
+    Returns:
+    (int64[K] sorted State.key of every valid state, float64[K, len(Action)] Q-values) tuple.
+    """
+    positions = tables.num_tiles * tables.num_tiles
+    q_values = q_values.reshape(tables.poses, positions, len(Direction), len(Action)).min(axis=2).reshape(-1, len(Action))
+    valid = tables.valid.reshape(tables.poses, positions, len(Direction))[:, :, 0].ravel()
+
+    mover, opponent_pos = np.divmod(np.flatnonzero(valid), positions)
+    row, col = np.divmod(mover // len(Direction), tables.num_tiles)
+    opp_row, opp_col = np.divmod(opponent_pos, tables.num_tiles)
+    keys = State.keys(np.stack([row, col, mover % len(Direction), opp_row, opp_col], axis=1))
+    order = np.argsort(keys)
+    return keys[order], q_values[valid][order]
@@ -1,6 +1,13 @@
 from Direction import Direction
+import numpy as np
+
+# number of bits given to each coordinate in State.key, opponent coordinates are stored shifted by one so -1 fits
+FIELD_BITS = 15
+FIELD_MASK = (1 << FIELD_BITS) - 1
 
 class State():
+    __slots__ = ('row', 'col', 'direction', 'opp_row', 'opp_col', 'key')
+
     def __init__(
         self, 
         row: int, 
@@ -23,20 +30,24 @@ class State():
         self.direction: Direction = direction
         self.opp_row: int = opp_row
         self.opp_col: int = opp_col
-        self.state: State = str(self)
+        self.key: int = (
+            ((((row << FIELD_BITS | col) << 2 | direction.value)
+            << FIELD_BITS | (opp_row + 1)) << FIELD_BITS) | (opp_col + 1))
 
 
     def __str__(self):
-        return (
-            str(self.row).zfill(2) + 
-            str(self.col).zfill(2) + 
-            str(self.direction.value).zfill(2) + 
-            str(self.opp_row).zfill(2) + 
-            str(self.opp_col).zfill(2))
+        # fields are delimited so boards over 99 tiles still give unambiguous strings
+        return ':'.join(
+            str(value).zfill(2)
+            for value in (self.row, self.col, self.direction.value, self.opp_row, self.opp_col))
 
 
     def __eq__(self, other):
-        return self.state == other.state
+        return isinstance(other, State) and self.key == other.key
+
+
+    def __hash__(self):
+        return self.key
 
 
     def getStateWithDifferent(
@@ -67,6 +78,158 @@ class State():
             opp_col = opp_col if opp_col is not None else self.opp_col)
 
 
+    @staticmethod
+    def fromArray(values) -> 'State':
+        """
+        Build a state from a (row, col, direction, opp_row, opp_col) sequence, as produced by BatchBoard.
+
+        Parameters:
+        values: Sequence of five ints, the direction given as its Direction value.
+
+        Returns:
+        State: The corresponding state.
+        """
+        row, col, direction, opp_row, opp_col = (int(v) for v in values)
+        return State(
+            row=row,
+            col=col,
+            direction=Direction(direction),
+            opp_row=opp_row,
+            opp_col=opp_col)
+
+
+    @staticmethod
+    def fromString(state_str: str) -> 'State':
+        """
+        Build a state from its string, as str(state) or the undelimited zero-padded keys stored in pkl_files/.
+
+        Parameters:
+        state_str (str): The state string, e.g. '00:00:02:08:08' or '0000020808'.
+
+        Returns:
+        State: The corresponding state.
+        """
+        if ':' in state_str:
+            return State.fromArray(state_str.split(':'))
+        return State.fromArray([state_str[i:i + 2] for i in range(0, 10, 2)])
+
+
+    @staticmethod
+    def fromKey(key: int) -> 'State':
+        """
+        Build a state from its packed integer key.
+
+        Parameters:
+        key (int): The state key, as State.key.
+
+        Returns:
+        State: The corresponding state.
+        """
+        return State(
+            row=key >> (3 * FIELD_BITS + 2),
+            col=(key >> (2 * FIELD_BITS + 2)) & FIELD_MASK,
+            direction=Direction((key >> (2 * FIELD_BITS)) & 3),
+            opp_row=((key >> FIELD_BITS) & FIELD_MASK) - 1,
+            opp_col=(key & FIELD_MASK) - 1)
+
+
+    @staticmethod
+    def convertKeys(table: dict) -> dict:
+        """
+        Convert a table keyed by zero-padded state strings, as stored in pkl_files/, to one keyed by State.key.
+
+        Parameters:
+        table (dict): Table keyed by state strings or State.key.
+
+        Returns:
+        dict: Table keyed by State.key, in the same order.
+        """
+        return {
+            (State.fromString(state_key).key if isinstance(state_key, str) else state_key): value
+            for state_key, value in table.items()}
+
+
+    def index(self, num_tiles: int) -> int:
+        """
+        Get the dense integer id of this (non-start) state.
+
+        Parameters:
+        num_tiles (int): Number of tiles in one dimension of the square board.
+
+        Returns:
+        int: Id in [0, State.numStates(num_tiles)).
+        """
+        return (
+            (((self.row * num_tiles + self.col) * len(Direction) + self.direction.value)
+            * num_tiles + self.opp_row) * num_tiles + self.opp_col)
+
+
+    @staticmethod
+    def indices(states: np.ndarray, num_tiles: int) -> np.ndarray:
+        """
+        Get the dense integer ids of a batch of states, as State.index.
+
+        Parameters:
+        states (np.ndarray): int[N, 5] array of (row, col, direction, opp_row, opp_col).
+        num_tiles (int): Number of tiles in one dimension of the square board.
+
+        Returns:
+        int[N] state ids.
+        """
+        states = np.asarray(states, dtype=np.int64)
+        return (
+            (((states[:, 0] * num_tiles + states[:, 1]) * len(Direction) + states[:, 2])
+            * num_tiles + states[:, 3]) * num_tiles + states[:, 4])
+
+
+    @staticmethod
+    def keys(states: np.ndarray) -> np.ndarray:
+        """
+        Get the packed keys of a batch of states, as State.key.
+
+        Parameters:
+        states (np.ndarray): int[N, 5] array of (row, col, direction, opp_row, opp_col).
+
+        Returns:
+        int64[N] state keys.
+        """
+        states = np.asarray(states, dtype=np.int64)
+        return (
+            ((((states[:, 0] << FIELD_BITS | states[:, 1]) << 2 | states[:, 2])
+            << FIELD_BITS | (states[:, 3] + 1)) << FIELD_BITS) | (states[:, 4] + 1))
+
+
+    @staticmethod
+    def arrays(keys: np.ndarray) -> np.ndarray:
+        """
+        Unpack a batch of state keys, the inverse of State.keys.
+
+        Parameters:
+        keys (np.ndarray): int64[N] state keys, as State.key.
+
+        Returns:
+        int[N, 5] array of (row, col, direction, opp_row, opp_col).
+        """
+        keys = np.asarray(keys, dtype=np.int64)
+        return np.stack([
+            keys >> (3 * FIELD_BITS + 2),
+            (keys >> (2 * FIELD_BITS + 2)) & FIELD_MASK,
+            (keys >> (2 * FIELD_BITS)) & 3,
+            ((keys >> FIELD_BITS) & FIELD_MASK) - 1,
+            (keys & FIELD_MASK) - 1], axis=1)
+
+
+    @staticmethod
+    def numStates(num_tiles: int) -> int:
+        """
+        Get the number of dense state ids for the given board size.
+
+        Parameters:
+        num_tiles (int): Number of tiles in one dimension of the square board.
+        """
+        return num_tiles ** 4 * len(Direction)
+
+
     def isStart(self) -> bool:
         """
         Check if state is the start state.
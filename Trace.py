@@ -0,0 +1,188 @@
+from ActionFunction import ActionFunction
+from Action import Action
+from Board import Board
+from State import State
+from typing import Any, List, Tuple
+import struct
+
+# traces are an append-only file: a header, then one record per episode followed by its actions,
+# one byte per Action value in the order they were played, the first player's first
+TRACE_MAGIC = b'RLGA'
+TRACE_VERSION = 1
+HEADER = struct.Struct('<4sBH') # magic, version, num_tiles
+RECORD = struct.Struct('<IBbH') # episode, start corner (episode % 4), winner (0, 1, or -1 for a tie), number of actions
+
+
+class Trace:
+    """
+    One recorded episode. Fields:
+        - self.episode: int: episode number
+        - self.corner: int: starting corners of the players, as main.start_positions
+        - self.winner: int: index of the winning player, -1 for a tie
+        - self.actions: bytes: Action value of every action played, alternating between the players
+    """
+    __slots__ = ('episode', 'corner', 'winner', 'actions')
+
+    def __init__(
+        self,
+        episode: int,
+        corner: int,
+        winner: int,
+        actions: bytes) -> None:
+        self.episode: int = episode
+        self.corner: int = corner
+        self.winner: int = winner
+        self.actions: bytes = actions
+
+
+class TraceWriter:
+    """
+    Appends episodes to a trace file, through a buffer written out in whole records. Fields:
+        - self.buffer: bytearray: records not written yet
+        - self.written: int: number of episodes recorded
+    """
+    def __init__(
+        self,
+        file_name: str,
+        num_tiles: int,
+        buffer_size: int = 1 << 16) -> None:
+        """
+        Opens the trace file for appending, writing its header if it is new.
+
+        Parameters:
+        file_name (str): Trace file.
+        num_tiles (int): Number of tiles in one dimension of the board the episodes are played on.
+        buffer_size (int): Number of bytes buffered before they are written.
+        """
+        self.file = open(file_name, 'ab')
+        self.buffer_size: int = buffer_size
+        self.buffer: bytearray = bytearray()
+        self.written: int = 0
+        if self.file.tell() == 0:
+            self.buffer += HEADER.pack(TRACE_MAGIC, TRACE_VERSION, num_tiles)
+        else:
+            _, tiles = readHeader(file_name)
+            if tiles != num_tiles:
+                raise Exception(f"{file_name} holds episodes on {tiles} tiles, not {num_tiles}.")
+
+
+    def record(
+        self,
+        episode: int,
+        winner: int,
+        actions: List[int]) -> None:
+        """
+        Record an episode.
+
+        Parameters:
+        episode (int): Episode number, its starting corners are episode % 4.
+        winner (int): Index of the winning player, -1 for a tie.
+        actions (List[int]): Action values played, alternating between the players.
+        """
+        self.buffer += RECORD.pack(episode, episode % 4, winner, len(actions))
+        self.buffer += bytes(actions)
+        self.written += 1
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+
+    def flush(
+        self) -> None:
+        """
+        Write the buffered records to the file.
+        """
+        self.file.write(self.buffer)
+        self.file.flush()
+        self.buffer.clear()
+
+
+    def close(
+        self) -> None:
+        """
+        Write the buffered records and close the file.
+        """
+        self.flush()
+        self.file.close()
+
+
+def readHeader(
+    file_name: str) -> Tuple[int, int]:
+    """
+    Read the header of a trace file.
+
+    Returns:
+    (version, num_tiles) tuple.
+    """
+    with open(file_name, 'rb') as f:
+        magic, version, num_tiles = HEADER.unpack(f.read(HEADER.size))
+    if magic != TRACE_MAGIC:
+        raise Exception(f"{file_name} is not a trace file.")
+    return version, num_tiles
+
+
+def readTraces(
+    file_name: str) -> Tuple[int, List[Trace]]:
+    """
+    Read every episode of a trace file, ignoring a last record cut short.
+
+    Parameters:
+    file_name (str): Trace file, as written by TraceWriter.
+
+    Returns:
+    (num_tiles, episodes in the order they were recorded) tuple.
+    """
+    _, num_tiles = readHeader(file_name)
+    with open(file_name, 'rb') as f:
+        data = f.read()
+    traces = []
+    offset = HEADER.size
+    while offset + RECORD.size <= len(data):
+        episode, corner, winner, num_actions = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        if offset + num_actions > len(data):
+            break
+        traces.append(Trace(episode, corner, winner, data[offset:offset + num_actions]))
+        offset += num_actions
+    return num_tiles, traces
+
+
+class TracePlayer(ActionFunction):
+    """
+    Plays the actions of one player of a recorded episode, so the episode can be re-simulated on a Board.
+    """
+    def __init__(
+        self,
+        actions: bytes) -> None:
+        """
+        Initializes the player.
+
+        Parameters:
+        actions (bytes): Action values of this player, in the order they were played.
+        """
+        self.actions: bytes = actions
+        self.next: int = 0
+
+
+    def apply(self, state: State, action: Action, state_prime: State, board: Board) -> Tuple[State, Action, Board]:
+        if self.next >= len(self.actions):
+            raise Exception("The recorded episode has no more actions.")
+        new_action = Action(self.actions[self.next])
+        self.next += 1
+        new_state, new_board = self.try_action(state_prime, new_action, board)
+        return state_prime, new_action, new_state, new_board
+
+
+    def terminate(self, state: State, action: Action, state_prime: State, won: bool) -> None:
+        pass
+
+
+    def checkpoint(self) -> List[Tuple[str, Any]]:
+        return []
+
+
+    def write_to_file(self) -> None:
+        pass
+
+
+    def load_data(self) -> None:
+        pass
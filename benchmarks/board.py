@@ -0,0 +1,64 @@
+"""
+Times finding the characters on a board (Board.getCharacters) against the board size, comparing the
+position index Board keeps up to date with a scan of the full grid.
+
+Run from the repository root with: python -m benchmarks.board
+"""
+from Board import Board, CHARACTER_TILES
+from Tile import Tile
+from typing import List, Tuple
+import time
+
+BOARD_SIZES = [9, 25, 51, 101, 201]
+MOVES = 1_000
+REPEATS = 5
+
+
+def scan_characters(board: Board) -> List[Tuple[int, int]]:
+    """
+    Find the characters by checking every tile, as Board.getCharacters did before the position index.
+    """
+    locs = []
+    for row in range(len(board.tiles)):
+        for col in range(len(board.tiles[0])):
+            if board.tiles[row][col] in CHARACTER_TILES:
+                locs.append((row, col))
+    return locs
+
+
+def time_moves(num_tiles: int, get_characters) -> float:
+    """
+    Get the best time, in seconds per move, of REPEATS runs of MOVES moves along the top row,
+    each followed by a position query as in Character.computeState.
+    """
+    times = []
+    for _ in range(REPEATS):
+        board = Board(num_tiles, (0, 0), (num_tiles - 1, num_tiles - 1))
+        start = time.perf_counter()
+        for i in range(MOVES):
+            col = i % (num_tiles - 1)
+            # moving right along the top row, and back to the corner at the end of it
+            new_col = col + 1 if col + 1 < num_tiles - 1 else 0
+            board.setGrid(0, col, Tile.EMPTY)
+            board.setGrid(0, new_col, Tile.CHARACTER)
+            get_characters(board)
+        times.append((time.perf_counter() - start) / MOVES)
+    return min(times)
+
+
+def run() -> dict:
+    """
+    Time moves with a position query for every board size.
+
+    Returns:
+    dict mapping each board size to {'scan': seconds, 'index': seconds} per move.
+    """
+    return {
+        num_tiles: {'scan': time_moves(num_tiles, scan_characters), 'index': time_moves(num_tiles, Board.getCharacters)}
+        for num_tiles in BOARD_SIZES}
+
+
+if __name__ == "__main__":
+    print(f"{'board':>9} {'scan (us)':>10} {'index (us)':>11}")
+    for num_tiles, times in run().items():
+        print(f"{f'{num_tiles}x{num_tiles}':>9} {times['scan'] * 1e6:>10.2f} {times['index'] * 1e6:>11.2f}")
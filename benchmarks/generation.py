@@ -0,0 +1,73 @@
+"""
+Times one GA generation turnover (GA.next_generation) against the number of states each policy has visited,
+for dict and dense populations.
+
+Run from the repository root with: python -m benchmarks.generation
+"""
+from GA import GA
+from Action import Action
+from State import State
+import numpy as np
+import time
+
+POLICY_SIZES = [100, 1_000, 5_000, 20_000]
+MAX_POPULATION = 9
+MIN_POPULATION = 4
+NUM_TILES = 9
+REPEATS = 5
+
+
+def make_population(policy_size: int, dense: bool, num_tiles: int = NUM_TILES) -> GA:
+    """
+    Build a GA whose members have each visited policy_size random states, with random actions and fitness.
+    """
+    agent = GA(
+        min_population=MIN_POPULATION,
+        max_population=MAX_POPULATION,
+        policies_file='',
+        dense=dense,
+        num_tiles=num_tiles)
+    for i in range(MAX_POPULATION):
+        # a Generator draws without replacement without permuting the whole state space
+        states = np.random.default_rng().choice(State.numStates(num_tiles), policy_size, replace=False)
+        actions = np.random.randint(0, len(Action), policy_size)
+        fitness = np.random.uniform(-1.e+06, 1.e+06, policy_size)
+        if dense:
+            agent.policies[i, states] = actions
+            agent.fitness[i, states] = fitness
+        else:
+            agent.policies[i] = {int(s): np.eye(len(Action))[a] for s, a in zip(states, actions)}
+            agent.fitness[i] = {int(s): f for s, f in zip(states, fitness)}
+        agent.policy_fitness[i] = fitness.sum()
+    return agent
+
+
+def time_generation(policy_size: int, dense: bool) -> float:
+    """
+    Get the best time, in seconds, of REPEATS generation turnovers.
+    """
+    times = []
+    for _ in range(REPEATS):
+        agent = make_population(policy_size, dense)
+        start = time.perf_counter()
+        agent.next_generation()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run() -> dict:
+    """
+    Time a generation turnover for every policy size.
+
+    Returns:
+    dict mapping each policy size to {'dict': seconds, 'dense': seconds}.
+    """
+    return {
+        policy_size: {'dict': time_generation(policy_size, False), 'dense': time_generation(policy_size, True)}
+        for policy_size in POLICY_SIZES}
+
+
+if __name__ == "__main__":
+    print(f"{'states/policy':>14} {'dict (ms)':>10} {'dense (ms)':>11}")
+    for policy_size, times in run().items():
+        print(f"{policy_size:>14} {times['dict'] * 1000:>10.2f} {times['dense'] * 1000:>11.2f}")
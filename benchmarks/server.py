@@ -0,0 +1,91 @@
+"""
+Measures the latency and throughput of the policy server against its batch window, with concurrent clients
+each sending one state per request over localhost TCP.
+
+Run from the repository root with: python -m benchmarks.server [checkpoint]
+"""
+from PolicyServer import Policy, Batcher, PolicyClient, loadPolicy, makeServer
+from Action import Action
+from State import State
+import numpy as np
+import threading
+import time
+import sys
+
+WINDOWS = [0, 0.000_5, 0.001, 0.002, 0.005]
+CLIENTS = 8
+REQUESTS = 200
+NUM_TILES = 9
+
+
+def make_policy(name: str) -> Policy:
+    """
+    Load the given checkpoint, or a random policy over every state if it is not in pkl_files/.
+    """
+    try:
+        return loadPolicy(name, NUM_TILES)
+    except Exception:
+        return Policy(None, np.random.random((State.numStates(NUM_TILES), len(Action))).astype(np.float32), NUM_TILES)
+
+
+def run_window(policy: Policy, window: float) -> dict:
+    """
+    Serve the policy with the given batch window while CLIENTS clients send REQUESTS requests each.
+
+    Returns:
+    dict of the client-side requests per second and median and 99th percentile latency in milliseconds,
+    and the mean batch size of the server.
+    """
+    batcher = Batcher(policy, window)
+    server = makeServer(("127.0.0.1", 0), batcher)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    states = np.random.randint(0, NUM_TILES, (CLIENTS * REQUESTS, 5))
+    states[:, 2] %= 4
+    latencies = np.zeros(len(states))
+
+    def client(first: int) -> None:
+        connection = PolicyClient(server.server_address)
+        for i in range(first, first + REQUESTS):
+            start = time.perf_counter()
+            connection.actions(states[i:i + 1])
+            latencies[i] = time.perf_counter() - start
+        connection.close()
+
+    clients = [threading.Thread(target=client, args=(c * REQUESTS,)) for c in range(CLIENTS)]
+    start = time.perf_counter()
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    server.shutdown()
+    server.server_close()
+    batcher.close()
+    return {
+        'requests_per_sec': len(states) / elapsed,
+        'latency_p50_ms': float(np.percentile(latencies, 50)) * 1.e+03,
+        'latency_p99_ms': float(np.percentile(latencies, 99)) * 1.e+03,
+        'mean_batch_size': batcher.stats()['mean_batch_size'],
+    }
+
+
+def run(name: str = "rl_opt") -> dict:
+    """
+    Measure every batch window.
+
+    Returns:
+    dict mapping each window, in seconds, to its results, see run_window.
+    """
+    policy = make_policy(name)
+    return {window: run_window(policy, window) for window in WINDOWS}
+
+
+if __name__ == "__main__":
+    print(f"{CLIENTS} clients, {REQUESTS} requests of one state each")
+    print(f"{'window (ms)':>11} {'requests/s':>11} {'p50 (ms)':>9} {'p99 (ms)':>9} {'batch size':>11}")
+    for window, result in run(*sys.argv[1:]).items():
+        print(
+            f"{window * 1e3:>11g} {result['requests_per_sec']:>11.0f} {result['latency_p50_ms']:>9.2f} "
+            f"{result['latency_p99_ms']:>9.2f} {result['mean_batch_size']:>11.1f}")
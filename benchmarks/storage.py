@@ -0,0 +1,125 @@
+"""
+Measures the memory and update throughput of the RL tables against the board size, comparing dicts of rows,
+the sparse HashTable and, where they fit, dense arrays. Every board has the same number of discovered states.
+
+Run from the repository root with: python -m benchmarks.storage
+"""
+from Action import Action
+from Direction import Direction
+from State import State
+from RL import RL
+import numpy as np
+import tracemalloc
+import time
+
+BOARD_SIZES = [9, 51, 201]
+NUM_STATES = 20_000
+UPDATES = 20_000
+BATCH_SIZE = 256
+REPEATS = 3
+MAX_DENSE_STATES = 1_000_000 # dense tables are only measured on boards with at most this many states
+
+
+def random_states(num_tiles: int, count: int) -> np.ndarray:
+    """
+    Get count different random non-start states of the given board, as int[count, 5] rows.
+    """
+    num_states = State.numStates(num_tiles)
+    if num_states <= 2 * count:
+        ids = np.random.choice(num_states, count, replace=False)
+    else:
+        # drawing extra ids so enough different ones are left, without permuting every id of a big board
+        ids = np.random.permutation(np.unique(np.random.randint(0, num_states, 2 * count, dtype=np.int64)))[:count]
+    ids, opp_col = np.divmod(ids, num_tiles)
+    ids, opp_row = np.divmod(ids, num_tiles)
+    ids, direction = np.divmod(ids, len(Direction))
+    row, col = np.divmod(ids, num_tiles)
+    return np.stack([row, col, direction, opp_row, opp_col], axis=1)
+
+
+def make_agent(num_tiles: int, mode: str) -> RL:
+    """
+    Fresh learning RL agent keeping its tables as 'dict', 'sparse' or 'dense', that does not load or save anything.
+    """
+    return RL(
+        q_table_file='', num_updates_file='', epsilon_file='',
+        dense=mode == 'dense', sparse=mode == 'sparse', num_tiles=num_tiles)
+
+
+def table_bytes(num_tiles: int, mode: str, states: np.ndarray) -> int:
+    """
+    Get the bytes allocated by an agent's tables once every given state has been discovered.
+    """
+    tracemalloc.start()
+    agent = make_agent(num_tiles, mode)
+    agent.initialize_states(State.keys(states).tolist())
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del agent
+    return allocated
+
+
+def time_updates(num_tiles: int, mode: str, states: np.ndarray) -> dict:
+    """
+    Get the best time, in seconds per update, of REPEATS runs of UPDATES random updates,
+    made one at a time with RL.update and in batches of BATCH_SIZE with RL.update_dense (dense and sparse only).
+    """
+    agent = make_agent(num_tiles, mode)
+    agent.initialize_states([agent.key(State.fromArray(state)) for state in states])
+    picks = np.random.randint(0, len(states), (UPDATES, 2))
+    actions = np.random.randint(0, len(Action), UPDATES)
+    rewards = np.where(actions == Action.SHOOT.value, -500., -100.)
+    pairs = [
+        (State.fromArray(states[i]), Action(int(a)), State.fromArray(states[j]), r)
+        for (i, j), a, r in zip(picks, actions, rewards)]
+
+    def single() -> float:
+        start = time.perf_counter()
+        for pair in pairs:
+            agent.update(*pair)
+        return (time.perf_counter() - start) / UPDATES
+
+    def batched() -> float:
+        start = time.perf_counter()
+        for first in range(0, UPDATES, BATCH_SIZE):
+            batch = slice(first, first + BATCH_SIZE)
+            state_ids, state_primes = agent.batch_ids(states[picks[batch, 0]], states[picks[batch, 1]])
+            agent.update_dense(state_ids, actions[batch], state_primes, rewards[batch])
+        return (time.perf_counter() - start) / UPDATES
+
+    return {
+        'single': min(single() for _ in range(REPEATS)),
+        'batched': min(batched() for _ in range(REPEATS)) if mode != 'dict' else None,
+    }
+
+
+def run() -> dict:
+    """
+    Measure every table layout for every board size.
+
+    Returns:
+    dict mapping each board size to a dict mapping each layout to its bytes, and seconds per update made
+    one at a time and in batches (None where the layout has no batched update).
+    """
+    results = {}
+    for num_tiles in BOARD_SIZES:
+        states = random_states(num_tiles, NUM_STATES)
+        modes = ['dict', 'sparse'] + (['dense'] if State.numStates(num_tiles) <= MAX_DENSE_STATES else [])
+        results[num_tiles] = {
+            mode: {'bytes': table_bytes(num_tiles, mode, states), **time_updates(num_tiles, mode, states)}
+            for mode in modes}
+        # dense tables hold a float32 Q-value and a uint32 count per state-action pair, whatever was discovered
+        results[num_tiles].setdefault('dense', {'bytes': State.numStates(num_tiles) * len(Action) * 8})
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{NUM_STATES} states discovered, dense tables above {MAX_DENSE_STATES} states are estimated, not built")
+    print(f"{'board':>9} {'layout':>7} {'memory (MB)':>12} {'update (us)':>12} {'batched (us)':>13}")
+    for num_tiles, layouts in run().items():
+        for mode, result in layouts.items():
+            single = '-' if result.get('single') is None else f"{result['single'] * 1e6:.2f}"
+            batched = '-' if result.get('batched') is None else f"{result['batched'] * 1e6:.2f}"
+            print(
+                f"{f'{num_tiles}x{num_tiles}':>9} {mode:>7} {result['bytes'] / 2 ** 20:>12.1f} "
+                f"{single:>12} {batched:>13}")
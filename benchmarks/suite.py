@@ -0,0 +1,253 @@
+"""
+Micro-benchmarks of the simulation and learning hot paths, written as JSON so runs can be compared between commits.
+Every time is the best of REPEATS runs, in seconds per call.
+
+Run from the repository root with: python -m benchmarks.suite [num_tiles ...] [--output results.json]
+"""
+from Action import Action
+from Board import Board
+from Character import Character
+from Direction import Direction
+from State import State
+from RL import RL
+from GA import GA
+from benchmarks.generation import make_population, MAX_POPULATION
+import numpy as np
+import subprocess
+import platform
+import tempfile
+import timeit
+import json
+import time
+import sys
+import os
+
+NUM_TILES = [9]
+REPEATS = 5
+CALLS = 2_000
+GAMES = 20
+GENERATION_POLICY_SIZE = 1_000
+MAX_DENSE_STATES = 1_000_000 # dense GA populations are only benchmarked on boards with at most this many states
+
+RL_FILES = ("pkl_files/q_table_opt.pkl", "pkl_files/num_updates_opt.pkl", "pkl_files/epsilon_opt.pkl")
+GA_FILE = "pkl_files/policies_1gavga.pkl"
+
+
+def best_time(function, number: int = CALLS) -> float:
+    """
+    Get the best time, in seconds per call, of REPEATS runs of number calls of function.
+    """
+    return min(timeit.repeat(function, number=number, repeat=REPEATS)) / number
+
+
+def best_run(function) -> float:
+    """
+    Get the best time, in seconds, of REPEATS calls of function, each given a fresh setup by function itself.
+    function returns the seconds it wants counted.
+    """
+    return min(function() for _ in range(REPEATS))
+
+
+def make_board(num_tiles: int) -> Board:
+    """
+    Board with the first character at (2, 2), where every move is legal, and the second in the far corner.
+    """
+    return Board(num_tiles, (2, 2), (num_tiles - 1, num_tiles - 1))
+
+
+def make_agent(num_tiles: int) -> RL:
+    """
+    Fresh learning RL agent that does not load or save anything.
+    """
+    return RL(q_table_file='', num_updates_file='', epsilon_file='', num_tiles=num_tiles)
+
+
+def bench_try_action(num_tiles: int) -> dict:
+    """
+    Time ActionFunction.try_action for each type of action.
+    """
+    agent = make_agent(num_tiles)
+    board = make_board(num_tiles)
+    facing_away = State(2, 2, Direction.UP, num_tiles - 1, num_tiles - 1)
+    facing_opp = State(2, 2, Direction.RIGHT, 2, num_tiles - 1)
+    hit_board = Board(num_tiles, (2, 2), (2, num_tiles - 1))
+    state = [facing_away]
+
+    def move_and_back():
+        state[0], _ = agent.try_action(state[0], Action.MOVE_DOWN, board)
+        state[0], _ = agent.try_action(state[0], Action.MOVE_UP, board)
+
+    return {
+        'move': best_time(move_and_back) / 2,
+        'rotate': best_time(lambda: agent.try_action(facing_away, Action.ROTATE_GUN_RIGHT, board)),
+        'shoot_miss': best_time(lambda: agent.try_action(facing_away, Action.SHOOT, board)),
+        'shoot_hit': best_time(lambda: agent.try_action(facing_opp, Action.SHOOT, hit_board)),
+    }
+
+
+def bench_state(num_tiles: int) -> dict:
+    """
+    Time State construction and str.
+    """
+    state = State(num_tiles - 1, num_tiles - 1, Direction.LEFT, 0, 0)
+    return {
+        'construct': best_time(lambda: State(num_tiles - 1, num_tiles - 1, Direction.LEFT, 0, 0)),
+        'str': best_time(lambda: str(state)),
+    }
+
+
+def bench_agents(num_tiles: int) -> dict:
+    """
+    Time one RL.apply, RL.choose_action and GA.apply in a non-start state.
+
+    The agents are set up to rotate, so the board is the same on every call.
+    """
+    board = make_board(num_tiles)
+    state = State(2, 2, Direction.UP, num_tiles - 1, num_tiles - 1)
+
+    rl = make_agent(num_tiles)
+    rl.epsilon = 0
+    rl.initialize_states([rl.key(state)])
+    rl.q_table[rl.key(state)][Action.ROTATE_GUN_RIGHT.value] = 1.e+09
+
+    ga = GA(policies_file='', num_tiles=num_tiles)
+    ga.initialize_policy(ga.key(state))
+    ga.set_policy_action(ga.key(state), Action.ROTATE_GUN_RIGHT.value)
+
+    return {
+        'rl_apply': best_time(lambda: rl.apply(state, Action.ROTATE_GUN_RIGHT, state, board)),
+        'rl_choose_action': best_time(lambda: rl.choose_action(state, board)),
+        'ga_apply': best_time(lambda: ga.apply(state, Action.ROTATE_GUN_RIGHT, state, board)),
+    }
+
+
+def bench_generation(num_tiles: int) -> dict:
+    """
+    Time the GA.terminate call that ends the last member's episodes and breeds the next generation,
+    for dict populations and, on small enough boards, dense ones.
+    """
+    state = State(2, 2, Direction.UP, num_tiles - 1, num_tiles - 1)
+
+    def turnover(dense: bool) -> float:
+        agent = make_population(GENERATION_POLICY_SIZE, dense, num_tiles)
+        agent.cur_policy = MAX_POPULATION - 1
+        agent.num_episodes = 4 * MAX_POPULATION - 1
+        start = time.perf_counter()
+        agent.terminate(state, Action.SHOOT, state, False)
+        return time.perf_counter() - start
+
+    return {
+        'dict': best_run(lambda: turnover(False)),
+        'dense': best_run(lambda: turnover(True)) if State.numStates(num_tiles) <= MAX_DENSE_STATES else None,
+    }
+
+
+def bench_run_game(num_tiles: int) -> dict:
+    """
+    Time full games between two fresh learning RL agents with the GUI off, from the same random seed every run.
+    """
+    import main
+    main.gui_flag = False
+    main.NUM_TILES = num_tiles
+    turns = []
+
+    def play() -> float:
+        np.random.seed(0)
+        agent1, agent2 = make_agent(num_tiles), make_agent(num_tiles)
+        start = time.perf_counter()
+        for ep in range(GAMES):
+            start1, start2 = main.start_positions(ep)
+            _, game_turns = main.run_game(
+                Character(agent1, *start1, 'tank1.png'),
+                Character(agent2, *start2, 'tank2.png'),
+                render=False)
+            turns.append(game_turns)
+        return (time.perf_counter() - start) / GAMES
+
+    return {'run_game': best_run(play), 'mean_turns': float(np.mean(turns))}
+
+
+def bench_checkpoints() -> dict:
+    """
+    Time loading the shipped pkl_files checkpoints, and saving and loading them as .npy checkpoints.
+    """
+    if not all(os.path.exists(file_name) for file_name in RL_FILES + (GA_FILE,)):
+        return {}
+    with tempfile.TemporaryDirectory() as directory:
+        npy_files = [os.path.join(directory, os.path.basename(name).replace('.pkl', '.npy')) for name in RL_FILES]
+        ga_npy_file = os.path.join(directory, os.path.basename(GA_FILE).replace('.pkl', '.npy'))
+
+        def load_rl(files, optimal=False) -> RL:
+            return RL(optimal=optimal, q_table_file=files[0], num_updates_file=files[1], epsilon_file=files[2])
+
+        def save_rl() -> None:
+            agent.q_table_file, agent.num_updates_file, agent.epsilon_file = npy_files
+            agent.write_to_file()
+
+        def save_ga() -> None:
+            ga.policies_file = ga_npy_file
+            ga.write_to_file()
+
+        agent = load_rl(RL_FILES)
+        ga = GA(policies_file=GA_FILE, max_population=len(GA(policies_file=GA_FILE).policies))
+        return {
+            'rl_load_pkl': best_time(lambda: load_rl(RL_FILES), number=1),
+            'rl_save_npy': best_time(save_rl, number=1),
+            'rl_load_npy': best_time(lambda: load_rl(npy_files), number=1),
+            'rl_load_npy_mmap': best_time(lambda: load_rl(npy_files, optimal=True), number=1),
+            'ga_load_pkl': best_time(lambda: GA(policies_file=GA_FILE, max_population=ga.max_population), number=1),
+            'ga_save_npy': best_time(save_ga, number=1),
+            'ga_load_npy': best_time(lambda: GA(policies_file=ga_npy_file, max_population=ga.max_population), number=1),
+        }
+
+
+def commit() -> str:
+    """
+    Get the git commit of the working tree, None outside a git repository.
+    """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(num_tiles_list=NUM_TILES) -> dict:
+    """
+    Run every benchmark for every board size.
+
+    Returns:
+    dict of the environment, the results for each board size, and the checkpoint results.
+    """
+    results = {}
+    for num_tiles in num_tiles_list:
+        results[str(num_tiles)] = {
+            'try_action': bench_try_action(num_tiles),
+            'state': bench_state(num_tiles),
+            'agents': bench_agents(num_tiles),
+            'generation': bench_generation(num_tiles),
+            'game': bench_run_game(num_tiles),
+        }
+    return {
+        'commit': commit(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'repeats': REPEATS,
+        'num_tiles': results,
+        'checkpoints': bench_checkpoints(),
+    }
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    output = None
+    if "--output" in args:
+        output = args[args.index("--output") + 1]
+        args = args[:args.index("--output")] + args[args.index("--output") + 2:]
+
+    results = run([int(arg) for arg in args] or NUM_TILES)
+    if output is None:
+        print(json.dumps(results, indent=2))
+    else:
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -1,143 +1,361 @@
-import pygame
 from tqdm import tqdm
 import time
 import sys
 import os
+import random
+import shutil
+import json
+import multiprocessing as mp
 import numpy as np
+from typing import List, Tuple
 
 from Board import Board
+from RenderProcess import RenderProcess
+from BatchBoard import BatchBoard
 from Character import Character
 from Direction import Direction
 from ActionFunction import ActionFunction
 from RL import RL
-from GA import GA
-
-
-NUM_TILES = 9
-TILE_SIZE = 50
+from GA import GA, policy_rows
+from State import State
+import Checkpoint
+import PolicyServer
+import Solver
+import Trace
+from Metrics import Metrics
+
+
+# the --tiles=N flag or NUM_TILES=N sets the board size, the checkpoints in pkl_files/ were trained on 9 tiles
+NUM_TILES = int(next(
+    (arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--tiles=")),
+    os.environ.get("NUM_TILES", 9)))
+TILE_SIZE = max(450 // NUM_TILES, 2) # the window stays 450 pixels wide
 DECAY = 0.9995
 NUM_EPISODES = 1_000_000
 SAVE_EVERY = 10_000
+DENSE_Q = False # if you want RL agents to keep their Q-tables as dense arrays instead of dicts
+SPARSE_Q = False # if you want RL agents to keep their Q-tables in a HashTable instead of dicts, for boards too big for dense arrays
+REPLAY_SIZE = 0 # number of transitions RL agents keep for experience replay, 0 to update their Q-tables on every step instead
+DENSE_GA = False # if you want GA agents to keep their populations as dense arrays instead of dicts
+GA_STATE_BUDGET = 0 # number of states each GA policy keeps after an episode, evicting the rest, 0 for no limit
+GA_EVICTION = "lru" # states a GA policy over its budget drops first: "lru" least recently or "lfu" least often visited
+NUM_ENVS = 1 # number of games stepped in lockstep by a BatchBoard when the GUI is off, only faster with DENSE_Q or SPARSE_Q
 OPTIMAL = True # if you want to use policy as-is (no-randomness)
 gui_flag = True
+RENDER_EVERY = 1 # the GUI shows every k-th episode, frames are dropped if the window falls behind
 
 THRESHOLD = 90
-
-if gui_flag:
-    global canvas
-    canvas: pygame.Surface = pygame.display.set_mode((NUM_TILES * TILE_SIZE, NUM_TILES * TILE_SIZE))
+NUM_TRIALS = 10 # number of agents trained in parallel by optvrl_10 and optvga_10
+GA_WORKERS = 0 # number of processes evaluating the members of a GA generation in parallel in optvga, 0 to play them one after another
+METRICS_EVERY = 1_000 # number of episodes between training metrics reports
+METRICS_FILE = "metrics.jsonl" # file the training metrics are appended to as JSON lines, None to not write them
+TOURNAMENT_ROUNDS = 1 # number of games a tournament matchup plays from each starting corner in each seat order
+TOURNAMENT_FILE = "tournament.json" # file the tournament results are written to as JSON
+SERVE_ADDRESS = ("127.0.0.1", 5050) # (host, port) the policy server listens on, or the path of a Unix socket
+SERVE_WINDOW = 0.001 # seconds the policy server waits for more requests to answer together
+TRACE_EVERY = 0 # training records every k-th episode to TRACE_FILE, to watch later with the replay command, 0 to record none
+TRACE_FILE = "traces.bin" # append-only binary file the recorded episodes are written to
+SOLVE_BLUNDER = 0.1 # probability the solver's opponent replies at random, 0 for pure minimax
+
+# the --headless flag or HEADLESS=1 turns the GUI off without loading pygame at all
+HEADLESS = "--headless" in sys.argv or os.environ.get("HEADLESS", "0") not in ("", "0")
+if HEADLESS:
+    gui_flag = False
+
+# the --profile flag or PROFILE=1 times each phase of the turn loop, printed and written to PROFILE_FILE at the end
+PROFILE = "--profile" in sys.argv or os.environ.get("PROFILE", "0") not in ("", "0")
+PROFILE_FILE = "profile.json"
+
+# started on the first refresh, so importing this module never opens a window
+renderer: RenderProcess = None
+show_progress = True
+
+# fixed opponent shared by the workers of run_trials and run_generations
+worker_opponent: ActionFunction = None
+# agents a tournament worker has loaded, by checkpoint name
+tournament_agents: dict = {}
 
 
 # pygame main method
-def run_game(player1: Character, player2: Character):
+def run_game(player1: Character, player2: Character, render: bool = True, trace: List[int] = None):
     board: Board = Board(NUM_TILES, (player1.state.row, player1.state.col), (player2.state.row, player2.state.col))
 
-    if gui_flag:
-        pygame.init()
+    render = gui_flag and render
+    if render:
         refresh(board, player1, player2)
 
     i = 0
     winner = None
     while i < 100: 
         board = player1.next_action(board)
+        if trace is not None:
+            trace.append(player1.action.value)
         if board.done:
             winner = player1
             player1.terminate(board, True)
             player2.terminate(board, False)
             break
-        refresh(board, player1, player2)
+        if render:
+            refresh(board, player1, player2)
         
         board = player2.next_action(board)
+        if trace is not None:
+            trace.append(player2.action.value)
         if board.done:
             winner = player2
             player1.terminate(board, False)
             player2.terminate(board, True)
             break
-        refresh(board, player1, player2)
+        if render:
+            refresh(board, player1, player2)
 
         i += 1
         if i == 100:
             player1.terminate(board, False)
             player2.terminate(board, False)
             break
-    refresh(board, player1, player2)
-
-    # if 'None' its a tie
-    return winner
-
-
-def run_episodes(agent1: ActionFunction, agent2: ActionFunction, break_when_threshold: bool = False):
-    player1: Character = None
-    player2: Character = None
-
-    wins_agent_2 = np.array([])
-
-    for ep in tqdm(range(NUM_EPISODES), unit="episode"):
-        if ep % 4 == 0:
-            player1 = Character(agent1, 0, 0, Direction.DOWN, 'tank1.png')
-            player2 = Character(agent2, NUM_TILES - 1, NUM_TILES - 1, Direction.UP, 'tank2.png')
-        elif ep % 4 == 1:
-            player1 = Character(agent1, 0, NUM_TILES - 1, Direction.LEFT, 'tank1.png')
-            player2 = Character(agent2, NUM_TILES - 1, 0, Direction.RIGHT, 'tank2.png')
-        elif ep % 4 == 2:
-            player1 = Character(agent1, NUM_TILES - 1, NUM_TILES - 1, Direction.UP, 'tank1.png')
-            player2 = Character(agent2, 0, 0, Direction.DOWN, 'tank2.png')
-        else: 
-            player1 = Character(agent1, NUM_TILES - 1, 0, Direction.RIGHT, 'tank1.png')
-            player2 = Character(agent2, 0, NUM_TILES - 1, Direction.LEFT, 'tank2.png')
+    if render:
+        refresh(board, player1, player2)
 
-        players = np.array([player1, player2])
-        # np.random.shuffle(players)
-        winner = run_game(players[0], players[1])
+    # if 'None' its a tie, along with the number of turns played
+    return winner, i
+
+
+def run_games_batch(agent1: ActionFunction, agent2: ActionFunction, episodes: np.ndarray, traces: dict = None) -> np.ndarray:
+    """
+    Play one game per episode in lockstep on a BatchBoard.
+
+    Parameters:
+    episodes (np.ndarray): Episode numbers, used to pick each game's starting corners.
+    traces (dict): Lists the Action values played in some of the games are appended to, by index in episodes.
+
+    Returns:
+    int8 array with the index of each game's winner, -1 for ties, and int array of the turns each game took.
+    """
+    starts = [start_positions(ep) for ep in episodes]
+    board: BatchBoard = BatchBoard(
+        NUM_TILES,
+        [(row, col) for (row, col, _), _ in starts],
+        [(row, col) for _, (row, col, _) in starts],
+        [direction.value for (_, _, direction), _ in starts],
+        [direction.value for _, (_, _, direction) in starts])
+
+    agents = (agent1, agent2)
+    states = [board.getStartStates(0), board.getStartStates(1)]
+    actions = [np.full(len(episodes), -1), np.full(len(episodes), -1)]
+    traced = np.array(sorted(traces or {}), dtype=np.int64)
+
+    while not board.done.all():
+        for player in (0, 1):
+            active = np.flatnonzero(~board.done)
+            if len(active) == 0:
+                break
+
+            states_prime = board.getStates(player)[active]
+            actions[player][active] = agents[player].apply_batch(
+                states[player][active],
+                actions[player][active],
+                states_prime,
+                board.getLegalActions(player)[active],
+                board)
+            states[player][active] = states_prime
+            for i in traced[~board.done[traced]]:
+                traces[i].append(int(actions[player][i]))
+            board.step(player, actions[player])
+
+            ended = active[board.done[active]]
+            if len(ended) > 0:
+                for i in (0, 1):
+                    agents[i].terminate_batch(
+                        states[i][ended],
+                        actions[i][ended],
+                        board.getStates(i)[ended],
+                        board.winner[ended] == i)
+
+    return board.winner, board.turns
+
+
+def start_positions(ep: int):
+    """
+    Get the starting (row, col, direction) of both players for the given episode, cycling through the corners.
+    """
+    if ep % 4 == 0:
+        return (0, 0, Direction.DOWN), (NUM_TILES - 1, NUM_TILES - 1, Direction.UP)
+    elif ep % 4 == 1:
+        return (0, NUM_TILES - 1, Direction.LEFT), (NUM_TILES - 1, 0, Direction.RIGHT)
+    elif ep % 4 == 2:
+        return (NUM_TILES - 1, NUM_TILES - 1, Direction.UP), (0, 0, Direction.DOWN)
+    else: 
+        return (NUM_TILES - 1, 0, Direction.RIGHT), (0, NUM_TILES - 1, Direction.LEFT)
+
+
+def run_episodes(agent1: ActionFunction, agent2: ActionFunction, break_when_threshold: bool = False, num_envs: int = None, metrics_file: str = None):
+    # the GUI draws a single board, so batching is only used when it is off
+    num_envs = 1 if gui_flag else (num_envs or NUM_ENVS)
+
+    metrics = make_metrics(agent1, agent2, metrics_file)
+    writer = Checkpoint.CheckpointWriter()
+    tracer = Trace.TraceWriter(TRACE_FILE, NUM_TILES) if TRACE_EVERY > 0 else None
+
+    progress = tqdm(total=NUM_EPISODES, unit="episode", disable=not show_progress)
+    first_ep = 0
+    while first_ep < NUM_EPISODES:
+        batch_size = min(
+            limit for limit in (num_envs, NUM_EPISODES - first_ep, agent1.batch_limit(), agent2.batch_limit())
+            if limit is not None)
+        episodes = np.arange(first_ep, first_ep + batch_size)
+        first_ep += batch_size
+        traces = {i: [] for i, ep in enumerate(episodes) if tracer is not None and ep % TRACE_EVERY == 0}
+
+        if batch_size == 1:
+            start1, start2 = start_positions(episodes[0])
+            player1 = Character(agent1, *start1, 'tank1.png')
+            player2 = Character(agent2, *start2, 'tank2.png')
+
+            players = np.array([player1, player2])
+            # np.random.shuffle(players)
+            winner, turns = run_game(players[0], players[1], render=episodes[0] % RENDER_EVERY == 0, trace=traces.get(0))
+            winners = [-1 if winner is None else (1 if winner.tank_file == "tank2.png" else 0)]
+            lengths = [turns]
+        else:
+            winners, lengths = run_games_batch(agent1, agent2, episodes, traces)
+        progress.update(len(episodes))
+        for i, trace in traces.items():
+            tracer.record(int(episodes[i]), int(winners[i]), trace)
         
-        if ep % SAVE_EVERY == 0 and not OPTIMAL:
-            agent1.write_to_file()
-            agent2.write_to_file()
-
-        if break_when_threshold:
-            if winner is not None and winner.tank_file == "tank2.png":
-                wins_agent_2 = np.append(wins_agent_2, 1)
-            else:
-                wins_agent_2 = np.append(wins_agent_2, 0)
-            
-            if len(wins_agent_2) > 100:
-                wins_agent_2 = np.delete(wins_agent_2, 0)
-                
-        if len(wins_agent_2) == 100 and wins_agent_2.sum() > THRESHOLD:
-            print("AGENT TRAINED SUCCESSFULLY")
-
-            if not OPTIMAL:
-                agent2.write_to_file()
-            return ep
+        if (episodes % SAVE_EVERY == 0).any() and not OPTIMAL:
+            writer.save(agent1, agent2)
+
+        for ep, winner, turns in zip(episodes, winners, lengths):
+            metrics.add_episode(winner, turns)
+                    
+            if break_when_threshold and metrics.wins.full() and metrics.wins.total > THRESHOLD:
+                print("AGENT TRAINED SUCCESSFULLY")
+
+                if not OPTIMAL:
+                    writer.save(agent2)
+                progress.close()
+                close_writer(writer)
+                if tracer is not None:
+                    tracer.close()
+                return int(ep)
+    progress.close()
 
     if not OPTIMAL:
-        agent1.write_to_file()
-        agent2.write_to_file()
+        writer.save(agent1, agent2)
+    close_writer(writer)
+    if tracer is not None:
+        tracer.close()
 
     return NUM_EPISODES
 
+def run_generations(opponent: ActionFunction, agent: GA, break_when_threshold: bool = False):
+    """
+    Train a GA as the second player against a fixed opponent, evaluating the members of each
+    generation in parallel on GA_WORKERS processes. Counterpart of run_episodes.
+
+    Returns:
+    Number of episodes played, or the episode at which the GA reached THRESHOLD.
+    """
+    metrics = make_metrics(opponent, agent)
+    episodes_per_generation = 4 * agent.max_population
+    writer = Checkpoint.CheckpointWriter()
+
+    progress = tqdm(total=NUM_EPISODES, unit="episode", disable=not show_progress)
+    with mp.Pool(GA_WORKERS, initializer=init_worker, initargs=(opponent,)) as pool:
+        for first_ep in range(0, NUM_EPISODES, episodes_per_generation):
+            results = [result for member_results in agent.run_generation(play_member, pool) for result in member_results]
+            episodes = np.arange(first_ep, first_ep + episodes_per_generation)
+            progress.update(len(episodes))
+
+            if (episodes % SAVE_EVERY == 0).any():
+                writer.save(agent)
+
+            for ep, (winner, turns) in zip(episodes, results):
+                metrics.add_episode(winner, turns)
+
+                if break_when_threshold and metrics.wins.full() and metrics.wins.total > THRESHOLD:
+                    print("AGENT TRAINED SUCCESSFULLY")
+                    writer.save(agent)
+                    progress.close()
+                    close_writer(writer)
+                    return int(ep)
+    progress.close()
+
+    writer.save(agent)
+    close_writer(writer)
+    return NUM_EPISODES
+
+
+def make_metrics(agent1: ActionFunction, agent2: ActionFunction, metrics_file: str = None) -> Metrics:
+    """
+    Create the training metrics of the given agents, reported every METRICS_EVERY episodes to the
+    console (unless progress is hidden) and to metrics_file, METRICS_FILE if None.
+    """
+    return Metrics(
+        agent1,
+        agent2,
+        publish_every=METRICS_EVERY,
+        file_name=metrics_file or METRICS_FILE,
+        log=tqdm.write if show_progress else None)
+
+
+def close_writer(writer: Checkpoint.CheckpointWriter):
+    """
+    Wait for the last checkpoint to be saved and report how long training was blocked by saving.
+    """
+    writer.wait()
+    if show_progress and writer.saves > 0:
+        print(f"Saved {writer.saves} checkpoints, training blocked for {writer.blocked:.2f}s")
+
+
+def play_member(member: GA) -> Tuple[GA, List[Tuple[int, int]]]:
+    """
+    Play the 4 starting-corner episodes of a GA member as the second player against worker_opponent.
+
+    Returns:
+    The member, with its fitness, and the (winner, turns) of each episode, winner being -1 for a tie,
+    0 if worker_opponent won and 1 if the member won.
+    """
+    results = []
+    for ep in range(4):
+        start1, start2 = start_positions(ep)
+        winner, turns = run_game(
+            Character(worker_opponent, *start1, 'tank1.png'),
+            Character(member, *start2, 'tank2.png'),
+            render=False)
+        results.append((-1 if winner is None else (1 if winner.tank_file == "tank2.png" else 0), turns))
+    return member, results
+
 def refresh(board: Board, player1: Character, player2: Character):
+    global renderer
     if gui_flag:
-        board.drawGrid(canvas, TILE_SIZE)
-        player1.draw(canvas, TILE_SIZE)
-        player2.draw(canvas, TILE_SIZE)
-        pygame.display.flip()
-        time.sleep(.05)
+        if renderer is None:
+            renderer = RenderProcess(NUM_TILES, TILE_SIZE)
+        renderer.submit(board, player1, player2)
 
 def training_opt():
     RL_agent1 = RL(
         optimal=OPTIMAL,
         decay=DECAY,
-        q_table_file="pkl_files/q_table_opt.pkl",
-        num_updates_file="pkl_files/num_updates_opt.pkl",
-        epsilon_file="pkl_files/epsilon_opt.pkl")
+        dense=DENSE_Q,
+        sparse=SPARSE_Q,
+        replay_size=REPLAY_SIZE,
+        num_tiles=NUM_TILES,
+        q_table_file="pkl_files/q_table_opt.npy",
+        num_updates_file="pkl_files/num_updates_opt.npy",
+        epsilon_file="pkl_files/epsilon_opt.npy")
     
     RL_agent2 = RL(
         optimal=OPTIMAL, 
         decay=DECAY, 
-        q_table_file="pkl_files/q_table_2opt.pkl", 
-        num_updates_file="pkl_files/num_updates_2opt.pkl", 
-        epsilon_file="pkl_files/epsilon_2opt.pkl")
+        dense=DENSE_Q,
+        sparse=SPARSE_Q,
+        replay_size=REPLAY_SIZE,
+        num_tiles=NUM_TILES,
+        q_table_file="pkl_files/q_table_2opt.npy", 
+        num_updates_file="pkl_files/num_updates_2opt.npy", 
+        epsilon_file="pkl_files/epsilon_2opt.npy")
     
     run_episodes(RL_agent1, RL_agent2)
 
@@ -146,16 +364,24 @@ def rlvrl():
     RL_agent1 = RL(
         optimal=OPTIMAL,
         decay=DECAY,
-        q_table_file="pkl_files/q_table_1rlvrl.pkl",
-        num_updates_file="pkl_files/num_updates_1rlvrl.pkl",
-        epsilon_file="pkl_files/epsilon_1rlvrl.pkl")
+        dense=DENSE_Q,
+        sparse=SPARSE_Q,
+        replay_size=REPLAY_SIZE,
+        num_tiles=NUM_TILES,
+        q_table_file="pkl_files/q_table_1rlvrl.npy",
+        num_updates_file="pkl_files/num_updates_1rlvrl.npy",
+        epsilon_file="pkl_files/epsilon_1rlvrl.npy")
     
     RL_agent2 = RL(
         optimal=OPTIMAL, 
         decay=DECAY, 
-        q_table_file="pkl_files/q_table_2rlvrl.pkl", 
-        num_updates_file="pkl_files/num_updates_2rlvrl.pkl", 
-        epsilon_file="pkl_files/epsilon_2rlvrl.pkl")
+        dense=DENSE_Q,
+        sparse=SPARSE_Q,
+        replay_size=REPLAY_SIZE,
+        num_tiles=NUM_TILES,
+        q_table_file="pkl_files/q_table_2rlvrl.npy", 
+        num_updates_file="pkl_files/num_updates_2rlvrl.npy", 
+        epsilon_file="pkl_files/epsilon_2rlvrl.npy")
     
     run_episodes(RL_agent1, RL_agent2)
 
@@ -163,16 +389,24 @@ def rlvga():
     RL_agent = RL(
         optimal=True,
         decay=DECAY,
-        q_table_file="pkl_files/q_table_optvrl.pkl",
-        num_updates_file="pkl_files/num_updates_optvrl.pkl",
-        epsilon_file="pkl_files/epsilon_optvrl.pkl")
+        dense=DENSE_Q,
+        sparse=SPARSE_Q,
+        replay_size=REPLAY_SIZE,
+        num_tiles=NUM_TILES,
+        q_table_file="pkl_files/q_table_optvrl.npy",
+        num_updates_file="pkl_files/num_updates_optvrl.npy",
+        epsilon_file="pkl_files/epsilon_optvrl.npy")
     
     GA_agent = GA(
         optimal=True, 
         min_population = 4, 
         max_population = 9, 
         mutation_rate = 0.05, 
-        policies_file = 'pkl_files/policies_optvga.pkl')
+        policies_file = 'pkl_files/policies_optvga.npy',
+        dense = DENSE_GA,
+        state_budget = GA_STATE_BUDGET,
+        eviction = GA_EVICTION,
+        num_tiles = NUM_TILES)
     
     run_episodes(RL_agent, GA_agent, True)
 
@@ -182,14 +416,22 @@ def gavrl():
         min_population = 4, 
         max_population = 9, 
         mutation_rate = 0.05, 
-        policies_file = 'pkl_files/policies_optvga.pkl')
+        policies_file = 'pkl_files/policies_optvga.npy',
+        dense = DENSE_GA,
+        state_budget = GA_STATE_BUDGET,
+        eviction = GA_EVICTION,
+        num_tiles = NUM_TILES)
     
     RL_agent = RL(
         optimal=OPTIMAL,
         decay=DECAY,
-        q_table_file="pkl_files/q_table_2optvrl.pkl",
-        num_updates_file="pkl_files/num_updates_2optvrl.pkl",
-        epsilon_file="pkl_files/epsilon_2optvrl.pkl")
+        dense=DENSE_Q,
+        sparse=SPARSE_Q,
+        replay_size=REPLAY_SIZE,
+        num_tiles=NUM_TILES,
+        q_table_file="pkl_files/q_table_2optvrl.npy",
+        num_updates_file="pkl_files/num_updates_2optvrl.npy",
+        epsilon_file="pkl_files/epsilon_2optvrl.npy")
     
     run_episodes(GA_agent, RL_agent)
 
@@ -197,95 +439,149 @@ def optvga():
     OPT_agent = RL(
         optimal=True,
         decay=DECAY,
-        q_table_file="pkl_files/q_table_opt.pkl",
-        num_updates_file="pkl_files/num_updates_opt.pkl",
-        epsilon_file="pkl_files/epsilon_opt.pkl")
+        dense=DENSE_Q,
+        sparse=SPARSE_Q,
+        replay_size=REPLAY_SIZE,
+        num_tiles=NUM_TILES,
+        q_table_file="pkl_files/q_table_opt.npy",
+        num_updates_file="pkl_files/num_updates_opt.npy",
+        epsilon_file="pkl_files/epsilon_opt.npy")
     
     GA_agent = GA(
         optimal=OPTIMAL, 
         min_population = 4, 
         max_population = 9, 
         mutation_rate = 0.05, 
-        policies_file = 'pkl_files/policies_optvga.pkl')
+        policies_file = 'pkl_files/policies_optvga.npy',
+        dense = DENSE_GA,
+        state_budget = GA_STATE_BUDGET,
+        eviction = GA_EVICTION,
+        num_tiles = NUM_TILES)
     
-    run_episodes(OPT_agent, GA_agent, True)
+    if GA_WORKERS > 0 and not OPTIMAL:
+        run_generations(OPT_agent, GA_agent, True)
+    else:
+        run_episodes(OPT_agent, GA_agent, True)
 
 
 
 def optvga_10():
-    OPT_agent = RL(
-        optimal=True,
-        decay=DECAY,
-        q_table_file="pkl_files/q_table_opt.pkl",
-        num_updates_file="pkl_files/num_updates_opt.pkl",
-        epsilon_file="pkl_files/epsilon_opt.pkl")
-    
-    total_episodes = 0
-    for _ in range(10):
-        # removes all previous files
-        for item in os.listdir("pkl_files/"):
-            if item.__contains__(f"optvga.pkl"):
-                os.remove(os.path.join("pkl_files/", item))
-
-        GA_agent = GA(
-            optimal=OPTIMAL, 
-            min_population = 4, 
-            max_population = 9, 
-            mutation_rate = 0.05, 
-            policies_file = 'pkl_files/policies_optvga.pkl')
-
-        total_episodes += run_episodes(OPT_agent, GA_agent, True)
-        
-
-    print("Average Number of Episodes " + str(DECAY) + ": " + str(total_episodes / 10))
+    run_trials("optvga")
 
 
 def optvrl():
     OPT_agent = RL(
         optimal=True,
         decay=DECAY,
-        q_table_file="pkl_files/q_table_opt.pkl",
-        num_updates_file="pkl_files/num_updates_opt.pkl",
-        epsilon_file="pkl_files/epsilon_opt.pkl")
+        dense=DENSE_Q,
+        sparse=SPARSE_Q,
+        replay_size=REPLAY_SIZE,
+        num_tiles=NUM_TILES,
+        q_table_file="pkl_files/q_table_opt.npy",
+        num_updates_file="pkl_files/num_updates_opt.npy",
+        epsilon_file="pkl_files/epsilon_opt.npy")
     
     RL_agent = RL(
         optimal=OPTIMAL,
         decay=DECAY,
-        q_table_file="pkl_files/q_table_optvrl.pkl",
-        num_updates_file="pkl_files/num_updates_optvrl.pkl",
-        epsilon_file="pkl_files/epsilon_optvrl.pkl")
+        dense=DENSE_Q,
+        sparse=SPARSE_Q,
+        replay_size=REPLAY_SIZE,
+        num_tiles=NUM_TILES,
+        q_table_file="pkl_files/q_table_optvrl.npy",
+        num_updates_file="pkl_files/num_updates_optvrl.npy",
+        epsilon_file="pkl_files/epsilon_optvrl.npy")
     
     run_episodes(OPT_agent, RL_agent, True)
 
     
 def optvrl_10():
-    OPT_agent = RL(
-        optimal=True,
-        decay=DECAY,
-        q_table_file="pkl_files/q_table_opt.pkl",
-        num_updates_file="pkl_files/num_updates_opt.pkl",
-        epsilon_file="pkl_files/epsilon_opt.pkl")
-    
-    total_episodes = 0
-    for _ in range(10):
-        # removes all previous files
-        for item in os.listdir("pkl_files/"):
-            if item.__contains__(f"optvrl.pkl"):
-                os.remove(os.path.join("pkl_files/", item))
-
-        RL_agent = RL(
-        optimal=OPTIMAL,
-        decay=DECAY,
-        q_table_file="pkl_files/q_table_optvrl.pkl",
-        num_updates_file="pkl_files/num_updates_optvrl.pkl",
-        epsilon_file="pkl_files/epsilon_optvrl.pkl")
+    run_trials("optvrl")
 
-        total_episodes += run_episodes(OPT_agent, RL_agent, True)
-        
 
-    print("Average Number of Episodes " + str(DECAY) + ": " + str(total_episodes / 10))
+def run_trials(name: str):
+    """
+    Train NUM_TRIALS fresh agents against the optimal agent in parallel, one process per trial,
+    and report how many episodes each took to reach THRESHOLD.
 
+    Parameters:
+    name (str): 'optvrl' to train RL agents, 'optvga' to train GA agents.
+    """
+    # the optimal agent is only read, so it is loaded once and handed to every worker
+    OPT_agent = RL(
+        optimal=True,
+        decay=DECAY,
+        dense=DENSE_Q,
+        sparse=SPARSE_Q,
+        replay_size=REPLAY_SIZE,
+        num_tiles=NUM_TILES,
+        q_table_file="pkl_files/q_table_opt.npy",
+        num_updates_file="pkl_files/num_updates_opt.npy",
+        epsilon_file="pkl_files/epsilon_opt.npy")
+
+    num_workers = min(NUM_TRIALS, os.cpu_count() or 1)
+    with mp.Pool(num_workers, initializer=init_worker, initargs=(OPT_agent,)) as pool:
+        episodes = pool.map(run_trial, [(name, trial) for trial in range(NUM_TRIALS)])
+
+    for trial, trial_episodes in enumerate(episodes):
+        print(f"Trial {trial}: {trial_episodes} episodes")
+    print("Average Number of Episodes " + str(DECAY) + ": " + str(sum(episodes) / NUM_TRIALS))
+
+
+def init_worker(opponent: ActionFunction):
+    """
+    Set up a run_trials, run_generations or tournament worker: share the fixed opponent and turn off the GUI and progress bar.
+    """
+    global worker_opponent, gui_flag, show_progress, TRACE_EVERY
+    worker_opponent = opponent
+    gui_flag = False
+    show_progress = False
+    # only the main process appends to TRACE_FILE
+    TRACE_EVERY = 0
+
+    # workers start from a copy of the same random state, so each one is reseeded
+    np.random.seed()
+    random.seed()
+
+
+def run_trial(args: Tuple[str, int]) -> int:
+    """
+    Train one fresh agent against worker_opponent, with its checkpoints in pkl_files/<name>_10/trial_<trial>/.
+
+    Returns:
+    Number of episodes it took to reach THRESHOLD.
+    """
+    name, trial = args
+
+    # removes all previous files of this trial
+    trial_dir = os.path.join("pkl_files", f"{name}_10", f"trial_{trial}")
+    shutil.rmtree(trial_dir, ignore_errors=True)
+    os.makedirs(trial_dir)
+
+    if name == "optvrl":
+        agent = RL(
+            optimal=OPTIMAL,
+            decay=DECAY,
+            dense=DENSE_Q,
+            sparse=SPARSE_Q,
+            replay_size=REPLAY_SIZE,
+            num_tiles=NUM_TILES,
+            q_table_file=os.path.join(trial_dir, "q_table_optvrl.npy"),
+            num_updates_file=os.path.join(trial_dir, "num_updates_optvrl.npy"),
+            epsilon_file=os.path.join(trial_dir, "epsilon_optvrl.npy"))
+    else:
+        agent = GA(
+            optimal=OPTIMAL, 
+            min_population = 4, 
+            max_population = 9, 
+            mutation_rate = 0.05, 
+            policies_file = os.path.join(trial_dir, "policies_optvga.npy"),
+            dense = DENSE_GA,
+            state_budget = GA_STATE_BUDGET,
+            eviction = GA_EVICTION,
+            num_tiles = NUM_TILES)
 
+    return run_episodes(worker_opponent, agent, True, metrics_file=os.path.join(trial_dir, "metrics.jsonl"))
 
 
 def gavga():
@@ -294,46 +590,291 @@ def gavga():
         min_population = 4, 
         max_population = 8, 
         mutation_rate = 0.05, 
-        policies_file = 'pkl_files/policies_1gavga.pkl')
+        policies_file = 'pkl_files/policies_1gavga.npy',
+        dense = DENSE_GA,
+        state_budget = GA_STATE_BUDGET,
+        eviction = GA_EVICTION,
+        num_tiles = NUM_TILES)
     
     GA_agent2 = GA(
         optimal=OPTIMAL, 
         min_population = 4, 
         max_population = 8, 
         mutation_rate = 0.05, 
-        policies_file = 'pkl_files/policies_2gavga.pkl')
+        policies_file = 'pkl_files/policies_2gavga.npy',
+        dense = DENSE_GA,
+        state_budget = GA_STATE_BUDGET,
+        eviction = GA_EVICTION,
+        num_tiles = NUM_TILES)
     
     run_episodes(GA_agent1, GA_agent2)
 
+def convert():
+    """
+    Convert the pickled checkpoints in pkl_files/ to .npy checkpoints, see Checkpoint.
+    """
+    for item in sorted(os.listdir("pkl_files/")):
+        if not item.endswith(Checkpoint.LEGACY_EXTENSION):
+            continue
+        file_name = os.path.join("pkl_files", item)
+        table = Checkpoint.loadTable(file_name)
+        if isinstance(table, dict):
+            if item.startswith("policies_"):
+                table = policy_rows({i: State.convertKeys(policy) for i, policy in table.items()}, len(table))
+            else:
+                table = State.convertKeys(table)
+        Checkpoint.saveTable(os.path.splitext(file_name)[0] + Checkpoint.CHECKPOINT_EXTENSION, table)
+        print(f"Converted {file_name}")
+
+def solve(name: str):
+    """
+    Solve the game on the current board by value iteration instead of training, and write the Q-table as the
+    checkpoint of an RL agent, see Solver.
+
+    Parameters:
+    name (str): Checkpoint name the tables are written to, q_table_<name> in pkl_files/.
+    """
+    q_values, tables, info = Solver.solveGame(NUM_TILES, blunder=SOLVE_BLUNDER)
+    keys, q_values = Solver.observedTable(q_values, tables)
+    Checkpoint.saveTable(f"pkl_files/q_table_{name}.npy", Checkpoint.KeyedTable(keys, q_values))
+    Checkpoint.saveTable(
+        f"pkl_files/num_updates_{name}.npy", Checkpoint.KeyedTable(keys, (q_values != Solver.INVALID).astype(np.float64)))
+    Checkpoint.saveTable(f"pkl_files/epsilon_{name}.npy", 0.)
+    print(
+        f"Solved {len(tables.valid)} joint states in {info['iterations']} iterations ({info['seconds']:.1f}s), "
+        f"wrote {len(keys)} states to pkl_files/q_table_{name}.npy")
+
+def replay(episodes: List[int] = None):
+    """
+    Re-simulate episodes recorded in TRACE_FILE and show them in the GUI (unless it is off), checking that each
+    ends as it did when it was recorded.
+
+    Parameters:
+    episodes (List[int]): Episode numbers to replay, None for every recorded episode.
+    """
+    global renderer
+    num_tiles, traces = Trace.readTraces(TRACE_FILE)
+    if num_tiles != NUM_TILES:
+        raise Exception(f"{TRACE_FILE} was recorded on {num_tiles} tiles. Please pass --tiles={num_tiles}.")
+    if episodes:
+        traces = [trace for trace in traces if trace.episode in episodes]
+    if gui_flag and renderer is None:
+        # waiting for the window instead of dropping frames, so every turn is shown
+        renderer = RenderProcess(NUM_TILES, TILE_SIZE, drop_frames=False)
+
+    mismatches = 0
+    for trace in tqdm(traces, unit="episode", disable=not show_progress or gui_flag):
+        start1, start2 = start_positions(trace.corner)
+        player1 = Character(Trace.TracePlayer(trace.actions[0::2]), *start1, 'tank1.png')
+        player2 = Character(Trace.TracePlayer(trace.actions[1::2]), *start2, 'tank2.png')
+        winner, _ = run_game(player1, player2)
+        if (-1 if winner is None else (0 if winner is player1 else 1)) != trace.winner:
+            mismatches += 1
+    print(f"Replayed {len(traces)} episodes from {TRACE_FILE}, {mismatches} did not end as recorded")
+
+def find_checkpoints() -> List[str]:
+    """
+    Find the agent checkpoints in pkl_files/, .npy or .pkl.
+
+    Returns:
+    Sorted checkpoint names: 'rl_<name>' for q_table_<name>, 'ga_<name>' for policies_<name>.
+    """
+    names = set()
+    for item in os.listdir("pkl_files/"):
+        stem, extension = os.path.splitext(item)
+        if extension not in (Checkpoint.CHECKPOINT_EXTENSION, Checkpoint.LEGACY_EXTENSION) or stem.endswith(".keys"):
+            continue
+        if stem.startswith("q_table_"):
+            names.add("rl_" + stem[len("q_table_"):])
+        elif stem.startswith("policies_"):
+            names.add("ga_" + stem[len("policies_"):])
+    return sorted(names)
+
+
+def load_checkpoint(name: str) -> ActionFunction:
+    """
+    Load an agent from its checkpoint in pkl_files/, to play as-is without learning.
+
+    Parameters:
+    name (str): Checkpoint name, as find_checkpoints.
+    """
+    kind, stem = name.split("_", 1)
+    if kind == "rl":
+        return RL(
+            optimal=True,
+            num_tiles=NUM_TILES,
+            q_table_file=f"pkl_files/q_table_{stem}.npy",
+            num_updates_file=f"pkl_files/num_updates_{stem}.npy",
+            epsilon_file=f"pkl_files/epsilon_{stem}.npy")
+    if kind == "ga":
+        return GA(
+            optimal=True,
+            policies_file=f"pkl_files/policies_{stem}.npy",
+            num_tiles=NUM_TILES)
+    raise Exception(f"Invalid checkpoint '{name}'. Please use 'rl_<name>' or 'ga_<name>'.")
+
+
+def play_matchup(args: Tuple[str, str]) -> Tuple[str, str, List[int], int, float]:
+    """
+    Play TOURNAMENT_ROUNDS games from each of the four starting corners, with the first agent in the first seat.
+
+    Parameters:
+    args (Tuple[str, str]): Checkpoint names of the first and second seat.
+
+    Returns:
+    The two names, [wins, losses, ties] of the first seat, the turns played and the seconds taken, loading included.
+    """
+    names = args
+    start = time.perf_counter()
+    for name in names:
+        if name not in tournament_agents:
+            tournament_agents[name] = load_checkpoint(name)
+    agent1, agent2 = (tournament_agents[name] for name in names)
+
+    results = [0, 0, 0]
+    turns = 0
+    for ep in range(4 * TOURNAMENT_ROUNDS):
+        start1, start2 = start_positions(ep)
+        player1 = Character(agent1, *start1, 'tank1.png')
+        winner, game_turns = run_game(player1, Character(agent2, *start2, 'tank2.png'), render=False)
+        results[2 if winner is None else (0 if winner is player1 else 1)] += 1
+        turns += game_turns
+    return names[0], names[1], results, turns, time.perf_counter() - start
+
+
+def tournament(names: List[str] = None):
+    """
+    Play every pair of checkpoints against each other in both seat orders, from all four starting corners,
+    without learning, spreading the matchups over a process pool. Prints the win/loss/tie matrix and
+    throughput, and writes them to TOURNAMENT_FILE.
+
+    Parameters:
+    names (List[str]): Checkpoint names, as find_checkpoints, None for every checkpoint in pkl_files/.
+    """
+    names = names or find_checkpoints()
+    matchups = [(first, second) for first in names for second in names if first != second]
+    if not matchups:
+        raise Exception("A tournament needs at least two checkpoints.")
+
+    start = time.perf_counter()
+    records = {name: {opponent: [0, 0, 0] for opponent in names if opponent != name} for name in names}
+    matchup_results = []
+    turns = 0
+    worker_seconds = 0.
+    num_workers = min(len(matchups), os.cpu_count() or 1)
+    with mp.Pool(num_workers, initializer=init_worker, initargs=(None,)) as pool:
+        for first, second, results, matchup_turns, seconds in tqdm(
+                pool.imap_unordered(play_matchup, matchups), total=len(matchups), disable=not show_progress):
+            wins, losses, ties = results
+            records[first][second] = [a + b for a, b in zip(records[first][second], (wins, losses, ties))]
+            records[second][first] = [a + b for a, b in zip(records[second][first], (losses, wins, ties))]
+            matchup_results.append({'first': first, 'second': second, 'wins': wins, 'losses': losses, 'ties': ties})
+            turns += matchup_turns
+            worker_seconds += seconds
+    elapsed = time.perf_counter() - start
+    games = len(matchups) * 4 * TOURNAMENT_ROUNDS
+
+    width = max(len(name) for name in names) + 2
+    print("wins/losses/ties of each row against each column, over both seat orders")
+    print(" " * width + "".join(f"{name:>{width}}" for name in names))
+    for name in names:
+        cells = ("-" if opponent == name else "/".join(map(str, records[name][opponent])) for opponent in names)
+        print(f"{name:<{width}}" + "".join(f"{cell:>{width}}" for cell in cells))
+    print(
+        f"{games} games, {turns} turns in {elapsed:.2f}s on {num_workers} workers: "
+        f"{games / elapsed:.1f} games/s, {turns / elapsed:.0f} turns/s, "
+        f"parallel efficiency {worker_seconds / (elapsed * num_workers):.0%}")
+
+    with open(TOURNAMENT_FILE, 'w') as f:
+        json.dump({
+            'agents': names,
+            'rounds': TOURNAMENT_ROUNDS,
+            'records': records,
+            'matchups': matchup_results,
+            'games': games,
+            'turns': turns,
+            'seconds': elapsed,
+            'workers': num_workers,
+            'games_per_sec': games / elapsed,
+            'turns_per_sec': turns / elapsed,
+        }, f, indent=2)
+
+def serve(name: str):
+    """
+    Serve the greedy policy of a checkpoint on SERVE_ADDRESS until interrupted, see PolicyServer.
+
+    Parameters:
+    name (str): Checkpoint name, as find_checkpoints.
+    """
+    batcher = PolicyServer.Batcher(PolicyServer.loadPolicy(name, NUM_TILES), SERVE_WINDOW)
+    server = PolicyServer.makeServer(SERVE_ADDRESS, batcher)
+    print(f"Serving {name} on {server.server_address}, batch window {SERVE_WINDOW * 1.e+03:g} ms")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        if isinstance(SERVE_ADDRESS, str) and os.path.exists(SERVE_ADDRESS):
+            os.remove(SERVE_ADDRESS)
+    print(json.dumps(batcher.stats(), indent=2))
+
 if __name__ == "__main__":
-    # if reset argument is passed, delete all .pkl files
-    if len(sys.argv) > 1:
-        if len(sys.argv) > 2:
-            if sys.argv[2] == "reset":
+    args = [arg for arg in sys.argv[1:] if arg not in ("--headless", "--profile") and not arg.startswith("--tiles=")]
+
+    profiler = None
+    if PROFILE:
+        # importing Profiler only when profiling, it wraps the hooked functions as soon as it is enabled
+        from Profiler import Profiler
+        profiler = Profiler().enable()
+        profiler.hook(sys.modules[__name__], "run_game", "run_game", agent="main")
+        profiler.hook(sys.modules[__name__], "refresh", "refresh", agent="main")
+    # if reset argument is passed, delete all checkpoint files
+    if len(args) > 0:
+        if len(args) > 1 and args[0] not in ("tournament", "serve", "solve", "replay"):
+            if args[1] == "reset":
                 for item in os.listdir("pkl_files/"):
-                    if item.__contains__(f"{sys.argv[1]}.pkl"):
+                    if item.__contains__(f"{args[0]}."):
                         os.remove(os.path.join("pkl_files/", item))
             else:
                 raise Exception("Invalid argument. Please use 'reset' as 2nd argument.")
 
-        if sys.argv[1] == "rlvrl":
+        if args[0] == "rlvrl":
             rlvrl()
-        elif sys.argv[1] == "rlvga": 
+        elif args[0] == "rlvga": 
             rlvga()
-        elif sys.argv[1] == "gavrl": 
+        elif args[0] == "gavrl": 
             gavrl()
-        elif sys.argv[1] == "gavga":
+        elif args[0] == "gavga":
             gavga()
-        elif sys.argv[1] == "optvga":
+        elif args[0] == "optvga":
             optvga()
-        elif sys.argv[1] == "optvrl":
+        elif args[0] == "optvrl":
             optvrl()
-        elif sys.argv[1] == "optvrl_10":
+        elif args[0] == "optvrl_10":
             optvrl_10()
-        elif sys.argv[1] == "optvga_10":
+        elif args[0] == "optvga_10":
             optvga_10()
-        elif sys.argv[1] == "training_opt":
+        elif args[0] == "training_opt":
             training_opt()
+        elif args[0] == "convert":
+            convert()
+        elif args[0] == "tournament":
+            tournament(args[1:])
+        elif args[0] == "serve":
+            serve(args[1] if len(args) > 1 else "rl_opt")
+        elif args[0] == "solve":
+            solve(args[1] if len(args) > 1 else "opt")
+        elif args[0] == "replay":
+            replay([int(arg) for arg in args[1:]])
         else: 
-            raise Exception("Invalid argument. Please use 'rlvrl', 'rlvga', 'gavrl', 'gavga', 'optvga', 'optvrl', or 'training_opt' as 1st argument.")
-        
\ No newline at end of file
+            raise Exception("Invalid argument. Please use 'rlvrl', 'rlvga', 'gavrl', 'gavga', 'optvga', 'optvrl', 'training_opt', 'convert', 'tournament', 'serve', 'solve', or 'replay' as 1st argument.")
+
+        if renderer is not None:
+            renderer.close()
+
+        if profiler is not None:
+            profiler.disable()
+            print(profiler.table())
+            profiler.write(PROFILE_FILE)
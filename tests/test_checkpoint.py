@@ -0,0 +1,87 @@
+import numpy as np
+import os
+import threading
+import pytest
+import Checkpoint
+
+
+def keyed(num_keys: int) -> Checkpoint.KeyedTable:
+    keys = np.arange(num_keys, dtype=np.int64) * 3
+    return Checkpoint.KeyedTable(keys, np.repeat(keys[:, np.newaxis], 7, axis=1).astype(np.float32))
+
+
+def test_round_trip(tmp_path):
+    file_name = str(tmp_path / "table.npy")
+    dense = np.arange(21, dtype=np.float32).reshape(3, 7)
+    Checkpoint.saveTable(file_name, dense)
+    assert (Checkpoint.loadTable(file_name) == dense).all()
+
+    Checkpoint.saveTable(file_name, {5: np.ones(7), 2: np.zeros(7)})
+    table = Checkpoint.loadTable(file_name)
+    assert isinstance(table, Checkpoint.KeyedTable)
+    assert table.keys.tolist() == [2, 5]
+    assert (table[5] == 1).all() and (table[2] == 0).all()
+
+    Checkpoint.saveTable(file_name, 0.25)
+    assert Checkpoint.loadTable(file_name) == 0.25
+
+    legacy_file = str(tmp_path / "table.pkl")
+    Checkpoint.saveTable(legacy_file, keyed(4))
+    loaded = Checkpoint.loadTable(legacy_file)
+    assert isinstance(loaded, dict) and sorted(loaded) == [0, 3, 6, 9]
+    # a .npy checkpoint falls back to the .pkl file of the same name
+    os.remove(file_name)
+    assert sorted(Checkpoint.loadTable(file_name)) == [0, 3, 6, 9]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_switching_between_keyed_and_dense(tmp_path):
+    file_name = str(tmp_path / "table.npy")
+    Checkpoint.saveTable(file_name, keyed(5))
+    assert os.path.exists(Checkpoint.keysFile(file_name))
+
+    Checkpoint.saveTable(file_name, np.zeros((5, 7)))
+    assert not os.path.exists(Checkpoint.keysFile(file_name))
+    assert isinstance(Checkpoint.loadTable(file_name), np.ndarray)
+
+    Checkpoint.saveTable(file_name, keyed(6))
+    assert isinstance(Checkpoint.loadTable(file_name), Checkpoint.KeyedTable)
+
+
+def test_mmap_load_is_copy_on_write(tmp_path):
+    file_name = str(tmp_path / "table.npy")
+    Checkpoint.saveTable(file_name, keyed(5))
+    table = Checkpoint.loadTable(file_name, mmap=True)
+    assert isinstance(table.values, np.memmap)
+    table[3] += 1
+    table[100] = np.ones(7)
+    assert table[3][0] == 4 and 100 in table
+    reloaded = Checkpoint.loadTable(file_name)
+    assert reloaded[3][0] == 3 and 100 not in reloaded
+
+
+def test_mismatched_key_column_is_rejected(tmp_path):
+    file_name = str(tmp_path / "table.npy")
+    Checkpoint.saveTable(file_name, keyed(5))
+    np.save(Checkpoint.keysFile(file_name), np.arange(3, dtype=np.int64))
+    with pytest.raises(Exception, match="3 keys"):
+        Checkpoint.loadTable(file_name)
+
+
+def test_concurrent_saves_replace_both_files(tmp_path):
+    file_name = str(tmp_path / "table.npy")
+    Checkpoint.saveTable(file_name, keyed(1))
+
+    def save(num_keys: int) -> None:
+        for _ in range(30):
+            Checkpoint.saveTable(file_name, keyed(num_keys))
+
+    threads = [threading.Thread(target=save, args=(num_keys,)) for num_keys in (10, 20, 30)]
+    for thread in threads:
+        thread.start()
+    for _ in range(100):
+        table = Checkpoint.loadTable(file_name)
+        assert (table.values[:, 0] == table.keys).all()
+    for thread in threads:
+        thread.join()
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
@@ -0,0 +1,15 @@
+import numpy as np
+import pytest
+import main
+from GA import GA
+
+
+@pytest.mark.parametrize("eviction", ["lru", "lfu"])
+def test_state_budget_with_batched_games(tmp_path, eviction):
+    # games of the same policy are played together, so its states must not be evicted while some are still running
+    opponent = GA(policies_file=str(tmp_path / "opponent.npy"))
+    agent = GA(policies_file=str(tmp_path / "agent.npy"), state_budget=10, eviction=eviction)
+    for first in range(0, 800, 4):
+        main.run_games_batch(opponent, agent, np.arange(first, first + 4))
+    assert agent.evictions > 0
+    assert all(len(policy) <= 10 for policy in agent.policies.values())
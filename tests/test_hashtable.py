@@ -0,0 +1,69 @@
+import numpy as np
+import Checkpoint
+from HashTable import HashTable, HashColumn, MAX_LOAD
+
+
+def make_table(capacity: int = 16) -> HashTable:
+    return HashTable([((2,), np.float32), ((), np.uint32)], capacity=capacity)
+
+
+def test_insert_and_find_across_grow():
+    table = make_table()
+    keys = np.random.default_rng(0).choice(1 << 40, 1000, replace=False)
+    for chunk in np.array_split(keys, 10):
+        slots = table.insert(chunk)
+        table.columns[0][slots] = chunk[:, np.newaxis] + np.array([0., 1.])
+        table.columns[1][slots] = chunk % 1000
+    assert len(table.keys) > 16 and table.count <= MAX_LOAD * len(table.keys)
+    assert table.count == len(keys)
+
+    slots = table.find(keys)
+    assert (table.keys[slots] == keys).all()
+    assert (table.columns[0][slots, 0] == keys.astype(np.float32)).all()
+    assert (table.columns[1][slots] == keys % 1000).all()
+    assert [table.slot(key) for key in keys[:50]] == slots[:50].tolist()
+    assert (table.insert(keys) == slots).all()
+    assert table.count == len(keys)
+    assert (table.find(np.array([1 << 41, (1 << 41) + 1])) == -1).all()
+
+
+def test_colliding_keys():
+    table = make_table()
+    # keys probing the same first slot are placed in the slots following it
+    candidates = np.arange(10_000)
+    keys = candidates[table.hash(candidates) == 3][:5]
+    assert len(keys) == 5
+    slots = table.insert(keys)
+    assert len(set(slots.tolist())) == len(keys)
+    assert (table.find(keys) == slots).all()
+    assert [table.slot(key) for key in keys] == slots.tolist()
+    assert table.slot(int(candidates[table.hash(candidates) == 3][5])) == -1
+
+
+def test_slot_insert_grows():
+    table = make_table()
+    column = HashColumn(table, 1)
+    for key in range(100):
+        column[key] = key + 1
+    assert len(table.keys) >= 200
+    assert len(column) == 100
+    assert all(column[key] == key + 1 for key in range(100))
+    assert 100 not in column
+
+
+def test_arrays_round_trip_through_checkpoint(tmp_path):
+    table = make_table()
+    keys = np.array([7, 3, 1 << 33, 12, 5])
+    slots = table.insert(keys)
+    table.columns[0][slots] = np.arange(10, dtype=np.float32).reshape(5, 2)
+
+    snapshot = Checkpoint.snapshotTable(HashColumn(table, 0))
+    assert (snapshot.keys == np.sort(keys)).all()
+    file_name = str(tmp_path / "table.npy")
+    Checkpoint.saveTable(file_name, HashColumn(table, 0))
+    loaded = Checkpoint.loadTable(file_name)
+    assert isinstance(loaded, Checkpoint.KeyedTable)
+    table_keys, rows = table.arrays(0)
+    assert dict(loaded.items()).keys() == set(table_keys.tolist())
+    for key, row in zip(table_keys.tolist(), rows):
+        assert (loaded[key] == row).all()
@@ -0,0 +1,75 @@
+import numpy as np
+from RL import RL
+from State import State
+
+
+def make_agent(tmp_path, **kwargs) -> RL:
+    return RL(
+        q_table_file=str(tmp_path / "q_table.npy"),
+        num_updates_file=str(tmp_path / "num_updates.npy"),
+        epsilon_file=str(tmp_path / "epsilon.npy"),
+        **kwargs)
+
+
+def test_sparse_replay_grow_masks_state_prime(tmp_path):
+    agent = make_agent(tmp_path, sparse=True, replay_size=64, replay_batch=64, replay_every=1)
+    # transitions between states the table has not seen, so replaying them grows the table
+    keys = State.keys(np.array([[row, col, 0, 8, 8] for row in range(4) for col in range(8)]))
+    agent.replay.add_batch(keys[:-1], np.zeros(len(keys) - 1), np.full(len(keys) - 1, -100.), keys[1:], False)
+    capacity = len(agent.table.keys)
+
+    states = np.array([[0, 0, 2, 8, 7]])
+    states_prime = np.array([[0, 1, 2, 8, 7]])
+    legal = np.array([[True, False, True, False, True, True, False]])
+    agent.apply_batch_dense(states, np.array([0]), states_prime, legal)
+
+    assert len(agent.table.keys) > capacity
+    q_values = agent.table.columns[0][agent.table.find(State.keys(states_prime))[0]]
+    assert (q_values[~legal[0]] == np.float32(-1.e+10)).all()
+    assert (q_values[legal[0]] == 0).all()
+
+
+def test_table_modes_agree(tmp_path):
+    rng = np.random.default_rng(0)
+    positions, opp_positions = np.divmod(rng.choice(81 * 81, 64, replace=False), 81)
+    pool = np.stack(
+        [positions // 9, positions % 9, rng.integers(0, 4, 64), opp_positions // 9, opp_positions % 9], axis=1)
+    agents = [make_agent(tmp_path / str(i), **mode) for i, mode in enumerate(({}, {'dense': True}, {'sparse': True}))]
+
+    def legal_actions(states: np.ndarray) -> np.ndarray:
+        # fixed for each state, as the walls make them
+        legal = (State.keys(states)[:, np.newaxis] >> np.arange(7)) & 1 == 1
+        legal[:, 0] = True
+        return legal
+
+    states = np.column_stack([pool[:8, :3], np.full((8, 2), -1)])
+    actions = np.full(8, -1)
+    visited = set()
+    for _ in range(50):
+        # the states of a step are different from each other and from the states before it, so updating them
+        # one at a time, as dict tables do, gives the same values as the vectorized update
+        previous = {tuple(state) for state in states.tolist()}
+        choices = [i for i, state in enumerate(pool.tolist()) if tuple(state) not in previous]
+        states_prime = pool[rng.choice(choices, 8, replace=False)]
+        visited.update(tuple(state) for state in states_prime.tolist())
+        legal = legal_actions(states_prime)
+        for agent in agents:
+            agent.apply_batch(states, actions, states_prime, legal, None)
+        actions = np.array([rng.choice(np.flatnonzero(row)) for row in legal])
+        states = states_prime
+
+    dict_agent, dense_agent, sparse_agent = agents
+    visited = np.array(sorted(visited))
+    keys = State.keys(visited)
+    assert sorted(dict_agent.q_table) == sorted(keys.tolist())
+    q_table = np.array([dict_agent.q_table[key] for key in keys.tolist()])
+    num_updates = np.array([dict_agent.num_updates[key] for key in keys.tolist()])
+    assert num_updates.sum() > 0
+
+    dense_ids = State.indices(visited, 9)
+    slots = sparse_agent.table.find(keys)
+    for other_q, other_updates in (
+            (dense_agent.q_table[dense_ids], dense_agent.num_updates[dense_ids]),
+            (sparse_agent.table.columns[0][slots], sparse_agent.table.columns[1][slots])):
+        assert (other_updates == num_updates).all()
+        assert np.allclose(other_q, q_table, rtol=1.e-05)